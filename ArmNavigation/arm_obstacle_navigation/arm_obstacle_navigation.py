@@ -4,6 +4,7 @@ Obstacle navigation using A* on a toroidal grid
 Author: Daniel Ingram (daniel-s-ingram)
 """
 from math import pi
+import heapq
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.colors import from_levels_and_colors
@@ -14,6 +15,9 @@ plt.ion()
 M = 100
 obstacles = [[1.75, 0.75, 0.6], [0.55, 1.5, 0.5], [0, -1, 0.25]]
 
+# occupancy grids for each arm and obstacle set
+_occupancy_grid_cache = {}
+
 
 def main():
     arm = NLinkArm([1, 1], [0, 0])
@@ -64,6 +68,26 @@ def detect_collision(line_seg, circle):
     return True
 
 
+def detect_collision_array(a_x, a_y, b_x, b_y, circle):
+    """
+    detect_collision for arrays of line segments from (a_x, a_y) to
+    (b_x, b_y) against one circle
+
+    Returns:
+        Bool array, True if the line segment is in contact with the circle
+    """
+    line_x, line_y = b_x - a_x, b_y - a_y
+    line_mag = np.sqrt(line_x * line_x + line_y * line_y)
+    circle_x, circle_y = circle[0] - a_x, circle[1] - a_y
+    proj = circle_x * (line_x / line_mag) + circle_y * (line_y / line_mag)
+    ratio = np.clip(proj, 0.0, line_mag) / line_mag
+    closest_x = a_x + line_x * ratio
+    closest_y = a_y + line_y * ratio
+    dx, dy = closest_x - circle[0], closest_y - circle[1]
+
+    return np.sqrt(dx * dx + dy * dy) <= circle[2]
+
+
 def get_occupancy_grid(arm, obstacles):
     """
     Discretizes joint space into M values from -pi to +pi
@@ -71,6 +95,11 @@ def get_occupancy_grid(arm, obstacles):
     would result in a collision between a robot arm and obstacles
     in its environment.
 
+    The forward kinematics of all the joint configurations are computed
+    at once, and the grid is cached for the arm and the obstacle set.
+    The grid spans the first two joints, the joints after them stay at
+    zero as in NLinkArm.update_joints with two angles.
+
     Args:
         arm: An instance of NLinkArm
         obstacles: A list of obstacles, with each obstacle defined as a list
@@ -79,23 +108,28 @@ def get_occupancy_grid(arm, obstacles):
     Returns:
         Occupancy grid in joint space
     """
-    grid = [[0 for _ in range(M)] for _ in range(M)]
-    theta_list = [2 * i * pi / M for i in range(-M // 2, M // 2 + 1)]
-    for i in range(M):
-        for j in range(M):
-            arm.update_joints([theta_list[i], theta_list[j]])
-            points = arm.points
-            collision_detected = False
-            for k in range(len(points) - 1):
-                for obstacle in obstacles:
-                    line_seg = [points[k], points[k + 1]]
-                    collision_detected = detect_collision(line_seg, obstacle)
-                    if collision_detected:
-                        break
-                if collision_detected:
-                    break
-            grid[i][j] = int(collision_detected)
-    return np.array(grid)
+    key = (M, tuple(np.ravel(arm.link_lengths).tolist()),
+           tuple(tuple(obstacle) for obstacle in obstacles))
+    if key not in _occupancy_grid_cache:
+        theta_list = 2 * np.arange(-M // 2, M // 2 + 1) * pi / M
+        theta1, theta2 = np.meshgrid(theta_list[:M], theta_list[:M],
+                                     indexing="ij")
+
+        # link end points for all joint configurations, link by link
+        joint_angles = [theta1, theta2] + [0.0] * (arm.n_links - 2)
+        x, y, angle = np.zeros((M, M)), np.zeros((M, M)), np.zeros((M, M))
+        collision = np.zeros((M, M), dtype=bool)
+        for link_length, joint_angle in zip(arm.link_lengths, joint_angles):
+            angle = angle + joint_angle
+            next_x = x + link_length * np.cos(angle)
+            next_y = y + link_length * np.sin(angle)
+            for obstacle in obstacles:
+                collision |= detect_collision_array(x, y, next_x, next_y,
+                                                    obstacle)
+            x, y = next_x, next_y
+        _occupancy_grid_cache[key] = collision.astype(int)
+
+    return _occupancy_grid_cache[key].copy()
 
 
 def astar_torus(grid, start_node, goal_node):
@@ -118,46 +152,44 @@ def astar_torus(grid, start_node, goal_node):
     grid[start_node] = 4
     grid[goal_node] = 5
 
-    parent_map = [[() for _ in range(M)] for _ in range(M)]
-
-    heuristic_map = calc_heuristic_map(M, goal_node)
-
-    explored_heuristic_map = np.full((M, M), np.inf)
-    distance_map = np.full((M, M), np.inf)
-    explored_heuristic_map[start_node] = heuristic_map[start_node]
-    distance_map[start_node] = 0
-    while True:
-        grid[start_node] = 4
-        grid[goal_node] = 5
-
-        current_node = np.unravel_index(
-            np.argmin(explored_heuristic_map, axis=None), explored_heuristic_map.shape)
-        min_distance = np.min(explored_heuristic_map)
-        if (current_node == goal_node) or np.isinf(min_distance):
+    # search on the flat index of the grid
+    start_id = int(np.ravel_multi_index(start_node, (M, M)))
+    goal_id = int(np.ravel_multi_index(goal_node, (M, M)))
+    state = grid.ravel().tolist()
+    neighbor_ids = find_neighbor_ids(M).tolist()
+    heuristic = calc_heuristic_map(M, goal_node).ravel().tolist()
+    parent = [-1] * (M * M)
+
+    # nodes are ordered by the heuristic, then by the index
+    open_heap = [(heuristic[start_id], start_id)]
+    is_found = False
+    while open_heap:
+        _, current_id = heapq.heappop(open_heap)
+        if current_id == goal_id:
+            is_found = True
             break
 
-        grid[current_node] = 2
-        explored_heuristic_map[current_node] = np.inf
-
-        i, j = current_node[0], current_node[1]
+        if current_id != start_id:
+            state[current_id] = 2
 
-        neighbors = find_neighbors(i, j)
+        for n_id in neighbor_ids[current_id]:
+            if state[n_id] == 0 or n_id == goal_id:
+                parent[n_id] = current_id
+                heapq.heappush(open_heap, (heuristic[n_id], n_id))
+                if n_id != goal_id:
+                    state[n_id] = 3
 
-        for neighbor in neighbors:
-            if grid[neighbor] == 0 or grid[neighbor] == 5:
-                distance_map[neighbor] = distance_map[current_node] + 1
-                explored_heuristic_map[neighbor] = heuristic_map[neighbor]
-                parent_map[neighbor[0]][neighbor[1]] = current_node
-                grid[neighbor] = 3
+    grid[:] = np.reshape(state, (M, M))
 
-    if np.isinf(explored_heuristic_map[goal_node]):
+    if not is_found:
         route = []
         print("No route found.")
     else:
-        route = [goal_node]
-        while parent_map[route[0][0]][route[0][1]] != ():
-            route.insert(0, parent_map[route[0][0]][route[0][1]])
-
+        route = [goal_id]
+        while parent[route[-1]] != -1:
+            route.append(parent[route[-1]])
+        route = [tuple(int(v) for v in np.unravel_index(n_id, (M, M)))
+                 for n_id in reversed(route)]
         print("The route found covers %d grid cells." % len(route))
         for i in range(1, len(route)):
             grid[route[i]] = 6
@@ -197,17 +229,26 @@ def find_neighbors(i, j):
     return neighbors
 
 
+def find_neighbor_ids(M):
+    """
+    Flat indexes of the 4 neighbors of each cell on the toroidal grid
+    """
+    ids = np.arange(M * M).reshape(M, M)
+
+    return np.stack([np.roll(ids, 1, axis=0), np.roll(ids, -1, axis=0),
+                     np.roll(ids, 1, axis=1), np.roll(ids, -1, axis=1)],
+                    axis=-1).reshape(M * M, 4)
+
+
 def calc_heuristic_map(M, goal_node):
-    X, Y = np.meshgrid([i for i in range(M)], [i for i in range(M)])
-    heuristic_map = np.abs(X - goal_node[1]) + np.abs(Y - goal_node[0])
-    for i in range(heuristic_map.shape[0]):
-        for j in range(heuristic_map.shape[1]):
-            heuristic_map[i, j] = min(heuristic_map[i, j],
-                                      i + 1 + heuristic_map[M - 1, j],
-                                      M - i + heuristic_map[0, j],
-                                      j + 1 + heuristic_map[i, M - 1],
-                                      M - j + heuristic_map[i, 0]
-                                      )
+    """
+    Manhattan distance to the goal on the toroidal grid
+    """
+    index = np.arange(M)
+    di = np.abs(index - goal_node[0])
+    dj = np.abs(index - goal_node[1])
+    heuristic_map = np.minimum(di, M - di)[:, None] + \
+        np.minimum(dj, M - dj)[None, :]
 
     return heuristic_map
 
@@ -7,6 +7,12 @@ import math
 from mpl_toolkits.mplot3d import Axes3D
 import matplotlib.pyplot as plt
 
+# inverse kinematics parameters
+IK_MAX_ITERATIONS = 500
+IK_TOLERANCE = 1e-3  # norm of the pose error
+IK_DAMPING = 0.05  # damping factor of damped least squares
+IK_GAIN = 0.5  # step size of each iteration
+
 
 class Link:
     def __init__(self, dh_params):
@@ -104,24 +110,9 @@ class NLinkArm:
         return np.array(basic_jacobian_mat).T
 
     def inverse_kinematics(self, ref_ee_pose, plot=False):
-        for cnt in range(500):
-            ee_pose = self.forward_kinematics()
-            diff_pose = np.array(ref_ee_pose) - ee_pose
-
-            basic_jacobian_mat = self.basic_jacobian()
-            alpha, beta, gamma = self.euler_angle()
-
-            K_zyz = np.array(
-                [[0, -math.sin(alpha), math.cos(alpha) * math.sin(beta)],
-                 [0, math.cos(alpha), math.sin(alpha) * math.sin(beta)],
-                 [1, 0, math.cos(beta)]])
-            K_alpha = np.identity(6)
-            K_alpha[3:, 3:] = K_zyz
-
-            theta_dot = np.dot(
-                np.dot(np.linalg.pinv(basic_jacobian_mat), K_alpha),
-                np.array(diff_pose))
-            self.update_joint_angles(theta_dot / 100.)
+        joint_angles, _, _ = inverse_kinematics_batch(
+            self.dh_params(), np.array([ref_ee_pose], dtype=float))
+        self.set_joint_angles(joint_angles[0])
 
         if plot:
             self.fig = plt.figure()
@@ -171,6 +162,10 @@ class NLinkArm:
 
         return alpha, beta, gamma
 
+    def dh_params(self):
+        return np.array([link.dh_params_ for link in self.link_list],
+                        dtype=float)
+
     def set_joint_angles(self, joint_angle_list):
         for i in range(len(self.link_list)):
             self.link_list[i].dh_params_[0] = joint_angle_list[i]
@@ -210,3 +205,138 @@ class NLinkArm:
         self.ax.set_ylim(-1, 1)
         self.ax.set_zlim(-1, 1)
         plt.show()
+
+
+def calc_transforms(dh_params, joint_angles):
+    """
+    Transformation matrices of all links for stacked joint angles
+
+    :param dh_params: DH parameters (n_link, 4) or for each arm (K, n_link, 4)
+    :param joint_angles: joint angles (K, n_link)
+    :return: transforms from the base to each link (K, n_link + 1, 4, 4),
+             the first one is the identity
+    """
+    joint_angles = np.asarray(joint_angles, dtype=float)
+    dh_params = np.broadcast_to(dh_params, joint_angles.shape + (4,))
+
+    st, ct = np.sin(joint_angles), np.cos(joint_angles)
+    sa, ca = np.sin(dh_params[..., 1]), np.cos(dh_params[..., 1])
+    a, d = dh_params[..., 2], dh_params[..., 3]
+    zero, one = np.zeros_like(st), np.ones_like(st)
+    link_trans = np.stack([
+        np.stack([ct, -st * ca, st * sa, a * ct], axis=-1),
+        np.stack([st, ct * ca, -ct * sa, a * st], axis=-1),
+        np.stack([zero, sa, ca, d], axis=-1),
+        np.stack([zero, zero, zero, one], axis=-1)], axis=-2)
+
+    n_arm, n_link = joint_angles.shape
+    trans = np.empty((n_arm, n_link + 1, 4, 4))
+    trans[:, 0] = np.identity(4)
+    for i in range(n_link):
+        trans[:, i + 1] = trans[:, i] @ link_trans[:, i]
+
+    return trans
+
+
+def calc_euler_angles(trans):
+    """
+    ZYZ euler angles of stacked transformation matrices (K, 4, 4),
+    same as NLinkArm.euler_angle
+    """
+    alpha = np.arctan2(trans[:, 1, 2], trans[:, 0, 2])
+    alpha = np.where(np.abs(alpha) <= math.pi / 2, alpha, alpha + math.pi)
+    alpha = np.where(np.abs(alpha) <= math.pi / 2, alpha,
+                     alpha - 2.0 * math.pi)
+    sin_a, cos_a = np.sin(alpha), np.cos(alpha)
+    beta = np.arctan2(trans[:, 0, 2] * cos_a + trans[:, 1, 2] * sin_a,
+                      trans[:, 2, 2])
+    gamma = np.arctan2(-trans[:, 0, 0] * sin_a + trans[:, 1, 0] * cos_a,
+                       -trans[:, 0, 1] * sin_a + trans[:, 1, 1] * cos_a)
+
+    return np.stack([alpha, beta, gamma], axis=-1)
+
+
+def forward_kinematics_batch(dh_params, joint_angles):
+    """
+    End effector poses [x, y, z, alpha, beta, gamma] (K, 6)
+    """
+    trans = calc_transforms(dh_params, joint_angles)[:, -1]
+
+    return np.hstack([trans[:, 0:3, 3], calc_euler_angles(trans)])
+
+
+def basic_jacobian_batch(trans):
+    """
+    Basic jacobians (K, 6, n_link) from the transforms of calc_transforms
+    """
+    ee_pos = trans[:, -1, 0:3, 3]
+    pos_prev = trans[:, :-1, 0:3, 3]
+    z_axis_prev = trans[:, :-1, 0:3, 2]
+    jacobian = np.concatenate(
+        [np.cross(z_axis_prev, ee_pos[:, None, :] - pos_prev), z_axis_prev],
+        axis=-1)
+
+    return jacobian.transpose(0, 2, 1)
+
+
+def inverse_kinematics_batch(dh_params, ref_ee_poses, joint_angles=None,
+                             max_iterations=IK_MAX_ITERATIONS,
+                             tolerance=IK_TOLERANCE, damping=IK_DAMPING,
+                             gain=IK_GAIN):
+    """
+    Damped least squares inverse kinematics for many target poses
+
+    Each target stops updating once its pose error is below tolerance.
+
+    :param dh_params: DH parameters (n_link, 4) or for each arm (K, n_link, 4),
+                      theta of them is the initial joint angle
+    :param ref_ee_poses: target poses [x, y, z, alpha, beta, gamma] (K, 6)
+    :param joint_angles: initial joint angles (K, n_link)
+    :return: joint angles (K, n_link), convergence flags (K,)
+             and number of iterations (K,)
+    """
+    ref_ee_poses = np.asarray(ref_ee_poses, dtype=float)
+    dh_params = np.asarray(dh_params, dtype=float)
+    n_arm = len(ref_ee_poses)
+    if joint_angles is None:
+        joint_angles = np.broadcast_to(dh_params[..., 0],
+                                       (n_arm, dh_params.shape[-2]))
+    joint_angles = np.array(joint_angles, dtype=float)
+    dh_params = np.broadcast_to(dh_params, joint_angles.shape + (4,))
+    is_converged = np.zeros(n_arm, dtype=bool)
+    n_iterations = np.full(n_arm, max_iterations)
+
+    active = np.arange(n_arm)
+    for iteration in range(max_iterations + 1):
+        trans = calc_transforms(dh_params[active], joint_angles[active])
+        ee_trans = trans[:, -1]
+        euler = calc_euler_angles(ee_trans)
+        diff_pose = ref_ee_poses[active] - np.hstack(
+            [ee_trans[:, 0:3, 3], euler])
+
+        is_done = np.linalg.norm(diff_pose, axis=1) < tolerance
+        is_converged[active[is_done]] = True
+        n_iterations[active[is_done]] = iteration
+        active, diff_pose = active[~is_done], diff_pose[~is_done]
+        if len(active) == 0 or iteration == max_iterations:
+            break
+        trans, euler = trans[~is_done], euler[~is_done]
+
+        # euler angle rates to angular velocity
+        alpha, beta = euler[:, 0], euler[:, 1]
+        zero, one = np.zeros_like(alpha), np.ones_like(alpha)
+        K_zyz = np.stack([
+            np.stack([zero, -np.sin(alpha), np.cos(alpha) * np.sin(beta)], -1),
+            np.stack([zero, np.cos(alpha), np.sin(alpha) * np.sin(beta)], -1),
+            np.stack([one, zero, np.cos(beta)], -1)], axis=-2)
+        error = np.hstack([diff_pose[:, 0:3],
+                           (K_zyz @ diff_pose[:, 3:, None])[..., 0]])
+
+        # damped least squares step: J^T (J J^T + lambda^2 I)^-1 error
+        J = basic_jacobian_batch(trans)
+        JJt = J @ J.transpose(0, 2, 1) + damping ** 2 * np.identity(6)
+        step = (J.transpose(0, 2, 1) @ np.linalg.solve(
+            JJt, error[..., None]))[..., 0]
+        joint_angles[active] += gain * step
+
+    return joint_angles, is_converged, n_iterations
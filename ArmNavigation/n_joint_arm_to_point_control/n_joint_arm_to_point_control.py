@@ -13,6 +13,8 @@ Kp = 2
 dt = 0.1
 N_LINKS = 10
 N_ITERATIONS = 10000
+IK_TOLERANCE = 0.1  # distance to the goal [m]
+IK_DAMPING = 0.1  # damping factor of damped least squares
 
 # States
 WAIT_FOR_NEW_GOAL = 1
@@ -64,15 +66,68 @@ def inverse_kinematics(link_lengths, joint_angles, goal_pos):
     """
     Calculates the inverse kinematics using the Jacobian inverse method.
     """
-    for iteration in range(N_ITERATIONS):
-        current_pos = forward_kinematics(link_lengths, joint_angles)
-        errors, distance = distance_to_goal(current_pos, goal_pos)
-        if distance < 0.1:
-            print("Solution found in %d iterations." % iteration)
-            return joint_angles, True
-        J = jacobian_inverse(link_lengths, joint_angles)
-        joint_angles = joint_angles + np.matmul(J, errors)
-    return joint_angles, False
+    joint_angles, is_converged, n_iterations = inverse_kinematics_batch(
+        link_lengths, [joint_angles], [goal_pos])
+    if is_converged[0]:
+        print("Solution found in %d iterations." % n_iterations[0])
+    return joint_angles[0], bool(is_converged[0])
+
+
+def inverse_kinematics_batch(link_lengths, joint_angles, goal_pos,
+                             max_iterations=N_ITERATIONS,
+                             tolerance=IK_TOLERANCE, damping=IK_DAMPING):
+    """
+    Calculates the inverse kinematics for K goals at once
+    with damped least squares steps.
+
+    Each goal stops updating once it is reached.
+
+    link_lengths: link lengths (n_links,) or for each arm (K, n_links)
+    joint_angles: initial joint angles (K, n_links)
+    goal_pos: goal positions (K, 2)
+
+    Returns joint angles (K, n_links), convergence flags (K,)
+    and number of iterations (K,)
+    """
+    joint_angles = np.array(joint_angles, dtype=float)
+    goal_pos = np.asarray(goal_pos, dtype=float)
+    link_lengths = np.broadcast_to(np.asarray(link_lengths, dtype=float),
+                                   joint_angles.shape)
+    n_goals = len(goal_pos)
+    is_converged = np.zeros(n_goals, dtype=bool)
+    n_iterations = np.full(n_goals, max_iterations)
+
+    # the workspace of a planar arm is an annulus,
+    # the goals out of it are not searched
+    goal_dist = np.hypot(goal_pos[:, 0], goal_pos[:, 1])
+    max_reach = np.sum(link_lengths, axis=-1)
+    min_reach = np.maximum(2 * np.max(link_lengths, axis=-1) - max_reach, 0)
+    active = np.flatnonzero((goal_dist < max_reach + tolerance) &
+                            (goal_dist > min_reach - tolerance))
+
+    for iteration in range(max_iterations):
+        J = jacobian_batch(link_lengths[active], joint_angles[active])
+        # the first column of J is the end effector position rotated by 90deg
+        errors = goal_pos[active] - np.stack([J[:, 1, 0], -J[:, 0, 0]],
+                                             axis=-1)
+        is_done = np.hypot(errors[:, 0], errors[:, 1]) < tolerance
+        is_converged[active[is_done]] = True
+        n_iterations[active[is_done]] = iteration
+        active, errors, J = active[~is_done], errors[~is_done], J[~is_done]
+        if len(active) == 0:
+            break
+
+        # damped least squares step: J^T (J J^T + lambda^2 I)^-1 errors,
+        # with the closed form inverse of the 2x2 matrix
+        a = np.sum(J[:, 0] ** 2, axis=-1) + damping ** 2
+        b = np.sum(J[:, 0] * J[:, 1], axis=-1)
+        c = np.sum(J[:, 1] ** 2, axis=-1) + damping ** 2
+        det = a * c - b * b
+        u = (c * errors[:, 0] - b * errors[:, 1]) / det
+        v = (a * errors[:, 1] - b * errors[:, 0]) / det
+        joint_angles[active] += J[:, 0] * u[:, None] + J[:, 1] * v[:, None]
+
+    return joint_angles, is_converged, n_iterations
 
 
 def get_random_goal():
@@ -145,6 +200,30 @@ def jacobian_inverse(link_lengths, joint_angles):
     return np.linalg.pinv(J)
 
 
+def forward_kinematics_batch(link_lengths, joint_angles):
+    """
+    End effector positions (K, 2) for joint angles (K, n_links)
+    """
+    link_angles = np.cumsum(joint_angles, axis=-1)
+    return np.stack([np.sum(link_lengths * np.cos(link_angles), axis=-1),
+                     np.sum(link_lengths * np.sin(link_angles), axis=-1)],
+                    axis=-1)
+
+
+def jacobian_batch(link_lengths, joint_angles):
+    """
+    Jacobians (K, 2, n_links) of the end effector position
+    for joint angles (K, n_links)
+    """
+    link_angles = np.cumsum(joint_angles, axis=-1)
+    # sums over the links from each joint to the end effector
+    dx = -np.cumsum((link_lengths * np.sin(link_angles))[..., ::-1],
+                    axis=-1)[..., ::-1]
+    dy = np.cumsum((link_lengths * np.cos(link_angles))[..., ::-1],
+                   axis=-1)[..., ::-1]
+    return np.stack([dx, dy], axis=-2)
+
+
 def distance_to_goal(current_pos, goal_pos):
     x_diff = goal_pos[0] - current_pos[0]
     y_diff = goal_pos[1] - current_pos[1]
@@ -24,29 +24,64 @@ def circle_fitting(x, y):
                 error: prediction error
     """
 
-    sumx = sum(x)
-    sumy = sum(y)
-    sumx2 = sum([ix ** 2 for ix in x])
-    sumy2 = sum([iy ** 2 for iy in y])
-    sumxy = sum([ix * iy for (ix, iy) in zip(x, y)])
+    cxe, cye, re, error = circle_fitting_batch(x, y, np.zeros(len(x), int))
+
+    return (float(cxe[0]), float(cye[0]), float(re[0]), float(error[0]))
+
+
+def circle_fitting_batch(x, y, labels):
+    """
+    Circle Fitting with least squared for many clusters at once
+        input: point x-y positions
+               labels: cluster label (0, 1, ...) of each point
+        output  cxe x center position array for each label
+                cye y center position array for each label
+                re  radius array of circle for each label
+                error: prediction error array for each label
+        a label with less than 3 points, or with points on a line, gets nan
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    labels = np.asarray(labels, dtype=int)
+    n_label = labels.max() + 1 if len(labels) else 0
+
+    def group_sum(w):
+        return np.bincount(labels, w, minlength=n_label)
+
+    x2, y2 = x ** 2, y ** 2
+    n = group_sum(None)
+    sumx = group_sum(x)
+    sumy = group_sum(y)
+    sumx2 = group_sum(x2)
+    sumy2 = group_sum(y2)
+    sumxy = group_sum(x * y)
 
     F = np.array([[sumx2, sumxy, sumx],
                   [sumxy, sumy2, sumy],
-                  [sumx, sumy, len(x)]])
+                  [sumx, sumy, n]]).transpose(2, 0, 1)
 
-    G = np.array([[-sum([ix ** 3 + ix * iy ** 2 for (ix, iy) in zip(x, y)])],
-                  [-sum([ix ** 2 * iy + iy ** 3 for (ix, iy) in zip(x, y)])],
-                  [-sum([ix ** 2 + iy ** 2 for (ix, iy) in zip(x, y)])]])
+    G = np.array([-group_sum(x * x2 + x * y2),
+                  -group_sum(x2 * y + y * y2),
+                  -(sumx2 + sumy2)]).T
 
-    T = np.linalg.inv(F).dot(G)
+    T = np.full((n_label, 3), np.nan)
+    is_valid = n >= 3
+    # collinear points give a singular F, drop them before the batch solve
+    with np.errstate(divide="ignore", invalid="ignore"):
+        is_valid[is_valid] = np.linalg.cond(F[is_valid]) < \
+            1.0 / np.finfo(float).eps
+    if np.any(is_valid):
+        T[is_valid] = np.linalg.solve(F[is_valid],
+                                      G[is_valid][..., None])[..., 0]
 
-    cxe = float(T[0] / -2)
-    cye = float(T[1] / -2)
-    re = math.sqrt(cxe**2 + cye**2 - T[2])
+    cxe = T[:, 0] / -2
+    cye = T[:, 1] / -2
+    with np.errstate(invalid="ignore"):
+        re = np.sqrt(cxe ** 2 + cye ** 2 - T[:, 2])
 
-    error = sum([np.hypot(cxe - ix, cye - iy) - re for (ix, iy) in zip(x, y)])
+    error = group_sum(np.hypot(cxe[labels] - x, cye[labels] - y) - re[labels])
 
-    return (cxe, cye, re, error)
+    return cxe, cye, re, error
 
 
 def get_sample_points(cx, cy, cr, angle_reso):
@@ -71,23 +106,21 @@ def get_sample_points(cx, cy, cr, angle_reso):
 
 
 def ray_casting_filter(xl, yl, thetal, rangel, angle_reso):
-    rx, ry = [], []
-    rangedb = [float("inf") for _ in range(
-        int(math.floor((math.pi * 2.0) / angle_reso)) + 1)]
+    n_angle = int(math.floor((math.pi * 2.0) / angle_reso)) + 1
+    angle_ids = np.floor(np.asarray(thetal) / angle_reso).astype(int)
+    angle_ids %= n_angle  # negative ids from the end of the bins
 
-    for i, _ in enumerate(thetal):
-        angleid = math.floor(thetal[i] / angle_reso)
+    # the nearest point for each angle bin
+    rangel = np.asarray(rangel, dtype=float)
+    order = np.lexsort((rangel, angle_ids))
+    angle_ids, first = np.unique(angle_ids[order], return_index=True)
+    ranges = rangel[order[first]]
 
-        if rangedb[angleid] > rangel[i]:
-            rangedb[angleid] = rangel[i]
+    t = angle_ids * angle_reso
+    rx = ranges * np.cos(t)
+    ry = ranges * np.sin(t)
 
-    for i, _ in enumerate(rangedb):
-        t = i * angle_reso
-        if rangedb[i] != float("inf"):
-            rx.append(rangedb[i] * math.cos(t))
-            ry.append(rangedb[i] * math.sin(t))
-
-    return rx, ry
+    return rx.tolist(), ry.tolist()
 
 
 def plot_circle(x, y, size, color="-b"):  # pragma: no cover
@@ -6,9 +6,9 @@ author: Atsushi Sakai (@Atsushi_twi)
 
 """
 
-import math
 import numpy as np
 import matplotlib.pyplot as plt
+from scipy.spatial import cKDTree
 from scipy.stats import norm
 
 EXTEND_AREA = 10.0  # [m] grid map extention length
@@ -16,29 +16,104 @@ EXTEND_AREA = 10.0  # [m] grid map extention length
 show_animation = True
 
 
-def generate_gaussian_grid_map(ox, oy, xyreso, std):
-
-    minx, miny, maxx, maxy, xw, yw = calc_grid_map_config(ox, oy, xyreso)
-
-    gmap = [[0.0 for i in range(yw)] for i in range(xw)]
+class GaussianGridMap:
+    """
+    Gaussian likelihood grid map
+
+    The distance from every cell to its nearest obstacle comes from a
+    batched KD-tree query and the gaussian cdf is applied to the whole
+    map at once. When some obstacles move, only the cells close enough
+    to them to change are recomputed.
+    """
+
+    # cells further than this from a moved obstacle (in std) are left as
+    # they are, their value stays below 1e-15
+    UPDATE_RANGE = 8.0
+
+    def __init__(self, ox, oy, xyreso, std):
+        self.xyreso = xyreso
+        self.std = std
+        self.minx, self.miny, self.maxx, self.maxy, self.xw, self.yw = \
+            calc_grid_map_config(ox, oy, xyreso)
+
+        self.ox = np.array(ox, dtype=float)
+        self.oy = np.array(oy, dtype=float)
+        self.obstacle_tree = cKDTree(np.stack([self.ox, self.oy], axis=1))
+        x = np.arange(self.xw) * xyreso + self.minx
+        y = np.arange(self.yw) * xyreso + self.miny
+        self.x, self.y = np.meshgrid(x, y, indexing="ij")
+
+        self.gmap = self.calc_gaussian_map(0, self.xw, 0, self.yw)
+
+    def calc_gaussian_map(self, ix0, ix1, iy0, iy1):
+        """
+        gaussian likelihood of the grid window [ix0:ix1, iy0:iy1]
+        """
+        x, y = self.x[ix0:ix1, iy0:iy1], self.y[ix0:ix1, iy0:iy1]
+
+        # Search minimum distance
+        mindis, _ = self.obstacle_tree.query(
+            np.stack([x.ravel(), y.ravel()], axis=1))
+
+        pdf = (1.0 - norm.cdf(mindis, 0.0, self.std))
+        return pdf.reshape(x.shape)
+
+    def update_obstacles(self, ox, oy):
+        """
+        move the obstacles and refresh the likelihood of the cells within
+        UPDATE_RANGE std of the old or new position of a moved obstacle
+
+        The map extent is set by the first obstacles, so an obstacle
+        leaving it or a change of the number of obstacles leaves the map
+        untouched and returns False.
+        """
+        ox = np.array(ox, dtype=float)
+        oy = np.array(oy, dtype=float)
+        if len(ox) != len(self.ox) or \
+                ox.min() < self.minx or ox.max() > self.maxx or \
+                oy.min() < self.miny or oy.max() > self.maxy:
+            return False
+
+        window = calc_update_window(
+            self.ox, self.oy, ox, oy, self.UPDATE_RANGE * self.std,
+            self.minx, self.miny, self.xyreso, self.xw, self.yw)
+        if window is None:
+            return True
+        self.ox, self.oy = ox, oy
+        self.obstacle_tree = cKDTree(np.stack([ox, oy], axis=1))
+
+        ix0, ix1, iy0, iy1 = window
+        self.gmap[ix0:ix1, iy0:iy1] = self.calc_gaussian_map(ix0, ix1,
+                                                             iy0, iy1)
+
+        return True
+
+
+def calc_update_window(old_ox, old_oy, ox, oy, r, minx, miny, reso, xw, yw):
+    """
+    grid window (ix0, ix1, iy0, iy1) of the cells within r of the old or
+    new position of a moved obstacle, None when no obstacle moved
+    """
+    moved = (ox != old_ox) | (oy != old_oy)
+    if not moved.any():
+        return None
+    x = np.concatenate([old_ox[moved], ox[moved]])
+    y = np.concatenate([old_oy[moved], oy[moved]])
+
+    ix0 = max(int(np.floor((x.min() - r - minx) / reso)), 0)
+    ix1 = min(int(np.ceil((x.max() + r - minx) / reso)) + 1, xw)
+    iy0 = max(int(np.floor((y.min() - r - miny) / reso)), 0)
+    iy1 = min(int(np.ceil((y.max() + r - miny) / reso)) + 1, yw)
+
+    return ix0, ix1, iy0, iy1
 
-    for ix in range(xw):
-        for iy in range(yw):
 
-            x = ix * xyreso + minx
-            y = iy * xyreso + miny
-
-            # Search minimum distance
-            mindis = float("inf")
-            for (iox, ioy) in zip(ox, oy):
-                d = math.hypot(iox - x, ioy - y)
-                if mindis >= d:
-                    mindis = d
+def generate_gaussian_grid_map(ox, oy, xyreso, std):
 
-            pdf = (1.0 - norm.cdf(mindis, 0.0, std))
-            gmap[ix][iy] = pdf
+    grid_map = GaussianGridMap(ox, oy, xyreso, std)
 
-    return gmap, minx, maxx, miny, maxy
+    return grid_map.gmap, grid_map.minx, grid_map.maxx, grid_map.miny, \
+        grid_map.maxy
 
 
 def calc_grid_map_config(ox, oy, xyreso):
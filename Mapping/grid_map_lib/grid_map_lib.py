@@ -36,7 +36,8 @@ class GridMap:
         self.left_lower_y = self.center_y - self.height / 2.0 * self.resolution
 
         self.ndata = self.width * self.height
-        self.data = [init_val] * self.ndata
+        # data[y_ind, x_ind], data.flat[grid_ind] for the grid index
+        self.data = np.full((self.height, self.width), init_val, dtype=float)
 
     def get_value_from_xy_index(self, x_ind, y_ind):
         """get_value_from_xy_index
@@ -50,10 +51,42 @@ class GridMap:
         grid_ind = self.calc_grid_index_from_xy_index(x_ind, y_ind)
 
         if 0 <= grid_ind < self.ndata:
-            return self.data[grid_ind]
+            return self.data.flat[grid_ind]
         else:
             return None
 
+    def get_values_from_xy_index(self, x_inds, y_inds, default_val=np.nan):
+        """get_values_from_xy_index
+
+        bulk version of get_value_from_xy_index,
+        default_val is returned for the indexes out of grid map area
+
+        :param x_inds: x index array
+        :param y_inds: y index array
+        :param default_val: value out of grid map area
+        """
+        x_inds = np.asarray(x_inds, dtype=int)
+        y_inds = np.asarray(y_inds, dtype=int)
+        values = np.full(x_inds.shape, default_val, dtype=float)
+        is_inside = self.check_inside_xy_index(x_inds, y_inds)
+        values[is_inside] = self.data[y_inds[is_inside], x_inds[is_inside]]
+
+        return values
+
+    def get_values_from_xy_pos(self, x_pos, y_pos, default_val=np.nan):
+        """get_values_from_xy_pos
+
+        bulk version of getting values from positions,
+        default_val is returned for the positions out of grid map area
+
+        :param x_pos: x position array [m]
+        :param y_pos: y position array [m]
+        :param default_val: value out of grid map area
+        """
+        x_inds, y_inds = self.get_xy_indexes_from_xy_pos(x_pos, y_pos)
+
+        return self.get_values_from_xy_index(x_inds, y_inds, default_val)
+
     def get_xy_index_from_xy_pos(self, x_pos, y_pos):
         """get_xy_index_from_xy_pos
 
@@ -67,6 +100,26 @@ class GridMap:
 
         return x_ind, y_ind
 
+    def get_xy_indexes_from_xy_pos(self, x_pos, y_pos):
+        """get_xy_indexes_from_xy_pos
+
+        bulk version of get_xy_index_from_xy_pos,
+        the indexes are not checked against the grid map area
+
+        :param x_pos: x position array [m]
+        :param y_pos: y position array [m]
+        """
+        x_inds = np.floor((np.asarray(x_pos) - self.left_lower_x) /
+                          self.resolution).astype(int)
+        y_inds = np.floor((np.asarray(y_pos) - self.left_lower_y) /
+                          self.resolution).astype(int)
+
+        return x_inds, y_inds
+
+    def check_inside_xy_index(self, x_inds, y_inds):
+        return (0 <= x_inds) & (x_inds < self.width) & \
+               (0 <= y_inds) & (y_inds < self.height)
+
     def set_value_from_xy_pos(self, x_pos, y_pos, val):
         """set_value_from_xy_pos
 
@@ -102,11 +155,43 @@ class GridMap:
         grid_ind = int(y_ind * self.width + x_ind)
 
         if 0 <= grid_ind < self.ndata:
-            self.data[grid_ind] = val
+            self.data.flat[grid_ind] = val
             return True  # OK
         else:
             return False  # NG
 
+    def set_values_from_xy_pos(self, x_pos, y_pos, val):
+        """set_values_from_xy_pos
+
+        bulk version of setting values from positions,
+        return bool flags, which mean setting value is succeeded or not
+
+        :param x_pos: x position array [m]
+        :param y_pos: y position array [m]
+        :param val: grid value, or an array of values
+        """
+        x_inds, y_inds = self.get_xy_indexes_from_xy_pos(x_pos, y_pos)
+
+        return self.set_values_from_xy_index(x_inds, y_inds, val)
+
+    def set_values_from_xy_index(self, x_inds, y_inds, val):
+        """set_values_from_xy_index
+
+        bulk version of setting values from indexes,
+        return bool flags, which mean setting value is succeeded or not
+
+        :param x_inds: x index array
+        :param y_inds: y index array
+        :param val: grid value, or an array of values
+        """
+        x_inds = np.asarray(x_inds, dtype=int)
+        y_inds = np.asarray(y_inds, dtype=int)
+        is_inside = self.check_inside_xy_index(x_inds, y_inds)
+        val = np.broadcast_to(val, x_inds.shape)
+        self.data[y_inds[is_inside], x_inds[is_inside]] = val[is_inside]
+
+        return is_inside
+
     def set_value_from_polygon(self, pol_x, pol_y, val, inside=True):
         """set_value_from_polygon
 
@@ -124,15 +209,15 @@ class GridMap:
             pol_y.append(pol_y[0])
 
         # setting value for all grid
-        for x_ind in range(self.width):
-            for y_ind in range(self.height):
-                x_pos, y_pos = self.calc_grid_central_xy_position_from_xy_index(
-                    x_ind, y_ind)
+        x_pos = self.calc_grid_central_xy_position_from_index(
+            np.arange(self.width), self.left_lower_x)
+        y_pos = self.calc_grid_central_xy_position_from_index(
+            np.arange(self.height), self.left_lower_y)
+        x_pos, y_pos = np.meshgrid(x_pos, y_pos)
 
-                flag = self.check_inside_polygon(x_pos, y_pos, pol_x, pol_y)
+        flag = self.check_inside_polygon(x_pos, y_pos, pol_x, pol_y)
 
-                if flag is inside:
-                    self.set_value_from_xy_index(x_ind, y_ind, val)
+        self.data[flag == inside] = val
 
     def calc_grid_index_from_xy_index(self, x_ind, y_ind):
         grid_ind = int(y_ind * self.width + x_ind)
@@ -166,27 +251,35 @@ class GridMap:
             return False
 
     def expand_grid(self):
-        xinds, yinds = [], []
-
-        for ix in range(self.width):
-            for iy in range(self.height):
-                if self.check_occupied_from_xy_index(ix, iy):
-                    xinds.append(ix)
-                    yinds.append(iy)
-
-        for (ix, iy) in zip(xinds, yinds):
-            self.set_value_from_xy_index(ix + 1, iy, val=1.0)
-            self.set_value_from_xy_index(ix, iy + 1, val=1.0)
-            self.set_value_from_xy_index(ix + 1, iy + 1, val=1.0)
-            self.set_value_from_xy_index(ix - 1, iy, val=1.0)
-            self.set_value_from_xy_index(ix, iy - 1, val=1.0)
-            self.set_value_from_xy_index(ix - 1, iy - 1, val=1.0)
+        """expand_grid
+
+        dilate the occupied grids, as a binary dilation on the grid index
+        """
+        data = self.data.ravel()
+        is_occupied = data >= 1.0
+        is_expanded = np.zeros_like(is_occupied)
+        for offset in [1, self.width, self.width + 1]:
+            is_expanded[offset:] |= is_occupied[:-offset]
+            is_expanded[:-offset] |= is_occupied[offset:]
+
+        data[is_expanded] = 1.0
 
     @staticmethod
     def check_inside_polygon(iox, ioy, x, y):
+        """check_inside_polygon
+
+        ray crossing test, iox and ioy can be arrays of points
+
+        :param iox: x positions
+        :param ioy: y positions
+        :param x: x position list for a ring polygon
+        :param y: y position list for a ring polygon
+        """
 
+        iox = np.asarray(iox)
+        ioy = np.asarray(ioy)
         npoint = len(x) - 1
-        inside = False
+        inside = np.zeros(np.broadcast(iox, ioy).shape, dtype=bool)
         for i1 in range(npoint):
             i2 = (i1 + 1) % (npoint + 1)
 
@@ -194,13 +287,15 @@ class GridMap:
                 min_x, max_x = x[i2], x[i1]
             else:
                 min_x, max_x = x[i1], x[i2]
-            if not min_x < iox < max_x:
+            if min_x == max_x:
                 continue
 
             tmp1 = (y[i2] - y[i1]) / (x[i2] - x[i1])
-            if (y[i1] + tmp1 * (iox - x[i1]) - ioy) > 0.0:
-                inside = not inside
+            inside ^= (min_x < iox) & (iox < max_x) & \
+                ((y[i1] + tmp1 * (iox - x[i1]) - ioy) > 0.0)
 
+        if inside.ndim == 0:
+            return bool(inside)
         return inside
 
     def print_grid_map_info(self):
@@ -215,7 +310,7 @@ class GridMap:
 
     def plot_grid_map(self, ax=None):
 
-        grid_data = np.reshape(np.array(self.data), (self.height, self.width))
+        grid_data = self.data
         if not ax:
             fig, ax = plt.subplots()
         heat_map = ax.pcolor(grid_data, cmap="Blues", vmin=0.0, vmax=1.0)
@@ -6,80 +6,168 @@ author: Atsushi Sakai (@Atsushi_twi)
 
 """
 
-import math
 import matplotlib.pyplot as plt
+import numpy as np
 import random
 
 # k means parameters
 MAX_LOOP = 10
 DCOST_TH = 0.1
+CHUNK_SIZE = 8192  # number of points in a distance matrix chunk
 show_animation = True
 
 
-def kmeans_clustering(rx, ry, nc):
-    clusters = Clusters(rx, ry, nc)
-    clusters.calc_centroid()
+def kmeans_clustering(rx, ry, nc, init_center=None, batch_size=None,
+                      rng=None):
+    """
+    k-means clustering
+
+    :param rx: x positions of points
+    :param ry: y positions of points
+    :param nc: number of clusters
+    :param init_center: (center_x, center_y) for warm start,
+                        e.g. the centroids of the previous frame.
+                        k-means++ seeding is used when it is None
+    :param batch_size: mini-batch size, full batch update when it is None
+    :param rng: np.random.Generator or seed for the initial labels,
+                the seeding and the mini-batches
+    """
+    clusters = Clusters(rx, ry, nc, rng)
+    if init_center is None:
+        clusters.init_centroid()
+    else:
+        clusters.set_centroid(*init_center)
 
     pre_cost = float("inf")
     for loop in range(MAX_LOOP):
         print("loop:", loop)
-        cost = clusters.update_clusters()
-        clusters.calc_centroid()
+        if batch_size is None:
+            cost, n_changed = clusters.update_clusters()
+            clusters.calc_centroid()
+            if n_changed == 0:
+                break
+        else:
+            cost = clusters.update_mini_batch(batch_size)
 
         d_cost = abs(cost - pre_cost)
         if d_cost < DCOST_TH:
             break
         pre_cost = cost
 
+    if batch_size is not None:
+        clusters.update_clusters()
+
     return clusters
 
 
 class Clusters:
 
-    def __init__(self, x, y, n_label):
-        self.x = x
-        self.y = y
+    def __init__(self, x, y, n_label, rng=None):
+        self.rng = np.random.default_rng(rng)
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
         self.n_data = len(self.x)
         self.n_label = n_label
-        self.labels = [random.randint(0, n_label - 1)
-                       for _ in range(self.n_data)]
-        self.center_x = [0.0 for _ in range(n_label)]
-        self.center_y = [0.0 for _ in range(n_label)]
+        self.labels = self.rng.integers(0, n_label, self.n_data)
+        self.center_x = np.zeros(n_label)
+        self.center_y = np.zeros(n_label)
+        # number of points assigned to each center in mini-batch updates
+        self.center_count = np.zeros(n_label)
 
     def plot_cluster(self):
         for label in set(self.labels):
             x, y = self._get_labeled_x_y(label)
             plt.plot(x, y, ".")
 
-    def calc_centroid(self):
-        for label in set(self.labels):
-            x, y = self._get_labeled_x_y(label)
-            n_data = len(x)
-            self.center_x[label] = sum(x) / n_data
-            self.center_y[label] = sum(y) / n_data
+    def init_centroid(self):
+        """
+        k-means++ seeding
+        """
+        ids = [self.rng.integers(self.n_data)]
+        min_d2 = np.full(self.n_data, np.inf)
+        for _ in range(1, self.n_label):
+            min_d2 = np.minimum(min_d2, (self.x - self.x[ids[-1]]) ** 2 +
+                                (self.y - self.y[ids[-1]]) ** 2)
+            total = min_d2.sum()
+            if total <= 0.0:  # fewer distinct points than clusters
+                ids.append(self.rng.integers(self.n_data))
+                continue
+            cum_d2 = np.cumsum(min_d2)
+            ids.append(min(int(np.searchsorted(
+                cum_d2, self.rng.random() * total, side="right")),
+                self.n_data - 1))
+
+        self.set_centroid(self.x[ids], self.y[ids])
+
+    def set_centroid(self, center_x, center_y):
+        self.center_x = np.array(center_x, dtype=float)
+        self.center_y = np.array(center_y, dtype=float)
 
-    def update_clusters(self):
-        cost = 0.0
-
-        for ip in range(self.n_data):
-            px = self.x[ip]
-            py = self.y[ip]
-
-            dx = [icx - px for icx in self.center_x]
-            dy = [icy - py for icy in self.center_y]
+    def calc_centroid(self):
+        n_data = self.n_data_per_label()
+        sum_x = np.bincount(self.labels, self.x, minlength=self.n_label)
+        sum_y = np.bincount(self.labels, self.y, minlength=self.n_label)
 
-            dist_list = [math.hypot(idx, idy) for (idx, idy) in zip(dx, dy)]
-            min_dist = min(dist_list)
-            min_id = dist_list.index(min_dist)
-            self.labels[ip] = min_id
-            cost += min_dist
+        # a center without points keeps its position
+        has_data = n_data > 0
+        self.center_x[has_data] = sum_x[has_data] / n_data[has_data]
+        self.center_y[has_data] = sum_y[has_data] / n_data[has_data]
 
-        return cost
+    def update_clusters(self):
+        """
+        assign all points to the nearest centers
+
+        :return: cost (sum of distances), number of changed labels
+        """
+        labels, dist = self.calc_nearest_center(self.x, self.y)
+        n_changed = np.count_nonzero(labels != self.labels)
+        self.labels = labels
+
+        return dist.sum(), n_changed
+
+    def update_mini_batch(self, batch_size):
+        """
+        mini-batch k-means update with per center learning rates
+
+        :return: cost of the batch scaled to the whole data
+        """
+        ids = self.rng.integers(0, self.n_data, min(batch_size, self.n_data))
+        x, y = self.x[ids], self.y[ids]
+        labels, dist = self.calc_nearest_center(x, y)
+
+        n_data = np.bincount(labels, minlength=self.n_label)
+        sum_x = np.bincount(labels, x, minlength=self.n_label)
+        sum_y = np.bincount(labels, y, minlength=self.n_label)
+        self.center_count += n_data
+
+        has_data = n_data > 0
+        count = self.center_count[has_data]
+        self.center_x[has_data] += (sum_x[has_data] - n_data[has_data] *
+                                    self.center_x[has_data]) / count
+        self.center_y[has_data] += (sum_y[has_data] - n_data[has_data] *
+                                    self.center_y[has_data]) / count
+
+        return dist.sum() * self.n_data / len(ids)
+
+    def n_data_per_label(self):
+        return np.bincount(self.labels, minlength=self.n_label)
+
+    def calc_nearest_center(self, x, y):
+        labels = np.empty(len(x), dtype=int)
+        dist = np.empty(len(x))
+        for i in range(0, len(x), CHUNK_SIZE):
+            dx = x[i:i + CHUNK_SIZE, None] - self.center_x[None, :]
+            dy = y[i:i + CHUNK_SIZE, None] - self.center_y[None, :]
+            d = np.hypot(dx, dy)
+            labels[i:i + CHUNK_SIZE] = np.argmin(d, axis=1)
+            dist[i:i + CHUNK_SIZE] = d[np.arange(len(d)),
+                                       labels[i:i + CHUNK_SIZE]]
+
+        return labels, dist
 
     def _get_labeled_x_y(self, target_label):
-        x = [self.x[i] for i, label in enumerate(self.labels) if label == target_label]
-        y = [self.y[i] for i, label in enumerate(self.labels) if label == target_label]
-        return x, y
+        mask = self.labels == target_label
+        return self.x[mask], self.y[mask]
 
 
 def calc_raw_data(cx, cy, n_points, rand_d):
@@ -119,6 +207,7 @@ def main():
     sim_time = 15.0
     dt = 1.0
     time = 0.0
+    clusters = None
 
     while time <= sim_time:
         print("Time:", time)
@@ -128,7 +217,11 @@ def main():
         cx, cy = update_positions(cx, cy)
         raw_x, raw_y = calc_raw_data(cx, cy, n_points, rand_d)
 
-        clusters = kmeans_clustering(raw_x, raw_y, n_cluster)
+        # warm start from the centroids of the previous frame
+        init_center = None
+        if clusters is not None:
+            init_center = (clusters.center_x, clusters.center_y)
+        clusters = kmeans_clustering(raw_x, raw_y, n_cluster, init_center)
 
         # for animation
         if show_animation:  # pragma: no cover
@@ -7,10 +7,10 @@ author: Erno Horvath, Csaba Hajdu based on Atsushi Sakai's scripts
 """
 
 import math
-from collections import deque
 
 import matplotlib.pyplot as plt
 import numpy as np
+from scipy import ndimage
 
 EXTEND_AREA = 1.0
 
@@ -19,15 +19,9 @@ def file_read(f):
     """
     Reading LIDAR laser beams (angles and corresponding distance data)
     """
-    with open(f) as data:
-        measures = [line.split(",") for line in data]
-    angles = []
-    distances = []
-    for measure in measures:
-        angles.append(float(measure[0]))
-        distances.append(float(measure[1]))
-    angles = np.array(angles)
-    distances = np.array(distances)
+    measures = np.loadtxt(f, delimiter=",", ndmin=2)
+    angles = measures[:, 0]
+    distances = measures[:, 1]
     return angles, distances
 
 
@@ -76,6 +70,51 @@ def bresenham(start, end):
     return points
 
 
+def bresenham_lines(starts, ends):
+    """
+    Bresenham's line algorithm for many lines at once
+    The cells of each line are the same as the ones of bresenham(), in
+    the same order, they are computed in closed form instead of stepping
+    along the line.
+    starts: start cells (n, 2), or a single start cell shared by all lines
+    ends: end cells (n, 2)
+    returns x and y cell indexes of all the lines and the line index
+    of each cell
+    """
+    ends = np.asarray(ends, dtype=int).reshape(-1, 2)
+    starts = np.broadcast_to(np.asarray(starts, dtype=int), ends.shape)
+    x1, y1 = starts[:, 0], starts[:, 1]
+    x2, y2 = ends[:, 0], ends[:, 1]
+    # rotate steep lines
+    is_steep = np.abs(y2 - y1) > np.abs(x2 - x1)
+    x1, y1 = np.where(is_steep, y1, x1), np.where(is_steep, x1, y1)
+    x2, y2 = np.where(is_steep, y2, x2), np.where(is_steep, x2, y2)
+    # swap start and end points if necessary
+    swapped = x1 > x2
+    x1, x2 = np.where(swapped, x2, x1), np.where(swapped, x1, x2)
+    y1, y2 = np.where(swapped, y2, y1), np.where(swapped, y1, y2)
+    dx = x2 - x1
+    abs_dy = np.abs(y2 - y1)
+    error = dx // 2
+    y_step = np.where(y1 < y2, 1, -1)
+
+    # the k-th cell of a line is x1 + k, and y moves one step each time
+    # the error, decreased by |dy| at each cell, gets below zero
+    n_cells = dx + 1
+    line_ids = np.repeat(np.arange(len(dx)), n_cells)
+    k = np.arange(n_cells.sum()) - np.repeat(np.cumsum(n_cells) - n_cells,
+                                             n_cells)
+    # swapped lines go from the end point, so their cells are reversed
+    k = np.where(swapped[line_ids], dx[line_ids] - k, k)
+    n_y_steps = -((error[line_ids] - k * abs_dy[line_ids]) //
+                  np.maximum(dx, 1)[line_ids])
+    x = x1[line_ids] + k
+    y = y1[line_ids] + y_step[line_ids] * n_y_steps
+
+    steep = is_steep[line_ids]
+    return np.where(steep, y, x), np.where(steep, x, y), line_ids
+
+
 def calc_grid_map_config(ox, oy, xy_resolution):
     """
     Calculates the size, and the maximum distances according to the the
@@ -106,21 +145,20 @@ def init_flood_fill(center_point, obstacle_points, xy_points, min_coord,
     xy_points: (x,y) point pairs
     """
     center_x, center_y = center_point
-    prev_ix, prev_iy = center_x - 1, center_y
     ox, oy = obstacle_points
     xw, yw = xy_points
     min_x, min_y = min_coord
     occupancy_map = (np.ones((xw, yw))) * 0.5
-    for (x, y) in zip(ox, oy):
-        # x coordinate of the the occupied area
-        ix = int(round((x - min_x) / xy_resolution))
-        # y coordinate of the the occupied area
-        iy = int(round((y - min_y) / xy_resolution))
-        free_area = bresenham((prev_ix, prev_iy), (ix, iy))
-        for fa in free_area:
-            occupancy_map[fa[0]][fa[1]] = 0  # free area 0.0
-        prev_ix = ix
-        prev_iy = iy
+    # x coordinate of the the occupied area
+    ix = np.round((np.asarray(ox) - min_x) / xy_resolution).astype(int)
+    # y coordinate of the the occupied area
+    iy = np.round((np.asarray(oy) - min_y) / xy_resolution).astype(int)
+    # lines between consecutive occupied points
+    prev_ix = np.concatenate(([center_x - 1], ix[:-1]))
+    prev_iy = np.concatenate(([center_y], iy[:-1]))
+    free_x, free_y, _ = bresenham_lines(
+        np.stack((prev_ix, prev_iy), axis=1), np.stack((ix, iy), axis=1))
+    occupancy_map[free_x, free_y] = 0  # free area 0.0
     return occupancy_map
 
 
@@ -129,33 +167,15 @@ def flood_fill(center_point, occupancy_map):
     center_point: starting point (x,y) of fill
     occupancy_map: occupancy map generated from Bresenham ray-tracing
     """
-    # Fill empty areas with queue method
+    # Fill the unknown areas connected to the neighbors of the center,
+    # which are the 4-connected components of the unknown cells
     sx, sy = occupancy_map.shape
-    fringe = deque()
-    fringe.appendleft(center_point)
-    while fringe:
-        n = fringe.pop()
-        nx, ny = n
-        # West
-        if nx > 0:
-            if occupancy_map[nx - 1, ny] == 0.5:
-                occupancy_map[nx - 1, ny] = 0.0
-                fringe.appendleft((nx - 1, ny))
-        # East
-        if nx < sx - 1:
-            if occupancy_map[nx + 1, ny] == 0.5:
-                occupancy_map[nx + 1, ny] = 0.0
-                fringe.appendleft((nx + 1, ny))
-        # North
-        if ny > 0:
-            if occupancy_map[nx, ny - 1] == 0.5:
-                occupancy_map[nx, ny - 1] = 0.0
-                fringe.appendleft((nx, ny - 1))
-        # South
-        if ny < sy - 1:
-            if occupancy_map[nx, ny + 1] == 0.5:
-                occupancy_map[nx, ny + 1] = 0.0
-                fringe.appendleft((nx, ny + 1))
+    nx, ny = center_point
+    labels, _ = ndimage.label(occupancy_map == 0.5)
+    fill_labels = [labels[ix, iy] for (ix, iy) in
+                   [(nx - 1, ny), (nx + 1, ny), (nx, ny - 1), (nx, ny + 1)]
+                   if 0 <= ix < sx and 0 <= iy < sy and labels[ix, iy] > 0]
+    occupancy_map[np.isin(labels, fill_labels)] = 0.0
 
 
 def generate_ray_casting_grid_map(ox, oy, xy_resolution, breshen=True):
@@ -171,39 +191,99 @@ def generate_ray_casting_grid_map(ox, oy, xy_resolution, breshen=True):
         round(-min_x / xy_resolution))  # center x coordinate of the grid map
     center_y = int(
         round(-min_y / xy_resolution))  # center y coordinate of the grid map
+    # x coordinate of the the occupied area
+    ix = np.round((np.asarray(ox) - min_x) / xy_resolution).astype(int)
+    # y coordinate of the the occupied area
+    iy = np.round((np.asarray(oy) - min_y) / xy_resolution).astype(int)
+    # occupied area 1.0 extended by one cell in x and y
+    occupied_x = np.concatenate((ix, ix + 1, ix, ix + 1))
+    occupied_y = np.concatenate((iy, iy, iy + 1, iy + 1))
     # occupancy grid computed with bresenham ray casting
     if breshen:
-        for (x, y) in zip(ox, oy):
-            # x coordinate of the the occupied area
-            ix = int(round((x - min_x) / xy_resolution))
-            # y coordinate of the the occupied area
-            iy = int(round((y - min_y) / xy_resolution))
-            laser_beams = bresenham((center_x, center_y), (
-                ix, iy))  # line form the lidar to the occupied point
-            for laser_beam in laser_beams:
-                occupancy_map[laser_beam[0]][
-                    laser_beam[1]] = 0.0  # free area 0.0
-            occupancy_map[ix][iy] = 1.0  # occupied area 1.0
-            occupancy_map[ix + 1][iy] = 1.0  # extend the occupied area
-            occupancy_map[ix][iy + 1] = 1.0  # extend the occupied area
-            occupancy_map[ix + 1][iy + 1] = 1.0  # extend the occupied area
+        # lines form the lidar to the occupied points
+        free_x, free_y, free_beams = bresenham_lines(
+            (center_x, center_y), np.stack((ix, iy), axis=1))
+        # the beams are drawn one after the other, free area first,
+        # so a cell keeps the value of the last beam touching it
+        last_free = np.full((x_w, y_w), -1)
+        np.maximum.at(last_free, (free_x, free_y), free_beams)
+        last_occupied = np.full((x_w, y_w), -1)
+        np.maximum.at(last_occupied, (occupied_x, occupied_y),
+                      np.tile(np.arange(len(ix)), 4))
+        occupancy_map[last_free >= 0] = 0.0  # free area 0.0
+        occupancy_map[(last_occupied >= 0) &
+                      (last_occupied >= last_free)] = 1.0
     # occupancy grid computed with with flood fill
     else:
         occupancy_map = init_flood_fill((center_x, center_y), (ox, oy),
                                         (x_w, y_w),
                                         (min_x, min_y), xy_resolution)
         flood_fill((center_x, center_y), occupancy_map)
-        occupancy_map = np.array(occupancy_map, dtype=np.float)
-        for (x, y) in zip(ox, oy):
-            ix = int(round((x - min_x) / xy_resolution))
-            iy = int(round((y - min_y) / xy_resolution))
-            occupancy_map[ix][iy] = 1.0  # occupied area 1.0
-            occupancy_map[ix + 1][iy] = 1.0  # extend the occupied area
-            occupancy_map[ix][iy + 1] = 1.0  # extend the occupied area
-            occupancy_map[ix + 1][iy + 1] = 1.0  # extend the occupied area
+        occupancy_map = np.array(occupancy_map, dtype=float)
+        occupancy_map[occupied_x, occupied_y] = 1.0  # occupied area 1.0
     return occupancy_map, min_x, max_x, min_y, max_y, xy_resolution
 
 
+class LogOddsGridMap:
+    """
+    Occupancy grid map fusing many scans taken from known poses
+    The occupancy of each cell is kept as log-odds, each scan adds
+    L_OCCUPIED to the cells hit by a beam and L_FREE to the cells the
+    beams go through. All the beams of a scan are traced at once.
+    """
+    L_OCCUPIED = 0.85  # log-odds of a hit
+    L_FREE = -0.4  # log-odds of a pass through
+    L_MIN, L_MAX = -5.0, 5.0  # clamping of the log-odds
+
+    def __init__(self, min_x, min_y, x_w, y_w, xy_resolution):
+        """
+        min_x, min_y: position of the cell [0, 0] [m]
+        x_w, y_w: number of cells
+        xy_resolution: cell size [m]
+        """
+        self.min_x = min_x
+        self.min_y = min_y
+        self.x_w = x_w
+        self.y_w = y_w
+        self.xy_resolution = xy_resolution
+        self.log_odds = np.zeros((x_w, y_w))
+
+    def add_scan(self, pose, angles, distances):
+        """
+        pose: lidar pose (x [m], y [m], yaw [rad])
+        angles, distances: laser beams, with the same angle convention
+        as main() (ox = sin(angle) * distance, oy = cos(angle) * distance)
+        """
+        x, y, yaw = pose
+        ox = np.sin(angles) * distances
+        oy = np.cos(angles) * distances
+        wx = x + math.cos(yaw) * ox - math.sin(yaw) * oy
+        wy = y + math.sin(yaw) * ox + math.cos(yaw) * oy
+
+        center = (int(round((x - self.min_x) / self.xy_resolution)),
+                  int(round((y - self.min_y) / self.xy_resolution)))
+        ix = np.round((wx - self.min_x) / self.xy_resolution).astype(int)
+        iy = np.round((wy - self.min_y) / self.xy_resolution).astype(int)
+        beam_x, beam_y, _ = bresenham_lines(center,
+                                            np.stack((ix, iy), axis=1))
+
+        # every cell is updated once per scan, hits win over pass throughs
+        occupied = self.calc_unique_index(ix, iy)
+        free = np.setdiff1d(self.calc_unique_index(beam_x, beam_y), occupied,
+                            assume_unique=True)
+        log_odds = self.log_odds.ravel()
+        np.add.at(log_odds, free, self.L_FREE)
+        np.add.at(log_odds, occupied, self.L_OCCUPIED)
+        np.clip(log_odds, self.L_MIN, self.L_MAX, out=log_odds)
+
+    def calc_unique_index(self, ix, iy):
+        is_inside = (ix >= 0) & (ix < self.x_w) & (iy >= 0) & (iy < self.y_w)
+        return np.unique(ix[is_inside] * self.y_w + iy[is_inside])
+
+    def calc_probability_map(self):
+        return 1.0 - 1.0 / (1.0 + np.exp(self.log_odds))
+
+
 def main():
     """
     Example usage
@@ -7,6 +7,8 @@ author: Atsushi Sakai (@Atsushi_twi)
 """
 
 import math
+from functools import lru_cache
+
 import numpy as np
 import matplotlib.pyplot as plt
 
@@ -26,79 +28,70 @@ def calc_grid_map_config(ox, oy, xyreso):
     return minx, miny, maxx, maxy, xw, yw
 
 
-class precastDB:
-
-    def __init__(self):
-        self.px = 0.0
-        self.py = 0.0
-        self.d = 0.0
-        self.angle = 0.0
-        self.ix = 0
-        self.iy = 0
-
-    def __str__(self):
-        return str(self.px) + "," + str(self.py) + "," + str(self.d) + "," + str(self.angle)
-
-
-def atan_zero_to_twopi(y, x):
-    angle = math.atan2(y, x)
-    if angle < 0.0:
-        angle += math.pi * 2.0
+@lru_cache(maxsize=8)
+def calc_precast_table(minx, miny, xw, yw, xyreso, yawreso):
+    """
+    Precast table of the grid as arrays, it only depends on the grid
+    geometry so it is cached
 
-    return angle
+    returns:
+    cell_ids: flat cell indexes (ix * yw + iy) sorted by angle bin
+    cell_d: distance from the origin of each cell in cell_ids
+    bin_starts: cells of angle bin i are cell_ids[bin_starts[i]:
+        bin_starts[i + 1]]
+    """
+    px = np.arange(xw) * xyreso + minx
+    py = np.arange(yw) * xyreso + miny
+    px, py = np.meshgrid(px, py, indexing="ij")
+    d = np.hypot(px, py).ravel()
+    angleid = calc_angle_id(px.ravel(), py.ravel(), yawreso)
 
+    cell_ids = np.argsort(angleid, kind="stable")
+    n_bins = int(round((math.pi * 2.0) / yawreso)) + 1
+    bin_starts = np.searchsorted(angleid[cell_ids], np.arange(n_bins + 1))
 
-def precasting(minx, miny, xw, yw, xyreso, yawreso):
+    for a in (cell_ids, d, bin_starts):
+        a.flags.writeable = False
 
-    precast = [[] for i in range(int(round((math.pi * 2.0) / yawreso)) + 1)]
+    return cell_ids, d[cell_ids], bin_starts
 
-    for ix in range(xw):
-        for iy in range(yw):
-            px = ix * xyreso + minx
-            py = iy * xyreso + miny
 
-            d = math.hypot(px, py)
-            angle = atan_zero_to_twopi(py, px)
-            angleid = int(math.floor(angle / yawreso))
+def calc_angle_id(x, y, yawreso):
+    angle = np.arctan2(y, x)
+    angle[angle < 0.0] += math.pi * 2.0
 
-            pc = precastDB()
-
-            pc.px = px
-            pc.py = py
-            pc.d = d
-            pc.ix = ix
-            pc.iy = iy
-            pc.angle = angle
-
-            precast[angleid].append(pc)
-
-    return precast
+    return np.floor(angle / yawreso).astype(int)
 
 
 def generate_ray_casting_grid_map(ox, oy, xyreso, yawreso):
 
     minx, miny, maxx, maxy, xw, yw = calc_grid_map_config(ox, oy, xyreso)
 
-    pmap = [[0.0 for i in range(yw)] for i in range(xw)]
-
-    precast = precasting(minx, miny, xw, yw, xyreso, yawreso)
-
-    for (x, y) in zip(ox, oy):
+    pmap = np.zeros((xw, yw))
 
-        d = math.hypot(x, y)
-        angle = atan_zero_to_twopi(y, x)
-        angleid = int(math.floor(angle / yawreso))
+    cell_ids, cell_d, bin_starts = calc_precast_table(
+        minx, miny, xw, yw, xyreso, yawreso)
 
-        gridlist = precast[angleid]
+    ox, oy = np.asarray(ox, dtype=float), np.asarray(oy, dtype=float)
+    d = np.hypot(ox, oy)
+    angleid = calc_angle_id(ox, oy, yawreso)
 
-        ix = int(round((x - minx) / xyreso))
-        iy = int(round((y - miny) / xyreso))
+    # nearest point in each angle bin which has points
+    hit_bins, bin_index = np.unique(angleid, return_inverse=True)
+    min_d = np.full(len(hit_bins), np.inf)
+    np.minimum.at(min_d, bin_index, d)
 
-        for grid in gridlist:
-            if grid.d > d:
-                pmap[grid.ix][grid.iy] = 0.5
+    # cells of those bins behind the nearest point are unknown
+    starts = bin_starts[hit_bins]
+    n_cells = bin_starts[hit_bins + 1] - starts
+    cells = np.arange(n_cells.sum()) + np.repeat(
+        starts - (np.cumsum(n_cells) - n_cells), n_cells)
+    is_behind = cell_d[cells] > np.repeat(min_d, n_cells)
+    pmap.ravel()[cell_ids[cells[is_behind]]] = 0.5
 
-        pmap[ix][iy] = 1.0
+    ix = np.round((ox - minx) / xyreso).astype(int)
+    iy = np.round((oy - miny) / xyreso).astype(int)
+    pmap[ix, iy] = 1.0
 
     return pmap, minx, maxx, miny, maxy, xyreso
 
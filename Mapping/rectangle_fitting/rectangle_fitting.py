@@ -14,9 +14,10 @@ efficient-l-shape-fitting-for-vehicle-detection-using-laser-scanners/
 
 import matplotlib.pyplot as plt
 import numpy as np
-import itertools
 from enum import Enum
-from scipy.spatial.transform import Rotation as Rot
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial import cKDTree
 
 from simulator import VehicleSimulator, LidarSimulator
 
@@ -44,102 +45,93 @@ class LShapeFitting:
         id_sets = self._adoptive_range_segmentation(ox, oy)
 
         # step2 Rectangle search
+        ox, oy = np.asarray(ox), np.asarray(oy)
         rects = []
         for ids in id_sets:  # for each cluster
-            cx = [ox[i] for i in range(len(ox)) if i in ids]
-            cy = [oy[i] for i in range(len(oy)) if i in ids]
-            rects.append(self._rectangle_search(cx, cy))
+            ids = sorted(ids)
+            rects.append(self._rectangle_search(ox[ids], oy[ids]))
 
         return rects, id_sets
 
+    # The criteria below take the projected points c1, c2 with shape
+    # (n_theta, n_point) and return a cost for each theta.
+
     @staticmethod
     def _calc_area_criterion(c1, c2):
-        c1_max = max(c1)
-        c2_max = max(c2)
-        c1_min = min(c1)
-        c2_min = min(c2)
-
-        alpha = -(c1_max - c1_min) * (c2_max - c2_min)
+        alpha = -np.ptp(c1, axis=-1) * np.ptp(c2, axis=-1)
 
         return alpha
 
     def _calc_closeness_criterion(self, c1, c2):
-        c1_max = max(c1)
-        c2_max = max(c2)
-        c1_min = min(c1)
-        c2_min = min(c2)
-
-        D1 = [min([np.linalg.norm(c1_max - ic1),
-                   np.linalg.norm(ic1 - c1_min)]) for ic1 in c1]
-        D2 = [min([np.linalg.norm(c2_max - ic2),
-                   np.linalg.norm(ic2 - c2_min)]) for ic2 in c2]
+        D1, D2 = self._calc_distance_to_edges(c1, c2)
 
-        beta = 0
-        for i, _ in enumerate(D1):
-            d = max(min([D1[i], D2[i]]), self.min_dist_of_closeness_criteria)
-            beta += (1.0 / d)
+        d = np.maximum(np.minimum(D1, D2), self.min_dist_of_closeness_criteria)
+        beta = np.sum(1.0 / d, axis=-1)
 
         return beta
 
     @staticmethod
     def _calc_variance_criterion(c1, c2):
-        c1_max = max(c1)
-        c2_max = max(c2)
-        c1_min = min(c1)
-        c2_min = min(c2)
-
-        D1 = [min([np.linalg.norm(c1_max - ic1),
-                   np.linalg.norm(ic1 - c1_min)]) for ic1 in c1]
-        D2 = [min([np.linalg.norm(c2_max - ic2),
-                   np.linalg.norm(ic2 - c2_min)]) for ic2 in c2]
-
-        E1, E2 = [], []
-        for (d1, d2) in zip(D1, D2):
-            if d1 < d2:
-                E1.append(d1)
-            else:
-                E2.append(d2)
-
-        V1 = 0.0
-        if E1:
-            V1 = - np.var(E1)
-
-        V2 = 0.0
-        if E2:
-            V2 = - np.var(E2)
+        D1, D2 = LShapeFitting._calc_distance_to_edges(c1, c2)
+
+        is_e1 = D1 < D2
+        V1 = - LShapeFitting._calc_masked_variance(D1, is_e1)
+        V2 = - LShapeFitting._calc_masked_variance(D2, ~is_e1)
 
         gamma = V1 + V2
 
         return gamma
 
+    @staticmethod
+    def _calc_distance_to_edges(c1, c2):
+        D1 = np.minimum(np.max(c1, axis=-1, keepdims=True) - c1,
+                        c1 - np.min(c1, axis=-1, keepdims=True))
+        D2 = np.minimum(np.max(c2, axis=-1, keepdims=True) - c2,
+                        c2 - np.min(c2, axis=-1, keepdims=True))
+
+        return D1, D2
+
+    @staticmethod
+    def _calc_masked_variance(d, mask):
+        """
+        variance of d[mask] along the last axis, 0.0 for an empty mask
+        """
+        n = np.sum(mask, axis=-1)
+        n_safe = np.maximum(n, 1)
+        mean = np.sum(np.where(mask, d, 0.0), axis=-1) / n_safe
+        var = np.sum(np.where(mask, (d - mean[..., None]) ** 2, 0.0),
+                     axis=-1) / n_safe
+
+        return var
+
     def _rectangle_search(self, x, y):
 
         X = np.array([x, y]).T
 
         d_theta = np.deg2rad(self.d_theta_deg_for_search)
-        min_cost = (-float('inf'), None)
-        for theta in np.arange(0.0, np.pi / 2.0 - d_theta, d_theta):
-
-            rot = Rot.from_euler('z', theta).as_matrix()[0:2, 0:2]
-            c = X @ rot
-            c1 = c[:, 0]
-            c2 = c[:, 1]
-
-            # Select criteria
-            cost = 0.0
-            if self.criteria == self.Criteria.AREA:
-                cost = self._calc_area_criterion(c1, c2)
-            elif self.criteria == self.Criteria.CLOSENESS:
-                cost = self._calc_closeness_criterion(c1, c2)
-            elif self.criteria == self.Criteria.VARIANCE:
-                cost = self._calc_variance_criterion(c1, c2)
-
-            if min_cost[0] < cost:
-                min_cost = (cost, theta)
+        thetas = np.arange(0.0, np.pi / 2.0 - d_theta, d_theta)
+
+        # project the points for all thetas at once
+        cos_t = np.cos(thetas)[:, None]
+        sin_t = np.sin(thetas)[:, None]
+        c1 = cos_t * X[:, 0] + sin_t * X[:, 1]
+        c2 = -sin_t * X[:, 0] + cos_t * X[:, 1]
+
+        # Select criteria
+        cost = np.zeros(len(thetas))
+        if self.criteria == self.Criteria.AREA:
+            cost = self._calc_area_criterion(c1, c2)
+        elif self.criteria == self.Criteria.CLOSENESS:
+            cost = self._calc_closeness_criterion(c1, c2)
+        elif self.criteria == self.Criteria.VARIANCE:
+            cost = self._calc_variance_criterion(c1, c2)
+
+        # the first theta for the max cost
+        best_theta = thetas[np.argmax(cost)]
 
         # calc best rectangle
-        sin_s = np.sin(min_cost[1])
-        cos_s = np.cos(min_cost[1])
+        sin_s = np.sin(best_theta)
+        cos_s = np.cos(best_theta)
 
         c1_s = X @ np.array([cos_s, sin_s]).T
         c2_s = X @ np.array([-sin_s, cos_s]).T
@@ -161,28 +153,34 @@ class LShapeFitting:
         return rect
 
     def _adoptive_range_segmentation(self, ox, oy):
-
-        # Setup initial cluster
-        S = []
-        for i, _ in enumerate(ox):
-            C = set()
-            R = self.R0 + self.Rd * np.linalg.norm([ox[i], oy[i]])
-            for j, _ in enumerate(ox):
-                d = np.hypot(ox[i] - ox[j], oy[i] - oy[j])
-                if d <= R:
-                    C.add(j)
-            S.append(C)
-
-        # Merge cluster
-        while 1:
-            no_change = True
-            for (c1, c2) in list(itertools.permutations(range(len(S)), 2)):
-                if S[c1] & S[c2]:
-                    S[c1] = (S[c1] | S.pop(c2))
-                    no_change = False
-                    break
-            if no_change:
-                break
+        """
+        Two points are in the same cluster when they are connected by
+        point pairs within the segmentation range of one of the pair.
+        """
+        points = np.array([ox, oy], dtype=float).T.reshape(-1, 2)
+        n_point = len(points)
+        if n_point == 0:
+            return []
+
+        R = self.R0 + self.Rd * np.hypot(points[:, 0], points[:, 1])
+
+        # radius graph
+        tree = cKDTree(points)
+        pairs = tree.query_pairs(np.max(R), output_type='ndarray')
+        i, j = pairs[:, 0], pairs[:, 1]
+        d = np.hypot(*(points[i] - points[j]).T)
+        is_edge = d <= np.maximum(R[i], R[j])
+        graph = coo_matrix((np.ones(np.count_nonzero(is_edge)),
+                            (i[is_edge], j[is_edge])),
+                           shape=(n_point, n_point))
+
+        _, labels = connected_components(graph, directed=False)
+
+        # clusters ordered by their smallest point index
+        order = np.argsort(labels, kind='stable')
+        splits = np.flatnonzero(np.diff(labels[order])) + 1
+        S = [set(ids.tolist()) for ids in np.split(order, splits)]
+        S.sort(key=min)
 
         return S
 
@@ -8,8 +8,6 @@ author: Atsushi Sakai
 
 import numpy as np
 import matplotlib.pyplot as plt
-import math
-import random
 from scipy.spatial.transform import Rotation as Rot
 
 
@@ -94,22 +92,15 @@ class LidarSimulator:
         self.range_noise = 0.01
 
     def get_observation_points(self, v_list, angle_resolution):
-        x, y, angle, r = [], [], [], []
-
         # store all points
-        for v in v_list:
-
-            gx, gy = v.calc_global_contour()
-
-            for vx, vy in zip(gx, gy):
-                v_angle = math.atan2(vy, vx)
-                vr = np.hypot(vx, vy) * random.uniform(1.0 - self.range_noise,
-                                                       1.0 + self.range_noise)
+        gxy = [v.calc_global_contour() for v in v_list]
+        x = np.concatenate([gx for (gx, _) in gxy])
+        y = np.concatenate([gy for (_, gy) in gxy])
 
-                x.append(vx)
-                y.append(vy)
-                angle.append(v_angle)
-                r.append(vr)
+        angle = np.arctan2(y, x)
+        r = np.hypot(x, y) * np.random.uniform(1.0 - self.range_noise,
+                                               1.0 + self.range_noise,
+                                               len(x))
 
         # ray casting filter
         rx, ry = self.ray_casting_filter(angle, r, angle_resolution)
@@ -118,23 +109,22 @@ class LidarSimulator:
 
     @staticmethod
     def ray_casting_filter(theta_l, range_l, angle_resolution):
-        rx, ry = [], []
-        range_db = [float("inf") for _ in range(
-            int(np.floor((np.pi * 2.0) / angle_resolution)) + 1)]
-
-        for i in range(len(theta_l)):
-            angle_id = int(round(theta_l[i] / angle_resolution))
-
-            if range_db[angle_id] > range_l[i]:
-                range_db[angle_id] = range_l[i]
-
-        for i in range(len(range_db)):
-            t = i * angle_resolution
-            if range_db[i] != float("inf"):
-                rx.append(range_db[i] * np.cos(t))
-                ry.append(range_db[i] * np.sin(t))
-
-        return rx, ry
+        n_angle = int(np.floor((np.pi * 2.0) / angle_resolution)) + 1
+        angle_ids = np.round(np.asarray(theta_l) /
+                             angle_resolution).astype(int)
+        angle_ids %= n_angle  # negative ids from the end of the bins
+
+        # the nearest point for each angle bin
+        range_l = np.asarray(range_l, dtype=float)
+        order = np.lexsort((range_l, angle_ids))
+        angle_ids, first = np.unique(angle_ids[order], return_index=True)
+        ranges = range_l[order[first]]
+
+        t = angle_ids * angle_resolution
+        rx = ranges * np.cos(t)
+        ry = ranges * np.sin(t)
+
+        return rx.tolist(), ry.tolist()
 
 
 def main():
@@ -5,25 +5,18 @@ randomly generate obstacles, start and goal point
 searching path from start and end simultaneously
 """
 
+import heapq
+import math
+
 import numpy as np
 import matplotlib.pyplot as plt
-import math
 
 show_animation = True
 
 
-class Node:
-    """node with properties of g, h, coordinate and parent node"""
-
-    def __init__(self, G=0, H=0, coordinate=None, parent=None):
-        self.G = G
-        self.H = H
-        self.F = G + H
-        self.parent = parent
-        self.coordinate = coordinate
-
-    def reset_f(self):
-        self.F = self.G + self.H
+# neighbor offsets and their move costs
+MOTIONS = [(dx, dy, math.hypot(dx, dy)) for dx in (-1, 0, 1)
+           for dy in (-1, 0, 1) if dx != 0 or dy != 0]
 
 
 def hcost(node_coordinate, goal):
@@ -33,14 +26,6 @@ def hcost(node_coordinate, goal):
     return hcost
 
 
-def gcost(fixed_node, update_node_coordinate):
-    dx = abs(fixed_node.coordinate[0] - update_node_coordinate[0])
-    dy = abs(fixed_node.coordinate[1] - update_node_coordinate[1])
-    gc = math.hypot(dx, dy)  # gc = move from fixed_node to update_node
-    gcost = fixed_node.G + gc  # gcost = move from start point to update_node
-    return gcost
-
-
 def boundary_and_obstacles(start, goal, top_vertex, bottom_vertex, obs_number):
     """
     :param start: start coordinate
@@ -77,147 +62,149 @@ def boundary_and_obstacles(start, goal, top_vertex, bottom_vertex, obs_number):
     return bound_obs, obstacle
 
 
-def find_neighbor(node, ob, closed):
-    # generate neighbors in certain condition
-    ob_list = ob.tolist()
+class ObstacleMap:
+    """obstacle bitmap covering the boundary, outside cells are blocked"""
+
+    def __init__(self, bound):
+        bound = np.asarray(bound)
+        self.min_xy = bound.min(axis=0) - 1
+        nx, ny = bound.max(axis=0) - self.min_xy + 2
+        grid = np.ones((nx, ny), dtype=bool)
+        grid[1:-1, 1:-1] = False
+        grid[tuple((bound - self.min_xy).T)] = True
+        self.ny = ny
+        self.blocked = grid.ravel()
+
+    def to_index(self, coordinate):
+        return int((coordinate[0] - self.min_xy[0]) * self.ny +
+                   coordinate[1] - self.min_xy[1])
+
+    def to_coordinate(self, index):
+        return [int(index // self.ny + self.min_xy[0]),
+                int(index % self.ny + self.min_xy[1])]
+
+    def to_coordinates(self, indexes):
+        indexes = np.asarray(indexes, dtype=int).reshape(-1)
+        return np.column_stack((indexes // self.ny + self.min_xy[0],
+                                indexes % self.ny + self.min_xy[1]))
+
+
+def find_neighbor(index, ob_map):
+    """
+    free neighbors of the cell and their move costs, without the diagonal
+    neighbors between two obstacles since there is no enough space for
+    robot to go through two diagonal positioned obstacles
+    """
     neighbor: list = []
-    for x in range(node.coordinate[0] - 1, node.coordinate[0] + 2):
-        for y in range(node.coordinate[1] - 1, node.coordinate[1] + 2):
-            if [x, y] not in ob_list:
-                # find all possible neighbor nodes
-                neighbor.append([x, y])
-    # remove node violate the motion rule
-    # 1. remove node.coordinate itself
-    neighbor.remove(node.coordinate)
-    # 2. remove neighbor nodes who cross through two diagonal
-    # positioned obstacles since there is no enough space for
-    # robot to go through two diagonal positioned obstacles
-
-    # top bottom left right neighbors of node
-    top_nei = [node.coordinate[0], node.coordinate[1] + 1]
-    bottom_nei = [node.coordinate[0], node.coordinate[1] - 1]
-    left_nei = [node.coordinate[0] - 1, node.coordinate[1]]
-    right_nei = [node.coordinate[0] + 1, node.coordinate[1]]
-    # neighbors in four vertex
-    lt_nei = [node.coordinate[0] - 1, node.coordinate[1] + 1]
-    rt_nei = [node.coordinate[0] + 1, node.coordinate[1] + 1]
-    lb_nei = [node.coordinate[0] - 1, node.coordinate[1] - 1]
-    rb_nei = [node.coordinate[0] + 1, node.coordinate[1] - 1]
-
-    # remove the unnecessary neighbors
-    if top_nei and left_nei in ob_list and lt_nei in neighbor:
-        neighbor.remove(lt_nei)
-    if top_nei and right_nei in ob_list and rt_nei in neighbor:
-        neighbor.remove(rt_nei)
-    if bottom_nei and left_nei in ob_list and lb_nei in neighbor:
-        neighbor.remove(lb_nei)
-    if bottom_nei and right_nei in ob_list and rb_nei in neighbor:
-        neighbor.remove(rb_nei)
-    neighbor = [x for x in neighbor if x not in closed]
+    for dx, dy, cost in MOTIONS:
+        nei = index + dx * ob_map.ny + dy
+        if ob_map.blocked[nei]:
+            continue
+        if dx != 0 and dy != 0 and ob_map.blocked[index + dx * ob_map.ny] \
+                and ob_map.blocked[index + dy]:
+            continue
+        neighbor.append((nei, cost))
     return neighbor
 
 
-def find_node_index(coordinate, node_list):
-    # find node index in the node list via its coordinate
-    ind = 0
-    for node in node_list:
-        if node.coordinate == coordinate:
-            target_node = node
-            ind = node_list.index(target_node)
-            break
-    return ind
-
-
-def find_path(open_list, closed_list, goal, obstacle):
-    # searching for the path, update open and closed list
-    # obstacle = obstacle and boundary
-    flag = len(open_list)
-    for i in range(flag):
-        node = open_list[0]
-        open_coordinate_list = [node.coordinate for node in open_list]
-        closed_coordinate_list = [node.coordinate for node in closed_list]
-        temp = find_neighbor(node, obstacle, closed_coordinate_list)
-        for element in temp:
-            if element in closed_list:
-                continue
-            elif element in open_coordinate_list:
-                # if node in open list, update g value
-                ind = open_coordinate_list.index(element)
-                new_g = gcost(node, element)
-                if new_g <= open_list[ind].G:
-                    open_list[ind].G = new_g
-                    open_list[ind].reset_f()
-                    open_list[ind].parent = node
-            else:  # new coordinate, create corresponding node
-                ele_node = Node(coordinate=element, parent=node,
-                                G=gcost(node, element), H=hcost(element, goal))
-                open_list.append(ele_node)
-        open_list.remove(node)
-        closed_list.append(node)
-        open_list.sort(key=lambda x: x.F)
-    return open_list, closed_list
-
-
-def node_to_coordinate(node_list):
-    # convert node list into coordinate list and array
-    coordinate_list = [node.coordinate for node in node_list]
-    return coordinate_list
-
-
-def check_node_coincide(close_ls1, closed_ls2):
+class Frontier:
     """
-    :param close_ls1: node closed list for searching from start
-    :param closed_ls2: node closed list for searching from end
-    :return: intersect node list for above two
+    searching state from one side, nodes are cell indexes of the obstacle
+    map, the open list is a heap of (F, order, index) and outdated
+    entries are skipped when popped
     """
-    # check if node in close_ls1 intersect with node in closed_ls2
-    cl1 = node_to_coordinate(close_ls1)
-    cl2 = node_to_coordinate(closed_ls2)
-    intersect_ls = [node for node in cl1 if node in cl2]
-    return intersect_ls
-
 
-def find_surrounding(coordinate, obstacle):
-    # find obstacles around node, help to draw the borderline
-    boundary: list = []
-    for x in range(coordinate[0] - 1, coordinate[0] + 2):
-        for y in range(coordinate[1] - 1, coordinate[1] + 2):
-            if [x, y] in obstacle:
-                boundary.append([x, y])
-    return boundary
+    def __init__(self, start, side, ob_map):
+        self.side = side  # flag of this side in the visited array
+        self.ob_map = ob_map
+        size = len(ob_map.blocked)
+        self.g = np.full(size, np.inf)
+        self.h = np.zeros(size)
+        self.f = np.full(size, np.inf)
+        self.parent = np.full(size, -1, dtype=int)
+        self.open: list = []
+        self.n_open = 0
+        self.closed: list = []
+        self.order = 0
+
+        start_index = ob_map.to_index(start)
+        self.g[start_index] = 0.0
+        self.push(start_index, 0.0)
+
+    def push(self, index, h):
+        if self.f[index] == np.inf:
+            self.n_open += 1
+        self.h[index] = h
+        self.f[index] = self.g[index] + h
+        self.order += 1
+        heapq.heappush(self.open, (self.f[index], self.order, index))
+
+    def best_open(self):
+        # pop the outdated entries on the top
+        while self.open:
+            f, _, index = self.open[0]
+            if f == self.f[index]:
+                return index
+            heapq.heappop(self.open)
+        return None
+
+    def expand(self, target, visited):
+        """
+        expand the open nodes in order of F, as many as the open list had,
+        return the node closed by both sides or None
+        """
+        for i in range(self.n_open):
+            index = self.best_open()
+            heapq.heappop(self.open)
+            self.f[index] = -np.inf  # closed
+            self.n_open -= 1
+            self.closed.append(index)
+            visited[index] |= self.side
+            if visited[index] == 3:
+                return index
+
+            for nei, cost in find_neighbor(index, self.ob_map):
+                if self.f[nei] == -np.inf:
+                    continue
+                new_g = self.g[index] + cost
+                if self.f[nei] == np.inf:
+                    # new node, its H is computed for the current target
+                    self.g[nei] = new_g
+                    self.parent[nei] = index
+                    self.push(nei, hcost(self.ob_map.to_coordinate(nei),
+                                         target))
+                elif new_g <= self.g[nei]:
+                    self.g[nei] = new_g
+                    self.parent[nei] = index
+                    self.push(nei, self.h[nei])
+        return None
+
+    def path_to(self, index):
+        # path from the node to the start of this side
+        path = [index]
+        while self.parent[path[-1]] != -1:
+            path.append(self.parent[path[-1]])
+        return self.ob_map.to_coordinates(path)
+
+    def closed_coordinates(self):
+        return self.ob_map.to_coordinates(self.closed)
+
+
+def get_border_line(closed_coordinates, obstacle):
+    # if no path, find border line which confine goal or robot
+    obstacle = np.asarray(obstacle).reshape(-1, 2)
+    closed = {tuple(c) for c in closed_coordinates.tolist()}
+    # obstacles with a closed node around them
+    near = [any((x + i, y + j) in closed for i in (-1, 0, 1)
+                for j in (-1, 0, 1)) for x, y in obstacle.tolist()]
+    return obstacle[np.array(near, dtype=bool)]
 
 
-def get_border_line(node_closed_ls, obstacle):
-    # if no path, find border line which confine goal or robot
-    border: list = []
-    coordinate_closed_ls = node_to_coordinate(node_closed_ls)
-    for coordinate in coordinate_closed_ls:
-        temp = find_surrounding(coordinate, obstacle)
-        border = border + temp
-    border_ary = np.array(border)
-    return border_ary
-
-
-def get_path(org_list, goal_list, coordinate):
-    # get path from start to end
-    path_org: list = []
-    path_goal: list = []
-    ind = find_node_index(coordinate, org_list)
-    node = org_list[ind]
-    while node != org_list[0]:
-        path_org.append(node.coordinate)
-        node = node.parent
-    path_org.append(org_list[0].coordinate)
-    ind = find_node_index(coordinate, goal_list)
-    node = goal_list[ind]
-    while node != goal_list[0]:
-        path_goal.append(node.coordinate)
-        node = node.parent
-    path_goal.append(goal_list[0].coordinate)
-    path_org.reverse()
-    path = path_org + path_goal
-    path = np.array(path)
-    return path
+def get_path(org_frontier, goal_frontier, index):
+    # get path from start to end through the node searched by both sides
+    path_org = org_frontier.path_to(index)[::-1]
+    path_goal = goal_frontier.path_to(index)[1:]
+    return np.vstack((path_org, path_goal))
 
 
 def random_coordinate(bottom_vertex, top_vertex):
@@ -248,24 +235,23 @@ def draw(close_origin, close_goal, start, end, bound):
     plt.pause(0.0001)
 
 
-def draw_control(org_closed, goal_closed, flag, start, end, bound, obstacle):
+def draw_control(org_frontier, goal_frontier, flag, start, end, bound,
+                 obstacle, meet=None):
     """
     control the plot process, evaluate if the searching finished
     flag == 0 : draw the searching process and plot path
     flag == 1 or 2 : start or end is blocked, draw the border line
+    meet : node searched by both sides, if a path is found
     """
     stop_loop = 0  # stop sign for the searching
-    org_closed_ls = node_to_coordinate(org_closed)
-    org_array = np.array(org_closed_ls)
-    goal_closed_ls = node_to_coordinate(goal_closed)
-    goal_array = np.array(goal_closed_ls)
+    org_array = org_frontier.closed_coordinates()
+    goal_array = goal_frontier.closed_coordinates()
     path = None
     if show_animation:  # draw the searching process
         draw(org_array, goal_array, start, end, bound)
     if flag == 0:
-        node_intersect = check_node_coincide(org_closed, goal_closed)
-        if node_intersect:  # a path is find
-            path = get_path(org_closed, goal_closed, node_intersect[0])
+        if meet is not None:  # a path is find
+            path = get_path(org_frontier, goal_frontier, meet)
             stop_loop = 1
             print('Path is find!')
             if show_animation:  # draw the path
@@ -284,13 +270,13 @@ def draw_control(org_closed, goal_closed, flag, start, end, bound, obstacle):
                ' Robot&Goal are split by border' \
                ' shown in red \'x\'!'
         if flag == 1:
-            border = get_border_line(org_closed, obstacle)
+            border = get_border_line(org_array, obstacle)
             plt.plot(border[:, 0], border[:, 1], 'xr')
             plt.title(info, size=14, loc='center')
             plt.pause(0.01)
             plt.show()
         elif flag == 2:
-            border = get_border_line(goal_closed, obstacle)
+            border = get_border_line(goal_array, obstacle)
             plt.plot(border[:, 0], border[:, 1], 'xr')
             plt.title(info, size=14, loc='center')
             plt.pause(0.01)
@@ -300,15 +286,12 @@ def draw_control(org_closed, goal_closed, flag, start, end, bound, obstacle):
 
 def searching_control(start, end, bound, obstacle):
     """manage the searching process, start searching from two side"""
-    # initial origin node and end node
-    origin = Node(coordinate=start, H=hcost(start, end))
-    goal = Node(coordinate=end, H=hcost(end, start))
-    # list for searching from origin to goal
-    origin_open: list = [origin]
-    origin_close: list = []
-    # list for searching from goal to origin
-    goal_open = [goal]
-    goal_close: list = []
+    ob_map = ObstacleMap(bound)
+    # searching from origin to goal and from goal to origin
+    origin = Frontier(start, 1, ob_map)
+    goal = Frontier(end, 2, ob_map)
+    # sides which closed each node, 3 for both
+    visited = np.zeros(len(ob_map.blocked), dtype=np.int8)
     # initial target
     target_goal = end
     # flag = 0 (not blocked) 1 (start point blocked) 2 (end point blocked)
@@ -316,39 +299,37 @@ def searching_control(start, end, bound, obstacle):
     path = None
     while True:
         # searching from start to end
-        origin_open, origin_close = \
-            find_path(origin_open, origin_close, target_goal, bound)
-        if not origin_open:  # no path condition
+        meet = origin.expand(target_goal, visited)
+        if meet is None and origin.best_open() is None:  # no path condition
             flag = 1  # origin node is blocked
-            draw_control(origin_close, goal_close, flag, start, end, bound,
-                         obstacle)
+            draw_control(origin, goal, flag, start, end, bound, obstacle)
             break
         # update target for searching from end to start
-        target_origin = min(origin_open, key=lambda x: x.F).coordinate
-
-        # searching from end to start
-        goal_open, goal_close = \
-            find_path(goal_open, goal_close, target_origin, bound)
-        if not goal_open:  # no path condition
-            flag = 2  # goal is blocked
-            draw_control(origin_close, goal_close, flag, start, end, bound,
-                         obstacle)
-            break
-        # update target for searching from start to end
-        target_goal = min(goal_open, key=lambda x: x.F).coordinate
+        if meet is None:
+            target_origin = ob_map.to_coordinate(origin.best_open())
+
+            # searching from end to start
+            meet = goal.expand(target_origin, visited)
+            if meet is None and goal.best_open() is None:
+                flag = 2  # goal is blocked
+                draw_control(origin, goal, flag, start, end, bound, obstacle)
+                break
+            # update target for searching from start to end
+            if meet is None:
+                target_goal = ob_map.to_coordinate(goal.best_open())
 
         # continue searching, draw the process
-        stop_sign, path = draw_control(origin_close, goal_close, flag, start,
-                                       end, bound, obstacle)
+        stop_sign, path = draw_control(origin, goal, flag, start, end, bound,
+                                       obstacle, meet)
         if stop_sign:
             break
     return path
 
 
-def main(obstacle_number=1500):
+def main(obstacle_number=1500, map_size=60):
     print(__file__ + ' start!')
 
-    top_vertex = [60, 60]  # top right vertex of boundary
+    top_vertex = [map_size, map_size]  # top right vertex of boundary
     bottom_vertex = [0, 0]  # bottom left vertex of boundary
 
     # generate start and goal point randomly
@@ -363,6 +344,7 @@ def main(obstacle_number=1500):
     path = searching_control(start, end, bound, obstacle)
     if not show_animation:
         print(path)
+    return path
 
 
 if __name__ == '__main__':
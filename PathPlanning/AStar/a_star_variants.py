@@ -4,15 +4,15 @@ author: Sarim Mehdi(muhammadsarim.mehdi@studio.unibo.it)
 Source: http://theory.stanford.edu/~amitp/GameProgramming/Variations.html
 """
 
+import heapq
+
 import numpy as np
 import matplotlib.pyplot as plt
 
 show_animation = False
-use_beam_search = False
-use_iterative_deepening = False
-use_dynamic_weighting = False
-use_theta_star = False
-use_jump_point = False
+
+VARIANTS = ("a_star", "beam_search", "iterative_deepening",
+            "dynamic_weighting", "theta_star", "jump_point")
 
 beam_capacity = 30
 max_theta = 5
@@ -21,149 +21,193 @@ max_corner = 5
 w, epsilon, upper_bound_depth = 1, 4, 500
 
 
-def draw_horizontal_line(start_x, start_y, length, o_x, o_y, o_dict):
+def draw_horizontal_line(start_x, start_y, length, o_x, o_y, o_grid):
     for i in range(start_x, start_x + length):
         for j in range(start_y, start_y + 2):
             o_x.append(i)
             o_y.append(j)
-            o_dict[(i, j)] = True
+    o_grid[start_x:start_x + length, start_y:start_y + 2] = True
 
 
-def draw_vertical_line(start_x, start_y, length, o_x, o_y, o_dict):
+def draw_vertical_line(start_x, start_y, length, o_x, o_y, o_grid):
     for i in range(start_x, start_x + 2):
         for j in range(start_y, start_y + length):
             o_x.append(i)
             o_y.append(j)
-            o_dict[(i, j)] = True
+    o_grid[start_x:start_x + 2, start_y:start_y + length] = True
+
+
+def bresenham(x1, y1, x2, y2):
+    """
+    Grid cells on the lines from a cell to one or more cells,
+    shape (n_line, n_cell) for array end points padded with the end cell
+    """
+    dx, dy = np.subtract(x2, x1), np.subtract(y2, y1)
+    n = np.maximum(np.abs(dx), np.abs(dy))
+    t = np.minimum(np.arange(np.max(n) + 1), np.expand_dims(n, -1))
+    n = np.expand_dims(np.maximum(n, 1), -1)
+    # rounded half up, as the integer error term of Bresenham's algorithm
+    xs = x1 + np.expand_dims(np.sign(dx), -1) * (
+        (2 * t * np.expand_dims(np.abs(dx), -1) + n) // (2 * n))
+    ys = y1 + np.expand_dims(np.sign(dy), -1) * (
+        (2 * t * np.expand_dims(np.abs(dy), -1) + n) // (2 * n))
+    return xs, ys
 
 
 def in_line_of_sight(obs_grid, x1, y1, x2, y2):
-    t = 0
-    while t <= 0.5:
-        xt = (1 - t) * x1 + t * x2
-        yt = (1 - t) * y1 + t * y2
-        if obs_grid[(int(xt), int(yt))]:
-            return False, None
-        xt = (1 - t) * x2 + t * x1
-        yt = (1 - t) * y2 + t * y1
-        if obs_grid[(int(xt), int(yt))]:
-            return False, None
-        t += 0.001
-    dist = np.linalg.norm(np.array([x1, y1] - np.array([x2, y2])))
+    xs, ys = bresenham(x1, y1, x2, y2)
+    if np.any(obs_grid[xs, ys]):
+        return False, None
+    dist = np.hypot(x1 - x2, y1 - y2)
     return True, dist
 
 
-def key_points(o_dict):
+def in_lines_of_sight(obs_grid, x1, y1, x2s, y2s):
+    """Line of sight flags from a cell to arrays of cells"""
+    xs, ys = bresenham(x1, y1, np.asarray(x2s), np.asarray(y2s))
+    return ~np.any(obs_grid[xs, ys], axis=-1)
+
+
+def key_points(o_grid):
     offsets1 = [(1, 0), (0, 1), (-1, 0), (1, 0)]
     offsets2 = [(1, 1), (-1, 1), (-1, -1), (1, -1)]
     offsets3 = [(0, 1), (-1, 0), (0, -1), (0, -1)]
-    c_list = []
-    for grid_point, obs_status in o_dict.items():
-        if obs_status:
-            continue
-        empty_space = True
-        x, y = grid_point
-        for i in [-1, 0, 1]:
-            for j in [-1, 0, 1]:
-                if (x + i, y + j) not in o_dict.keys():
-                    continue
-                if o_dict[(x + i, y + j)]:
-                    empty_space = False
-                    break
-        if empty_space:
-            continue
-        for offset1, offset2, offset3 in zip(offsets1, offsets2, offsets3):
-            i1, j1 = offset1
-            i2, j2 = offset2
-            i3, j3 = offset3
-            if ((x + i1, y + j1) not in o_dict.keys()) or \
-                    ((x + i2, y + j2) not in o_dict.keys()) or \
-                    ((x + i3, y + j3) not in o_dict.keys()):
-                continue
-            obs_count = 0
-            if o_dict[(x + i1, y + j1)]:
-                obs_count += 1
-            if o_dict[(x + i2, y + j2)]:
-                obs_count += 1
-            if o_dict[(x + i3, y + j3)]:
-                obs_count += 1
-            if obs_count == 3 or obs_count == 1:
-                c_list.append((x, y))
-                plt.plot(x, y, ".y")
-                break
+
+    # obstacle and in map flags of the neighbors, out of map is free
+    n_x, n_y = o_grid.shape
+    padded = np.pad(o_grid, 1, constant_values=False)
+    inside = np.pad(np.ones_like(o_grid), 1, constant_values=False)
+
+    def shifted(grid, i, j):
+        return grid[1 + i:1 + i + n_x, 1 + j:1 + j + n_y]
+
+    near_obstacle = np.zeros_like(o_grid)
+    for i in [-1, 0, 1]:
+        for j in [-1, 0, 1]:
+            near_obstacle |= shifted(padded, i, j)
+
+    corner = np.zeros_like(o_grid)
+    for offset1, offset2, offset3 in zip(offsets1, offsets2, offsets3):
+        all_inside = shifted(inside, *offset1) & \
+            shifted(inside, *offset2) & shifted(inside, *offset3)
+        obs_count = shifted(padded, *offset1).astype(int) + \
+            shifted(padded, *offset2) + shifted(padded, *offset3)
+        corner |= all_inside & ((obs_count == 3) | (obs_count == 1))
+    corner &= ~o_grid & near_obstacle
+
+    c_list = [tuple(c) for c in np.argwhere(corner).tolist()]
+    if show_animation:
+        plt.plot([x for x, _ in c_list], [y for _, y in c_list], ".y")
     if only_corners:
         return c_list
 
     e_list = []
-    for corner in c_list:
-        x1, y1 = corner
-        for other_corner in c_list:
-            x2, y2 = other_corner
-            if x1 == x2 and y1 == y2:
-                continue
-            reachable, _ = in_line_of_sight(o_dict, x1, y1, x2, y2)
-            if not reachable:
-                continue
-            x_m, y_m = int((x1 + x2) / 2), int((y1 + y2) / 2)
-            e_list.append((x_m, y_m))
-            if show_animation:
-                plt.plot(x_m, y_m, ".y")
+    corners = np.array(c_list, dtype=int).reshape(-1, 2)
+    for x1, y1 in c_list:
+        others = corners[(corners[:, 0] != x1) | (corners[:, 1] != y1)]
+        reachable = in_lines_of_sight(o_grid, x1, y1, *others.T)
+        # middle points of the visible corners
+        mid = ((others[reachable] + (x1, y1)) / 2).astype(int)
+        e_list += [tuple(m) for m in mid.tolist()]
+    if show_animation:
+        plt.plot([x for x, _ in e_list], [y for _, y in e_list], ".y")
     return c_list + e_list
 
 
 class SearchAlgo:
+    """
+    A* variants on an occupancy bitmap
+
+    :param obs_grid: boolean obstacle map indexed by [x, y]
+    :param variant: one of VARIANTS
+    :param corner_list: key points searched by the jump point variant
+    """
+
     def __init__(self, obs_grid, goal_x, goal_y, start_x, start_y,
-                 limit_x, limit_y, corner_list=None):
-        self.start_pt = [start_x, start_y]
-        self.goal_pt = [goal_x, goal_y]
-        self.obs_grid = obs_grid
-        g_cost, h_cost = 0, self.get_hval(start_x, start_y, goal_x, goal_y)
-        f_cost = g_cost + h_cost
-        self.all_nodes, self.open_set = {}, []
-
-        if use_jump_point:
-            for corner in corner_list:
-                i, j = corner
-                h_c = self.get_hval(i, j, goal_x, goal_y)
-                self.all_nodes[(i, j)] = {'pos': [i, j], 'pred': None,
-                                          'gcost': np.inf, 'hcost': h_c,
-                                          'fcost': np.inf,
-                                          'open': True, 'in_open_list': False}
-            self.all_nodes[tuple(self.goal_pt)] = \
-                {'pos': self.goal_pt, 'pred': None,
-                 'gcost': np.inf, 'hcost': 0, 'fcost': np.inf,
-                 'open': True, 'in_open_list': True}
-        else:
-            for i in range(limit_x):
-                for j in range(limit_y):
-                    h_c = self.get_hval(i, j, goal_x, goal_y)
-                    self.all_nodes[(i, j)] = {'pos': [i, j], 'pred': None,
-                                              'gcost': np.inf, 'hcost': h_c,
-                                              'fcost': np.inf,
-                                              'open': True,
-                                              'in_open_list': False}
-        self.all_nodes[tuple(self.start_pt)] = \
-            {'pos': self.start_pt, 'pred': None,
-             'gcost': g_cost, 'hcost': h_cost, 'fcost': f_cost,
-             'open': True, 'in_open_list': True}
-        self.open_set.append(self.all_nodes[tuple(self.start_pt)])
-
-    def get_hval(self, x1, y1, x2, y2):
-        x, y = x1, y1
-        val = 0
-        while x != x2 or y != y2:
-            if x != x2 and y != y2:
-                val += 14
-            else:
-                val += 10
-            x, y = x + np.sign(x2 - x), y + np.sign(y2 - y)
-        return val
+                 limit_x, limit_y, corner_list=None, variant="a_star"):
+        if variant not in VARIANTS:
+            raise ValueError("unknown variant: " + str(variant))
+        self.variant = variant
+        self.start_pt = [int(start_x), int(start_y)]
+        self.goal_pt = [int(goal_x), int(goal_y)]
+        self.obs_grid = np.asarray(obs_grid, dtype=bool)
+
+        # node states, indexed by [x, y]
+        shape = (max(limit_x, self.obs_grid.shape[0]),
+                 max(limit_y, self.obs_grid.shape[1]))
+        x, y = np.indices(shape)
+        self.hcost = self.get_hval(x, y, *self.goal_pt).astype(float)
+        self.gcost = np.full(shape, np.inf)
+        self.fcost = np.full(shape, np.inf)
+        self.pred = np.full(shape + (2,), -1, dtype=int)
+        self.closed = np.zeros(shape, dtype=bool)
+        self.in_open = np.zeros(shape, dtype=bool)
+
+        # open set is a heap of (f, g, h, x, y), outdated entries are
+        # skipped when popped
+        self.open_set = []
+
+        if variant == "jump_point":
+            nodes = list(dict.fromkeys(
+                [tuple(c) for c in corner_list] +
+                [tuple(self.goal_pt), tuple(self.start_pt)]))
+            self.key_points = np.array(nodes, dtype=int)
+
+        sx, sy = self.start_pt
+        self.gcost[sx, sy] = 0
+        self.push_open(sx, sy, self.hcost[sx, sy])
+
+    @staticmethod
+    def get_hval(x1, y1, x2, y2):
+        # octile distance, 10 for a straight and 14 for a diagonal move
+        dx, dy = np.abs(x1 - x2), np.abs(y1 - y2)
+        return 10 * np.maximum(dx, dy) + 4 * np.minimum(dx, dy)
+
+    def in_map(self, x, y):
+        return 0 <= x < self.obs_grid.shape[0] and \
+            0 <= y < self.obs_grid.shape[1]
+
+    def push_open(self, x, y, f_cost, h_cost=None):
+        if h_cost is None:
+            h_cost = self.hcost[x, y]
+        self.fcost[x, y] = f_cost
+        self.in_open[x, y] = True
+        heapq.heappush(self.open_set,
+                       (f_cost, self.gcost[x, y], h_cost, x, y))
+
+    def is_valid_entry(self, entry):
+        f_cost, _, _, x, y = entry
+        return self.in_open[x, y] and f_cost == self.fcost[x, y]
+
+    def pop_open(self):
+        """Pop the best node of the open set, None if it is empty"""
+        while self.open_set:
+            entry = heapq.heappop(self.open_set)
+            if self.is_valid_entry(entry):
+                self.in_open[entry[3], entry[4]] = False
+                return entry[3], entry[4]
+        return None
+
+    def trim_open_set(self, capacity):
+        # keep the best nodes in the open set
+        entries = [e for e in self.open_set if self.is_valid_entry(e)]
+        self.open_set = heapq.nsmallest(capacity, entries)
+        for e in entries:
+            self.in_open[e[3], e[4]] = False
+        for e in self.open_set:
+            self.in_open[e[3], e[4]] = True
+
+    def close(self, x, y):
+        self.closed[x, y] = True
+        self.fcost[x, y] = np.inf
+        if show_animation:
+            plt.plot(x, y, "g*")
 
     def get_farthest_point(self, x, y, i, j):
         i_temp, j_temp = i, j
         counter = 1
         got_goal = False
-        while not self.obs_grid[(x + i_temp, y + j_temp)] and \
+        while not self.obs_grid[x + i_temp, y + j_temp] and \
                 counter < max_theta:
             i_temp += i
             j_temp += j
@@ -171,92 +215,69 @@ class SearchAlgo:
             if [x + i_temp, y + j_temp] == self.goal_pt:
                 got_goal = True
                 break
-            if (x + i_temp, y + j_temp) not in self.obs_grid.keys():
+            if not self.in_map(x + i_temp, y + j_temp):
                 break
         return i_temp - 2*i, j_temp - 2*j, counter, got_goal
 
+    def search(self):
+        """Run the variant selected at the construction"""
+        if self.variant == "jump_point":
+            return self.jump_point()
+        return self.astar()
+
+    def get_path(self):
+        """Path from the start to the goal, following the predecessors"""
+        path = [list(self.goal_pt)]
+        while path[-1] != self.start_pt:
+            pred = self.pred[path[-1][0], path[-1][1]].tolist()
+            if show_animation:
+                if self.variant in ("theta_star", "jump_point"):
+                    plt.plot([path[-1][0], pred[0]], [path[-1][1], pred[1]],
+                             "b")
+                else:
+                    plt.plot(pred[0], pred[1], "b*")
+                plt.pause(0.001)
+            path.append(pred)
+        return path[::-1]
+
     def jump_point(self):
         """Jump point: Instead of exploring all empty spaces of the
         map, just explore the corners."""
-        plt.title('Jump Point')
-
-        goal_found = False
-        while len(self.open_set) > 0:
-            self.open_set = sorted(self.open_set, key=lambda x: x['fcost'])
-            lowest_f = self.open_set[0]['fcost']
-            lowest_h = self.open_set[0]['hcost']
-            lowest_g = self.open_set[0]['gcost']
-            p = 0
-            for p_n in self.open_set[1:]:
-                if p_n['fcost'] == lowest_f and \
-                        p_n['gcost'] < lowest_g:
-                    lowest_g = p_n['gcost']
-                    p += 1
-                elif p_n['fcost'] == lowest_f and \
-                        p_n['gcost'] == lowest_g and \
-                        p_n['hcost'] < lowest_h:
-                    lowest_h = p_n['hcost']
-                    p += 1
-                else:
-                    break
-            current_node = self.all_nodes[tuple(self.open_set[p]['pos'])]
-            x1, y1 = current_node['pos']
-
-            for cand_pt, cand_node in self.all_nodes.items():
-                x2, y2 = cand_pt
-                if x1 == x2 and y1 == y2:
-                    continue
-                if np.linalg.norm(np.array([x1, y1] -
-                                           np.array([x2, y2]))) > max_corner:
+        if show_animation:
+            plt.title('Jump Point')
+
+        while True:
+            current = self.pop_open()
+            if current is None:
+                return []
+            x1, y1 = current
+
+            dist = np.hypot(*(self.key_points - current).T)
+            candidates = self.key_points[(dist > 0) & (dist <= max_corner)]
+            for x2, y2 in candidates.tolist():
+                if self.closed[x2, y2]:
                     continue
                 reachable, offset = in_line_of_sight(self.obs_grid, x1,
                                                      y1, x2, y2)
                 if not reachable:
                     continue
 
-                if list(cand_pt) == self.goal_pt:
-                    current_node['open'] = False
-                    self.all_nodes[tuple(cand_pt)]['pred'] = \
-                        current_node['pos']
-                    goal_found = True
-                    break
-
-                g_cost = offset + current_node['gcost']
-                h_cost = self.all_nodes[cand_pt]['hcost']
-                f_cost = g_cost + h_cost
-                cand_pt = tuple(cand_pt)
-                if f_cost < self.all_nodes[cand_pt]['fcost']:
-                    self.all_nodes[cand_pt]['pred'] = current_node['pos']
-                    self.all_nodes[cand_pt]['gcost'] = g_cost
-                    self.all_nodes[cand_pt]['fcost'] = f_cost
-                    if not self.all_nodes[cand_pt]['in_open_list']:
-                        self.open_set.append(self.all_nodes[cand_pt])
-                        self.all_nodes[cand_pt]['in_open_list'] = True
-                    plt.plot(cand_pt[0], cand_pt[1], "r*")
-
-                if goal_found:
-                    break
-            plt.pause(0.001)
-            if goal_found:
-                current_node = self.all_nodes[tuple(self.goal_pt)]
-            while goal_found:
-                if current_node['pred'] is None:
-                    break
-                x = [current_node['pos'][0], current_node['pred'][0]]
-                y = [current_node['pos'][1], current_node['pred'][1]]
-                plt.plot(x, y, "b")
-                current_node = self.all_nodes[tuple(current_node['pred'])]
+                if [x2, y2] == self.goal_pt:
+                    self.pred[x2, y2] = current
+                    return self.get_path()
+
+                g_cost = offset + self.gcost[x1, y1]
+                f_cost = g_cost + self.hcost[x2, y2]
+                if f_cost < self.fcost[x2, y2]:
+                    self.pred[x2, y2] = current
+                    self.gcost[x2, y2] = g_cost
+                    self.push_open(x2, y2, f_cost)
+                    if show_animation:
+                        plt.plot(x2, y2, "r*")
+            if show_animation:
                 plt.pause(0.001)
-            if goal_found:
-                break
 
-            current_node['open'] = False
-            current_node['in_open_list'] = False
-            plt.plot(current_node['pos'][0], current_node['pos'][1], "g*")
-            del self.open_set[p]
-            current_node['fcost'], current_node['hcost'] = np.inf, np.inf
-        if show_animation:
-            plt.show()
+            self.close(x1, y1)
 
     def astar(self):
         """Beam search: Maintain an open list of just 30 nodes.
@@ -275,147 +296,92 @@ class SearchAlgo:
         one neighbor at a time. In fact, you can look for the
         next node as far out as you can as long as there is a
         clear line of sight from your current node to that node."""
-        if use_beam_search:
-            plt.title('A* with beam search')
-        elif use_iterative_deepening:
-            plt.title('A* with iterative deepening')
-        elif use_dynamic_weighting:
-            plt.title('A* with dynamic weighting')
-        elif use_theta_star:
-            plt.title('Theta*')
-        else:
-            plt.title('A*')
-
-        goal_found = False
+        if show_animation:
+            plt.title({'a_star': 'A*',
+                       'beam_search': 'A* with beam search',
+                       'iterative_deepening': 'A* with iterative deepening',
+                       'dynamic_weighting': 'A* with dynamic weighting',
+                       'theta_star': 'Theta*'}[self.variant])
+
         curr_f_thresh = np.inf
         depth = 0
         no_valid_f = False
-        while len(self.open_set) > 0:
-            self.open_set = sorted(self.open_set, key=lambda x: x['fcost'])
-            lowest_f = self.open_set[0]['fcost']
-            lowest_h = self.open_set[0]['hcost']
-            lowest_g = self.open_set[0]['gcost']
-            p = 0
-            for p_n in self.open_set[1:]:
-                if p_n['fcost'] == lowest_f and \
-                        p_n['gcost'] < lowest_g:
-                    lowest_g = p_n['gcost']
-                    p += 1
-                elif p_n['fcost'] == lowest_f and \
-                        p_n['gcost'] == lowest_g and \
-                        p_n['hcost'] < lowest_h:
-                    lowest_h = p_n['hcost']
-                    p += 1
-                else:
-                    break
-            current_node = self.all_nodes[tuple(self.open_set[p]['pos'])]
+        weight = w
+        while True:
+            current = self.pop_open()
+            if current is None:
+                return []
+            x, y = current
 
-            while len(self.open_set) > beam_capacity and use_beam_search:
-                del self.open_set[-1]
+            if self.variant == "beam_search":
+                # the current node is counted in the capacity
+                self.trim_open_set(beam_capacity - 1)
 
             f_cost_list = []
-            if use_dynamic_weighting:
-                w = (1 + epsilon - epsilon*depth/upper_bound_depth)
+            if self.variant == "dynamic_weighting":
+                weight = (1 + epsilon - epsilon*depth/upper_bound_depth)
             for i in range(-1, 2):
                 for j in range(-1, 2):
-                    x, y = current_node['pos']
-                    if (i == 0 and j == 0) or \
-                            ((x + i, y + j) not in self.obs_grid.keys()):
+                    if (i == 0 and j == 0) or not self.in_map(x + i, y + j):
                         continue
-                    if (i, j) in [(1, 0), (0, 1), (-1, 0), (0, -1)]:
+                    if i == 0 or j == 0:
                         offset = 10
                     else:
                         offset = 14
-                    if use_theta_star:
+                    if self.variant == "theta_star":
                         new_i, new_j, counter, goal_found = \
                             self.get_farthest_point(x, y, i, j)
+                        if goal_found:
+                            self.pred[tuple(self.goal_pt)] = current
+                            return self.get_path()
                         offset = offset * counter
-                        cand_pt = [current_node['pos'][0] + new_i,
-                                   current_node['pos'][1] + new_j]
+                        cand_x, cand_y = x + new_i, y + new_j
                     else:
-                        cand_pt = [current_node['pos'][0] + i,
-                                   current_node['pos'][1] + j]
-
-                    if use_theta_star and goal_found:
-                        current_node['open'] = False
-                        cand_pt = self.goal_pt
-                        self.all_nodes[tuple(cand_pt)]['pred'] = \
-                            current_node['pos']
-                        break
-
-                    if cand_pt == self.goal_pt:
-                        current_node['open'] = False
-                        self.all_nodes[tuple(cand_pt)]['pred'] = \
-                            current_node['pos']
-                        goal_found = True
-                        break
-
-                    cand_pt = tuple(cand_pt)
-                    if not self.obs_grid[tuple(cand_pt)] and \
-                            self.all_nodes[cand_pt]['open']:
-                        g_cost = offset + current_node['gcost']
-                        h_cost = self.all_nodes[cand_pt]['hcost']
-                        if use_dynamic_weighting:
-                            h_cost = h_cost * w
-                        f_cost = g_cost + h_cost
-                        if f_cost < self.all_nodes[cand_pt]['fcost'] and \
-                                f_cost <= curr_f_thresh:
-                            f_cost_list.append(f_cost)
-                            self.all_nodes[cand_pt]['pred'] = \
-                                current_node['pos']
-                            self.all_nodes[cand_pt]['gcost'] = g_cost
-                            self.all_nodes[cand_pt]['fcost'] = f_cost
-                            if not self.all_nodes[cand_pt]['in_open_list']:
-                                self.open_set.append(self.all_nodes[cand_pt])
-                                self.all_nodes[cand_pt]['in_open_list'] = True
-                            plt.plot(cand_pt[0], cand_pt[1], "r*")
-                        if curr_f_thresh < f_cost < \
-                                self.all_nodes[cand_pt]['fcost']:
-                            no_valid_f = True
-                if goal_found:
-                    break
-            plt.pause(0.001)
-            if goal_found:
-                current_node = self.all_nodes[tuple(self.goal_pt)]
-            while goal_found:
-                if current_node['pred'] is None:
-                    break
-                if use_theta_star or use_jump_point:
-                    x, y = [current_node['pos'][0], current_node['pred'][0]], \
-                             [current_node['pos'][1], current_node['pred'][1]]
-                    plt.plot(x, y, "b")
-                else:
-                    plt.plot(current_node['pred'][0],
-                             current_node['pred'][1], "b*")
-                current_node = self.all_nodes[tuple(current_node['pred'])]
+                        cand_x, cand_y = x + i, y + j
+
+                    if [cand_x, cand_y] == self.goal_pt:
+                        self.pred[cand_x, cand_y] = current
+                        return self.get_path()
+
+                    if not self.in_map(cand_x, cand_y) or \
+                            self.obs_grid[cand_x, cand_y] or \
+                            self.closed[cand_x, cand_y]:
+                        continue
+                    g_cost = offset + self.gcost[x, y]
+                    h_cost = self.hcost[cand_x, cand_y]
+                    if self.variant == "dynamic_weighting":
+                        h_cost = h_cost * weight
+                    f_cost = g_cost + h_cost
+                    if f_cost < self.fcost[cand_x, cand_y] and \
+                            f_cost <= curr_f_thresh:
+                        f_cost_list.append(f_cost)
+                        self.pred[cand_x, cand_y] = current
+                        self.gcost[cand_x, cand_y] = g_cost
+                        self.push_open(cand_x, cand_y, f_cost)
+                        if show_animation:
+                            plt.plot(cand_x, cand_y, "r*")
+                    if curr_f_thresh < f_cost < self.fcost[cand_x, cand_y]:
+                        no_valid_f = True
+            if show_animation:
                 plt.pause(0.001)
-            if goal_found:
-                break
 
-            if use_iterative_deepening and f_cost_list:
-                curr_f_thresh = min(f_cost_list)
-            if use_iterative_deepening and not f_cost_list:
-                curr_f_thresh = np.inf
-            if use_iterative_deepening and not f_cost_list and no_valid_f:
-                current_node['fcost'], current_node['hcost'] = np.inf, np.inf
-                continue
-
-            current_node['open'] = False
-            current_node['in_open_list'] = False
-            plt.plot(current_node['pos'][0], current_node['pos'][1], "g*")
-            del self.open_set[p]
-            current_node['fcost'], current_node['hcost'] = np.inf, np.inf
+            if self.variant == "iterative_deepening":
+                if f_cost_list:
+                    curr_f_thresh = min(f_cost_list)
+                else:
+                    curr_f_thresh = np.inf
+                    if no_valid_f:
+                        # keep the node at the back of the open set
+                        self.push_open(x, y, np.inf, np.inf)
+                        continue
+
+            self.close(x, y)
             depth += 1
-        if show_animation:
-            plt.show()
 
 
-def main():
+def main(variant="a_star"):
     # set obstacle positions
-    obs_dict = {}
-    for i in range(51):
-        for j in range(51):
-            obs_dict[(i, j)] = False
+    obs_grid = np.zeros((51, 51), dtype=bool)
     o_x, o_y = [], []
 
     s_x = 5.0
@@ -424,38 +390,40 @@ def main():
     g_y = 45.0
 
     # draw outer border of maze
-    draw_vertical_line(0, 0, 50, o_x, o_y, obs_dict)
-    draw_vertical_line(48, 0, 50, o_x, o_y, obs_dict)
-    draw_horizontal_line(0, 0, 50, o_x, o_y, obs_dict)
-    draw_horizontal_line(0, 48, 50, o_x, o_y, obs_dict)
+    draw_vertical_line(0, 0, 50, o_x, o_y, obs_grid)
+    draw_vertical_line(48, 0, 50, o_x, o_y, obs_grid)
+    draw_horizontal_line(0, 0, 50, o_x, o_y, obs_grid)
+    draw_horizontal_line(0, 48, 50, o_x, o_y, obs_grid)
 
     # draw inner walls
     all_x = [10, 10, 10, 15, 20, 20, 30, 30, 35, 30, 40, 45]
     all_y = [10, 30, 45, 20, 5, 40, 10, 40, 5, 40, 10, 25]
     all_len = [10, 10, 5, 10, 10, 5, 20, 10, 25, 10, 35, 15]
     for x, y, l in zip(all_x, all_y, all_len):
-        draw_vertical_line(x, y, l, o_x, o_y, obs_dict)
+        draw_vertical_line(x, y, l, o_x, o_y, obs_grid)
 
     all_x[:], all_y[:], all_len[:] = [], [], []
     all_x = [35, 40, 15, 10, 45, 20, 10, 15, 25, 45, 10, 30, 10, 40]
     all_y = [5, 10, 15, 20, 20, 25, 30, 35, 35, 35, 40, 40, 45, 45]
     all_len = [10, 5, 10, 10, 5, 5, 10, 5, 10, 5, 10, 5, 5, 5]
     for x, y, l in zip(all_x, all_y, all_len):
-        draw_horizontal_line(x, y, l, o_x, o_y, obs_dict)
-
-    plt.plot(o_x, o_y, ".k")
-    plt.plot(s_x, s_y, "og")
-    plt.plot(g_x, g_y, "xb")
-    plt.grid(True)
-
-    if use_jump_point:
-        keypoint_list = key_points(obs_dict)
-        search_obj = SearchAlgo(obs_dict, g_x, g_y, s_x, s_y, 101, 101,
-                                keypoint_list)
-        search_obj.jump_point()
-    else:
-        search_obj = SearchAlgo(obs_dict, g_x, g_y, s_x, s_y, 101, 101)
-        search_obj.astar()
+        draw_horizontal_line(x, y, l, o_x, o_y, obs_grid)
+
+    if show_animation:
+        plt.plot(o_x, o_y, ".k")
+        plt.plot(s_x, s_y, "og")
+        plt.plot(g_x, g_y, "xb")
+        plt.grid(True)
+
+    keypoint_list = key_points(obs_grid) if variant == "jump_point" else None
+    search_obj = SearchAlgo(obs_grid, g_x, g_y, s_x, s_y, 101, 101,
+                            keypoint_list, variant=variant)
+    path = search_obj.search()
+
+    if show_animation:
+        plt.show()
+
+    return path
 
 
 if __name__ == '__main__':
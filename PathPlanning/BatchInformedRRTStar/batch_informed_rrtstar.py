@@ -14,14 +14,19 @@ author: Karan Chawla(@karanchawla)
 Reference: https://arxiv.org/abs/1405.5848
 """
 
+import heapq
 import math
 import random
 
 import matplotlib.pyplot as plt
 import numpy as np
+from scipy.spatial import cKDTree
 
 show_animation = True
 
+# vertices added before the vertex KD-tree is rebuilt
+KD_TREE_REBUILD_SIZE = 100
+
 
 class RTree(object):
     # Class to represent the explicit tree created
@@ -38,6 +43,7 @@ class RTree(object):
             start = [0, 0]
         self.vertices = dict()
         self.edges = []
+        self.edge_set = set()
         self.start = start
         self.lowerLimit = lowerLimit
         self.upperLimit = upperLimit
@@ -66,12 +72,22 @@ class RTree(object):
 
     def add_edge(self, v, x):
         # create an edge between v and x vertices
-        if (v, x) not in self.edges:
+        if (v, x) not in self.edge_set:
+            self.edge_set.add((v, x))
             self.edges.append((v, x))
         # since the tree is undirected
         self.vertices[v].append(x)
         self.vertices[x].append(v)
 
+    def remove_edge(self, v, x):
+        # remove the edge between v and x vertices
+        for e in ((v, x), (x, v)):
+            if e in self.edge_set:
+                self.edge_set.remove(e)
+                self.edges.remove(e)
+        self.vertices[v].remove(x)
+        self.vertices[x].remove(v)
+
     def real_coords_to_grid_coord(self, real_coord):
         # convert real world coordinates to grid space
         # depends on the resolution of the grid
@@ -100,6 +116,13 @@ class RTree(object):
         return self.grid_coordinate_to_node_id(
             self.real_coords_to_grid_coord(real_coord))
 
+    def real_world_to_node_ids(self, real_coords):
+        # node ids of an array of real world coordinates
+        grid_coords = np.around(
+            (np.asarray(real_coords) - self.lowerLimit) / self.resolution)
+        products = np.cumprod([1] + self.num_cells[:-1])
+        return grid_coords.astype(int) @ products
+
     def grid_coord_to_real_world_coord(self, coord):
         # This function maps a grid coordinate in discrete space
         # to a configuration in the full configuration space
@@ -125,6 +148,16 @@ class RTree(object):
             node_id = node_id - (coord[i] * prod)
         return coord
 
+    def node_ids_to_real_world_coords(self, node_ids):
+        # real world coordinates of an array of node ids
+        node_ids = np.asarray(node_ids, dtype=float)
+        coords = np.zeros((len(node_ids), self.dimension))
+        for i in range(self.dimension - 1, -1, -1):
+            prod = np.prod(self.num_cells[:i])
+            coords[:, i] = np.floor(node_ids / prod)
+            node_ids = node_ids - coords[:, i] * prod
+        return np.array(self.lowerLimit) + self.resolution * coords
+
     def node_id_to_real_world_coord(self, nid):
         # This function maps a node in discrete space to a configuration
         # in the full configuration space
@@ -136,27 +169,45 @@ class BITStar(object):
 
     def __init__(self, start, goal,
                  obstacleList, randArea, eta=2.0,
-                 maxIter=80):
+                 maxIter=80, batchSize=200):
         self.start = start
         self.goal = goal
 
         self.min_rand = randArea[0]
         self.max_rand = randArea[1]
         self.max_iIter = maxIter
+        self.batch_size = batchSize
         self.obstacleList = obstacleList
+        self.obstacles = np.array(obstacleList, dtype=float).reshape(-1, 3)
         self.startId = None
         self.goalId = None
 
-        self.vertex_queue = []
-        self.edge_queue = []
+        # queues are heaps of (value, ids) with lazy removal,
+        # an entry is valid while it is in the set and its value is current
+        self.vertex_queue = set()
+        self.vertex_heap = []
+        self.edge_queue = set()
+        self.edge_heap = []
+        self.queued_edges_from = dict()  # vertex id -> queued target ids
+        self.queued_edges_to = dict()  # vertex id -> queued source ids
         self.samples = dict()
         self.g_scores = dict()
         self.f_scores = dict()
-        self.nodes = dict()
+        self.nodes = dict()  # vertex id -> parent vertex id
+        self.coords = dict()  # node id -> real world coordinate
         self.r = float('inf')
         self.eta = eta  # tunable parameter
         self.unit_ball_measure = 1
-        self.old_vertices = []
+        self.old_vertices = set()
+
+        # KD-trees of samples and vertices, rebuilt for each batch
+        self.sample_ids = np.zeros(0)
+        self.sample_coords = np.zeros((0, 2))
+        self.sample_kd_tree = None
+        self.vertex_ids = np.zeros(0)
+        self.vertex_coords = np.zeros((0, 2))
+        self.vertex_kd_tree = None
+        self.new_vertices = []  # vertices added after the rebuild
 
         # initialize tree
         lowerLimit = [randArea[0], randArea[0]]
@@ -189,7 +240,7 @@ class BITStar(object):
                             [(self.start[1] + self.goal[1]) / 2.0], [0]])
         a1 = np.array([[(self.goal[0] - self.start[0]) / cMin],
                        [(self.goal[1] - self.start[1]) / cMin], [0]])
-        eTheta = math.atan2(a1[1], a1[0])
+        eTheta = math.atan2(a1[1, 0], a1[0, 0])
         # first column of identity matrix transposed
         id1_t = np.array([1.0, 0.0, 0.0]).reshape(1, 3)
         M = np.dot(a1, id1_t)
@@ -199,7 +250,7 @@ class BITStar(object):
                    Vh)
 
         self.samples.update(self.informed_sample(
-            200, cBest, cMin, xCenter, C))
+            self.batch_size, cBest, cMin, xCenter, C))
 
         return eTheta, cMin, xCenter, C, cBest
 
@@ -213,23 +264,38 @@ class BITStar(object):
                 if foundGoal:
                     # a better way to do this would be to make number of samples
                     # a function of cMin
-                    m = 200
+                    m = self.batch_size
                     self.samples = dict()
                     self.samples[self.goalId] = self.goal
                 else:
-                    m = 100
+                    m = self.batch_size // 2
                 cBest = self.g_scores[self.goalId]
                 self.samples.update(self.informed_sample(
                     m, cBest, cMin, xCenter, C))
 
             # make the old vertices the new vertices
-            self.old_vertices += self.tree.vertices.keys()
+            self.old_vertices.update(self.tree.vertices.keys())
             # add the vertices to the vertex queue
             for nid in self.tree.vertices.keys():
-                if nid not in self.vertex_queue:
-                    self.vertex_queue.append(nid)
+                self.push_vertex_queue(nid)
+
+            self.build_kd_trees()
         return cBest
 
+    def build_kd_trees(self):
+        self.sample_ids = np.array(list(self.samples.keys()))
+        self.sample_coords = self.tree.node_ids_to_real_world_coords(
+            self.sample_ids)
+        self.sample_kd_tree = cKDTree(self.sample_coords)
+        self.build_vertex_kd_tree()
+
+    def build_vertex_kd_tree(self):
+        self.vertex_ids = np.array(list(self.tree.vertices.keys()))
+        self.vertex_coords = self.tree.node_ids_to_real_world_coords(
+            self.vertex_ids)
+        self.vertex_kd_tree = cKDTree(self.vertex_coords)
+        self.new_vertices = []
+
     def plan(self, animation=True):
 
         eTheta, cMin, xCenter, C, cBest = self.setup_planning()
@@ -243,13 +309,19 @@ class BITStar(object):
             # expand the best vertices until an edge is better than the vertex
             # this is done because the vertex cost represents the lower bound
             # on the edge cost
-            while self.best_vertex_queue_value() <= \
+            while len(self.vertex_queue) != 0 and \
+                    self.best_vertex_queue_value() <= \
                     self.best_edge_queue_value():
                 self.expand_vertex(self.best_in_vertex_queue())
 
+            if len(self.edge_queue) == 0:
+                print("Nothing good")
+                iterations += 1
+                continue
+
             # add the best edge to the tree
             bestEdge = self.best_in_edge_queue()
-            self.edge_queue.remove(bestEdge)
+            self.remove_edge_queue(bestEdge)
 
             # Check if this can improve the current solution
             estimatedCostOfVertex = self.g_scores[bestEdge[
@@ -270,10 +342,8 @@ class BITStar(object):
 
             if f1 and f2 and f3:
                 # connect this edge
-                firstCoord = self.tree.node_id_to_real_world_coord(
-                    bestEdge[0])
-                secondCoord = self.tree.node_id_to_real_world_coord(
-                    bestEdge[1])
+                firstCoord = self.get_coord(bestEdge[0])
+                secondCoord = self.get_coord(bestEdge[1])
                 path = self.connect(firstCoord, secondCoord)
                 lastEdge = self.tree.real_world_to_node_id(secondCoord)
                 if path is None or len(path) == 0:
@@ -283,6 +353,11 @@ class BITStar(object):
                     nextCoord)
                 bestEdge = (bestEdge[0], nextCoordPathId)
                 if bestEdge[1] in self.tree.vertices.keys():
+                    # rewire the vertex when the whole edge is free
+                    if nextCoordPathId == lastEdge and \
+                            actualCostOfEdge < self.g_scores[bestEdge[1]]:
+                        self.rewire(bestEdge[0], bestEdge[1])
+                        iterations += 1
                     continue
                 else:
                     try:
@@ -291,22 +366,16 @@ class BITStar(object):
                         # invalid sample key
                         pass
                     eid = self.tree.add_vertex(nextCoord)
-                    self.vertex_queue.append(eid)
+                    self.new_vertices.append(eid)
                 if eid == self.goalId or bestEdge[0] == self.goalId or \
                         bestEdge[1] == self.goalId:
                     print("Goal found")
                     foundGoal = True
 
                 self.tree.add_edge(bestEdge[0], bestEdge[1])
-
-                g_score = self.compute_distance_cost(
-                    bestEdge[0], bestEdge[1])
-                self.g_scores[bestEdge[1]] = g_score + self.g_scores[
-                    bestEdge[0]]
-                self.f_scores[
-                    bestEdge[1]] = g_score + self.compute_heuristic_cost(
-                    bestEdge[1], self.goalId)
-                self.update_graph()
+                self.nodes[bestEdge[1]] = bestEdge[0]
+                self.update_graph(bestEdge[1])
+                self.push_vertex_queue(eid)
 
                 # visualize new edge
                 if animation:
@@ -319,8 +388,7 @@ class BITStar(object):
 
             else:
                 print("Nothing good")
-                self.edge_queue = []
-                self.vertex_queue = []
+                self.clear_queues()
 
             iterations += 1
 
@@ -344,14 +412,15 @@ class BITStar(object):
         return plan
 
     def remove_queue(self, lastEdge, bestEdge):
-        for edge in self.edge_queue:
-            if edge[1] == bestEdge[1]:
-                dist_cost = self.compute_distance_cost(edge[1], bestEdge[1])
-                if self.g_scores[edge[1]] + dist_cost >= \
-                        self.g_scores[self.goalId]:
-                    if (lastEdge, bestEdge[1]) in self.edge_queue:
-                        self.edge_queue.remove(
-                            (lastEdge, bestEdge[1]))
+        # remove the queued edges to the new vertex,
+        # which cannot improve its g score
+        x = bestEdge[1]
+        for v in list(self.queued_edges_to.get(x, ())):
+            if self.g_scores[v] + self.compute_distance_cost(v, x) >= \
+                    self.g_scores[x]:
+                self.remove_edge_queue((v, x))
+        if self.g_scores[bestEdge[1]] >= self.g_scores[self.goalId]:
+            self.remove_edge_queue((lastEdge, bestEdge[1]))
 
     def connect(self, start, end):
         # A function which attempts to extend from a start coordinates
@@ -361,206 +430,235 @@ class BITStar(object):
             self.tree.real_world_to_node_id(end)) * 10)
         x = np.linspace(start[0], end[0], num=steps)
         y = np.linspace(start[1], end[1], num=steps)
-        for i in range(len(x)):
-            if self._collision_check(x[i], y[i]):
-                if i == 0:
-                    return None
-                # if collision, send path until collision
-                return np.vstack((x[0:i], y[0:i])).transpose()
+        collision = self._collision_check(x, y)
+        if np.any(collision):
+            i = int(np.argmax(collision))
+            if i == 0:
+                return None
+            # if collision, send path until collision
+            return np.vstack((x[0:i], y[0:i])).transpose()
 
         return np.vstack((x, y)).transpose()
 
     def _collision_check(self, x, y):
-        for (ox, oy, size) in self.obstacleList:
-            dx = ox - x
-            dy = oy - y
-            d = dx * dx + dy * dy
-            if d <= size ** 2:
-                return True  # collision
-        return False
+        # x and y can be arrays of positions
+        dx = self.obstacles[:, 0] - np.asarray(x)[..., None]
+        dy = self.obstacles[:, 1] - np.asarray(y)[..., None]
+        d = dx * dx + dy * dy
+        return np.any(d <= self.obstacles[:, 2] ** 2, axis=-1)  # collision
+
+    def get_coord(self, nid):
+        # real world coordinate of a node id, cached
+        if nid not in self.coords:
+            self.coords[nid] = tuple(
+                self.tree.node_id_to_real_world_coord(nid))
+        return self.coords[nid]
 
     def compute_heuristic_cost(self, start_id, goal_id):
         # Using Manhattan distance as heuristic
-        start = np.array(self.tree.node_id_to_real_world_coord(start_id))
-        goal = np.array(self.tree.node_id_to_real_world_coord(goal_id))
+        start = self.get_coord(start_id)
+        goal = self.get_coord(goal_id)
 
-        return np.linalg.norm(start - goal, 2)
+        return math.hypot(start[0] - goal[0], start[1] - goal[1])
 
     def compute_distance_cost(self, vid, xid):
         # L2 norm distance
-        start = np.array(self.tree.node_id_to_real_world_coord(vid))
-        stop = np.array(self.tree.node_id_to_real_world_coord(xid))
+        start = self.get_coord(vid)
+        stop = self.get_coord(xid)
 
-        return np.linalg.norm(stop - start, 2)
+        return math.hypot(stop[0] - start[0], stop[1] - start[1])
 
     # Sample free space confined in the radius of ball R
     def informed_sample(self, m, cMax, cMin, xCenter, C):
-        samples = dict()
         print("g_Score goal id: ", self.g_scores[self.goalId])
-        for i in range(m + 1):
-            if cMax < float('inf'):
-                r = [cMax / 2.0,
-                     math.sqrt(cMax ** 2 - cMin ** 2) / 2.0,
-                     math.sqrt(cMax ** 2 - cMin ** 2) / 2.0]
-                L = np.diag(r)
-                xBall = self.sample_unit_ball()
-                rnd = np.dot(np.dot(C, L), xBall) + xCenter
-                rnd = [rnd[(0, 0)], rnd[(1, 0)]]
-                random_id = self.tree.real_world_to_node_id(rnd)
-                samples[random_id] = rnd
-            else:
-                rnd = self.sample_free_space()
-                random_id = self.tree.real_world_to_node_id(rnd)
-                samples[random_id] = rnd
-        return samples
+        if cMax < float('inf'):
+            r = [cMax / 2.0,
+                 math.sqrt(cMax ** 2 - cMin ** 2) / 2.0,
+                 math.sqrt(cMax ** 2 - cMin ** 2) / 2.0]
+            L = np.diag(r)
+            xBall = self.sample_unit_ball(m + 1)
+            rnd = (np.dot(np.dot(C, L), xBall) + xCenter)[0:2].T
+        else:
+            rnd = self.sample_free_space(m + 1)
+
+        random_ids = self.tree.real_world_to_node_ids(rnd)
+        # later samples overwrite the former ones with the same id
+        return dict(zip(random_ids.tolist(), rnd.tolist()))
 
     # Sample point in a unit ball
     @staticmethod
-    def sample_unit_ball():
-        a = random.random()
-        b = random.random()
-
-        if b < a:
-            a, b = b, a
-
-        sample = (b * math.cos(2 * math.pi * a / b),
-                  b * math.sin(2 * math.pi * a / b))
-        return np.array([[sample[0]], [sample[1]], [0]])
-
-    def sample_free_space(self):
-        rnd = [random.uniform(self.min_rand, self.max_rand),
-               random.uniform(self.min_rand, self.max_rand)]
-
-        return rnd
+    def sample_unit_ball(n=None):
+        # one sample with shape (3, 1), or n samples with shape (3, n)
+        if n is None:
+            return BITStar.sample_unit_ball(1)
+        a = np.random.random(n)
+        b = np.random.random(n)
+        a, b = np.minimum(a, b), np.maximum(a, b)
+
+        return np.array([b * np.cos(2 * math.pi * a / b),
+                         b * np.sin(2 * math.pi * a / b),
+                         np.zeros(n)])
+
+    def sample_free_space(self, n=None):
+        if n is None:
+            return [random.uniform(self.min_rand, self.max_rand),
+                    random.uniform(self.min_rand, self.max_rand)]
+
+        return np.random.uniform(self.min_rand, self.max_rand, (n, 2))
+
+    def vertex_queue_value(self, v):
+        return self.g_scores[v] + self.compute_heuristic_cost(v, self.goalId)
+
+    def edge_queue_value(self, e):
+        # g_tau[v] + c(v,x) + h(x)
+        return self.g_scores[e[0]] + self.compute_distance_cost(e[0], e[1]) \
+            + self.compute_heuristic_cost(e[1], self.goalId)
+
+    def push_vertex_queue(self, v):
+        self.vertex_queue.add(v)
+        heapq.heappush(self.vertex_heap, (self.vertex_queue_value(v), v))
+
+    def push_edge_queue(self, e):
+        self.edge_queue.add(e)
+        self.queued_edges_from.setdefault(e[0], set()).add(e[1])
+        self.queued_edges_to.setdefault(e[1], set()).add(e[0])
+        heapq.heappush(self.edge_heap, (self.edge_queue_value(e), e))
+
+    def remove_edge_queue(self, e):
+        if e in self.edge_queue:
+            self.edge_queue.remove(e)
+            self.queued_edges_from[e[0]].discard(e[1])
+            self.queued_edges_to[e[1]].discard(e[0])
+
+    def clear_queues(self):
+        self.vertex_queue = set()
+        self.vertex_heap = []
+        self.edge_queue = set()
+        self.edge_heap = []
+        self.queued_edges_from = dict()
+        self.queued_edges_to = dict()
 
     def best_vertex_queue_value(self):
         if len(self.vertex_queue) == 0:
             return float('inf')
-        values = [self.g_scores[v]
-                  + self.compute_heuristic_cost(v, self.goalId) for v in
-                  self.vertex_queue]
-        values.sort()
-        return values[0]
+        return self.vertex_heap[0][0] if self._clean_vertex_heap() \
+            else float('inf')
 
     def best_edge_queue_value(self):
         if len(self.edge_queue) == 0:
             return float('inf')
         # return the best value in the queue by score g_tau[v] + c(v,x) + h(x)
-        values = [self.g_scores[e[0]] + self.compute_distance_cost(e[0], e[1])
-                  + self.compute_heuristic_cost(e[1], self.goalId) for e in
-                  self.edge_queue]
-        values.sort(reverse=True)
-        return values[0]
+        return self.edge_heap[0][0] if self._clean_edge_heap() \
+            else float('inf')
 
     def best_in_vertex_queue(self):
         # return the best value in the vertex queue
-        v_plus_values = [(v, self.g_scores[v] +
-                          self.compute_heuristic_cost(v, self.goalId))
-                         for v in self.vertex_queue]
-        v_plus_values = sorted(v_plus_values, key=lambda x: x[1])
-        # print(v_plus_values)
-        return v_plus_values[0][0]
+        self._clean_vertex_heap()
+        return self.vertex_heap[0][1]
 
     def best_in_edge_queue(self):
-        e_and_values = [
-            (e[0], e[1], self.g_scores[e[0]] + self.compute_distance_cost(
-                e[0], e[1]) + self.compute_heuristic_cost(e[1], self.goalId))
-            for e in self.edge_queue]
-        e_and_values = sorted(e_and_values, key=lambda x: x[2])
+        self._clean_edge_heap()
+        return self.edge_heap[0][1]
+
+    def _clean_vertex_heap(self):
+        # pop invalid entries, return True if a valid entry is on the top
+        while self.vertex_heap:
+            value, v = self.vertex_heap[0]
+            if v in self.vertex_queue and value == self.vertex_queue_value(v):
+                return True
+            heapq.heappop(self.vertex_heap)
+        return False
 
-        return e_and_values[0][0], e_and_values[0][1]
+    def _clean_edge_heap(self):
+        # pop invalid entries, return True if a valid entry is on the top
+        while self.edge_heap:
+            value, e = self.edge_heap[0]
+            if e in self.edge_queue and value == self.edge_queue_value(e):
+                return True
+            heapq.heappop(self.edge_heap)
+        return False
 
     def expand_vertex(self, vid):
         self.vertex_queue.remove(vid)
 
         # get the coordinates for given vid
-        currCoord = np.array(self.tree.node_id_to_real_world_coord(vid))
+        currCoord = np.array(self.get_coord(vid))
 
-        # get the nearest value in vertex for every one in samples where difference is
-        # less than the radius
-        neighbors = []
-        for sid, s_coord in self.samples.items():
-            s_coord = np.array(s_coord)
-            if np.linalg.norm(s_coord - currCoord, 2) <= self.r and sid != vid:
-                neighbors.append((sid, s_coord))
+        # get the samples within the radius
+        idx = np.array(
+            self.sample_kd_tree.query_ball_point(currCoord, self.r), dtype=int)
+        ids = self.sample_ids[idx]
+        coords = self.sample_coords[idx]
 
         # add an edge to the edge queue is the path might improve the solution
-        for neighbor in neighbors:
-            sid = neighbor[0]
-            h_cost = self.compute_heuristic_cost(sid, self.goalId)
-            estimated_f_score = self.compute_distance_cost(
-                self.startId, vid) + h_cost + self.compute_distance_cost(vid,
-                                                                         sid)
-            if estimated_f_score < self.g_scores[self.goalId]:
-                self.edge_queue.append((vid, sid))
+        goalCoord = self.get_coord(self.goalId)
+        estimated_f_scores = self.compute_distance_cost(self.startId, vid) + \
+            np.hypot(*(coords - goalCoord).T) + \
+            np.hypot(*(coords - currCoord).T)
+        for sid in ids[
+                estimated_f_scores < self.g_scores[self.goalId]].tolist():
+            if sid in self.samples and sid != vid:
+                self.push_edge_queue((vid, sid))
 
         # add the vertex to the edge queue
         self.add_vertex_to_edge_queue(vid, currCoord)
 
     def add_vertex_to_edge_queue(self, vid, currCoord):
         if vid not in self.old_vertices:
-            neighbors = []
-            for v, edges in self.tree.vertices.items():
-                if v != vid and (v, vid) not in self.edge_queue and \
-                        (vid, v) not in self.edge_queue:
-                    v_coord = self.tree.node_id_to_real_world_coord(v)
-                    if np.linalg.norm(currCoord - v_coord, 2) <= self.r:
-                        neighbors.append((vid, v_coord))
-
-            for neighbor in neighbors:
-                sid = neighbor[0]
-                estimated_f_score = self.compute_distance_cost(
-                    self.startId, vid) + self.compute_distance_cost(
-                    vid, sid) + self.compute_heuristic_cost(sid, self.goalId)
-                if estimated_f_score < self.g_scores[self.goalId] and (
-                        self.g_scores[vid] +
-                        self.compute_distance_cost(vid, sid)) < \
-                        self.g_scores[sid]:
-                    self.edge_queue.append((vid, sid))
-
-    def update_graph(self):
-        closedSet = []
-        openSet = []
-        currId = self.startId
-        openSet.append(currId)
-
-        while len(openSet) != 0:
-            # get the element with lowest f_score
-            currId = min(openSet, key=lambda x: self.f_scores[x])
-
-            # remove element from open set
-            openSet.remove(currId)
-
-            # Check if we're at the goal
-            if currId == self.goalId:
-                break
-
-            if currId not in closedSet:
-                closedSet.append(currId)
-
-            # find a non visited successor to the current node
-            successors = self.tree.vertices[currId]
-            for successor in successors:
-                if successor in closedSet:
+            if len(self.new_vertices) > KD_TREE_REBUILD_SIZE:
+                self.build_vertex_kd_tree()
+            # vertices within the radius, which are in the KD-tree or
+            # added after its rebuild
+            idx = np.array(self.vertex_kd_tree.query_ball_point(
+                currCoord, self.r), dtype=int)
+            ids = np.concatenate((self.vertex_ids[idx], self.new_vertices))
+            coords = np.vstack((self.vertex_coords[idx],
+                                self.tree.node_ids_to_real_world_coords(
+                                    self.new_vertices)))
+
+            dist_costs = np.hypot(*(coords - currCoord).T)
+            estimated_f_scores = self.compute_distance_cost(
+                self.startId, vid) + dist_costs + np.hypot(
+                *(coords - self.get_coord(self.goalId)).T)
+            mask = (dist_costs <= self.r) & \
+                (estimated_f_scores < self.g_scores[self.goalId])
+            for sid, dist_cost in zip(ids[mask].tolist(),
+                                      dist_costs[mask].tolist()):
+                if sid == vid or (sid, vid) in self.edge_queue or \
+                        (vid, sid) in self.edge_queue:
                     continue
-                else:
-                    # calculate tentative g score
-                    g_score = self.g_scores[currId] + \
-                              self.compute_distance_cost(currId, successor)
-                    if successor not in openSet:
-                        # add the successor to open set
-                        openSet.append(successor)
-                    elif g_score >= self.g_scores[successor]:
-                        continue
-
-                    # update g and f scores
-                    self.g_scores[successor] = g_score
-                    self.f_scores[
-                        successor] = g_score + self.compute_heuristic_cost(
-                        successor, self.goalId)
-
-                    # store the parent and child
-                    self.nodes[successor] = currId
+                if self.g_scores[vid] + dist_cost < self.g_scores[sid]:
+                    self.push_edge_queue((vid, sid))
+
+    def rewire(self, vid, xid):
+        # make vid the parent of the vertex xid
+        self.tree.remove_edge(self.nodes[xid], xid)
+        self.tree.add_edge(vid, xid)
+        self.nodes[xid] = vid
+        self.update_graph(xid)
+
+    def update_graph(self, vid):
+        # update the g and f scores of vid from its parent,
+        # and propagate them to its descendants
+        stack = [vid]
+        while stack:
+            currId = stack.pop()
+            parent = self.nodes[currId]
+            g_score = self.g_scores[parent] + \
+                self.compute_distance_cost(parent, currId)
+            self.g_scores[currId] = g_score
+            self.f_scores[currId] = g_score + self.compute_heuristic_cost(
+                currId, self.goalId)
+
+            # the queue values of the vertex and its edges are changed
+            if currId in self.vertex_queue:
+                self.push_vertex_queue(currId)
+            for xid in self.queued_edges_from.get(currId, ()):
+                heapq.heappush(self.edge_heap, (
+                    self.edge_queue_value((currId, xid)), (currId, xid)))
+
+            stack.extend(child for child in self.tree.vertices[currId]
+                         if self.nodes.get(child) == currId)
 
     def draw_graph(self, xCenter=None, cBest=None, cMin=None, eTheta=None,
                    samples=None, start=None, end=None):
@@ -569,11 +667,12 @@ class BITStar(object):
         plt.gcf().canvas.mpl_connect(
             'key_release_event',
             lambda event: [exit(0) if event.key == 'escape' else None])
-        for rnd in samples:
-            if rnd is not None:
-                plt.plot(rnd[0], rnd[1], "^k")
-                if cBest != float('inf'):
-                    self.plot_ellipse(xCenter, cBest, cMin, eTheta)
+        samples = [rnd for rnd in samples if rnd is not None]
+        if samples:
+            plt.plot([rnd[0] for rnd in samples],
+                     [rnd[1] for rnd in samples], "^k")
+            if cBest != float('inf'):
+                self.plot_ellipse(xCenter, cBest, cMin, eTheta)
 
         if start is not None and end is not None:
             plt.plot([start[0], start[1]], [end[0], end[1]], "-g")
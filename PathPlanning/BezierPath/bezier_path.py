@@ -6,6 +6,8 @@ author: Atsushi Sakai(@Atsushi_twi)
 
 """
 
+from functools import lru_cache
+
 import matplotlib.pyplot as plt
 import numpy as np
 import scipy.special
@@ -46,11 +48,8 @@ def calc_bezier_path(control_points, n_points=100):
     :param n_points: (int) number of points in the trajectory
     :return: (numpy array)
     """
-    traj = []
-    for t in np.linspace(0, 1, n_points):
-        traj.append(bezier(t, control_points))
-
-    return np.array(traj)
+    n = len(control_points) - 1
+    return calc_bernstein_matrix(n, n_points) @ np.asarray(control_points)
 
 
 def bernstein_poly(n, i, t):
@@ -58,23 +57,52 @@ def bernstein_poly(n, i, t):
     Bernstein polynom.
 
     :param n: (int) polynom degree
-    :param i: (int)
-    :param t: (float)
-    :return: (float)
+    :param i: (int or numpy array)
+    :param t: (float or numpy array)
+    :return: (float or numpy array)
     """
     return scipy.special.comb(n, i) * t ** i * (1 - t) ** (n - i)
 
 
+def bernstein_matrix(n, t):
+    """
+    Bernstein basis of degree n evaluated at every t.
+
+    :param n: (int) polynom degree
+    :param t: (numpy array) numbers in [0, 1]
+    :return: (numpy array) len(t) x (n + 1) matrix
+    """
+    t = np.asarray(t, dtype=float)[:, np.newaxis]
+    return bernstein_poly(n, np.arange(n + 1), t)
+
+
+@lru_cache(maxsize=32)
+def calc_bernstein_matrix(n, n_points):
+    """
+    Cached Bernstein matrix on n_points evenly spaced values of t.
+
+    :param n: (int) polynom degree
+    :param n_points: (int) number of points in the trajectory
+    :return: (numpy array) read only n_points x (n + 1) matrix
+    """
+    matrix = bernstein_matrix(n, np.linspace(0, 1, n_points))
+    matrix.flags.writeable = False
+    return matrix
+
+
 def bezier(t, control_points):
     """
-    Return one point on the bezier curve.
+    Return points on the bezier curve.
 
-    :param t: (float) number in [0, 1]
+    :param t: (float or numpy array) number(s) in [0, 1]
     :param control_points: (numpy array)
-    :return: (numpy array) Coordinates of the point
+    :return: (numpy array) Coordinates of the point, one row per t
+        when t is an array
     """
     n = len(control_points) - 1
-    return np.sum([bernstein_poly(n, i, t) * control_points[i] for i in range(n + 1)], axis=0)
+    points = bernstein_matrix(n, np.atleast_1d(t)) @ np.asarray(
+        control_points)
+    return points if np.ndim(t) else points[0]
 
 
 def bezier_derivatives_control_points(control_points, n_derivatives):
@@ -90,23 +118,49 @@ def bezier_derivatives_control_points(control_points, n_derivatives):
     e.g., n_derivatives=2 -> compute control points for first and second derivatives
     :return: ([numpy array])
     """
-    w = {0: control_points}
+    w = {0: np.asarray(control_points)}
     for i in range(n_derivatives):
         n = len(w[i])
-        w[i + 1] = np.array([(n - 1) * (w[i][j + 1] - w[i][j])
-                             for j in range(n - 1)])
+        w[i + 1] = (n - 1) * np.diff(w[i], axis=0)
     return w
 
 
+def calc_bezier_derivatives(control_points, n_derivatives, n_points=100):
+    """
+    Compute the path and its successive derivatives at every point.
+
+    :param control_points: (numpy array)
+    :param n_derivatives: (int)
+    :param n_points: (int) number of points in the trajectory
+    :return: ([numpy array]) n_points x 2 array per derivative order,
+        the path itself first
+    """
+    w = bezier_derivatives_control_points(control_points, n_derivatives)
+    return [calc_bernstein_matrix(len(w[i]) - 1, n_points) @ w[i]
+            for i in range(n_derivatives + 1)]
+
+
+def calc_bezier_curvature(control_points, n_points=100):
+    """
+    Compute the curvature at every point of the bezier path.
+
+    :param control_points: (numpy array)
+    :param n_points: (int) number of points in the trajectory
+    :return: (numpy array)
+    """
+    _, d, dd = calc_bezier_derivatives(control_points, 2, n_points)
+    return curvature(d[:, 0], d[:, 1], dd[:, 0], dd[:, 1])
+
+
 def curvature(dx, dy, ddx, ddy):
     """
-    Compute curvature at one point given first and second derivatives.
+    Compute curvature given first and second derivatives.
 
-    :param dx: (float) First derivative along x axis
-    :param dy: (float)
-    :param ddx: (float) Second derivative along x axis
-    :param ddy: (float)
-    :return: (float)
+    :param dx: (float or numpy array) First derivative along x axis
+    :param dy: (float or numpy array)
+    :param ddx: (float or numpy array) Second derivative along x axis
+    :param ddy: (float or numpy array)
+    :return: (float or numpy array)
     """
     return (dx * ddy - dy * ddx) / (dx ** 2 + dy ** 2) ** (3 / 2)
 
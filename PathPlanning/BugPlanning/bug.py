@@ -6,6 +6,7 @@ Source: https://sites.google.com/site/ece452bugalgorithms/
 
 import numpy as np
 import matplotlib.pyplot as plt
+from scipy.ndimage import binary_erosion
 
 show_animation = True
 
@@ -18,40 +19,83 @@ class BugPlanner:
         self.obs_y = obs_y
         self.r_x = [start_x]
         self.r_y = [start_y]
-        self.out_x = []
-        self.out_y = []
-        for o_x, o_y in zip(obs_x, obs_y):
-            for add_x, add_y in zip([1, 0, -1, -1, -1, 0, 1, 1],
-                                    [1, 1, 1, 0, -1, -1, -1, 0]):
-                cand_x, cand_y = o_x+add_x, o_y+add_y
-                valid_point = True
-                for _x, _y in zip(obs_x, obs_y):
-                    if cand_x == _x and cand_y == _y:
-                        valid_point = False
-                        break
-                if valid_point:
-                    self.out_x.append(cand_x), self.out_y.append(cand_y)
+
+        # occupancy bitmap covering obstacles, start and goal with a margin
+        # of two cells so that the boundary ring never touches the edge
+        xs = np.append(np.asarray(obs_x, dtype=float), [start_x, goal_x])
+        ys = np.append(np.asarray(obs_y, dtype=float), [start_y, goal_y])
+        self.min_x = int(np.floor(xs.min())) - 2
+        self.min_y = int(np.floor(ys.min())) - 2
+        self.x_width = int(np.ceil(xs.max())) + 3 - self.min_x
+        self.y_width = int(np.ceil(ys.max())) + 3 - self.min_y
+        self.obs_map = np.zeros((self.x_width, self.y_width), dtype=bool)
+        ix, iy = self.calc_grid_index(np.asarray(obs_x),
+                                      np.asarray(obs_y))
+        self.obs_map[ix, iy] = True
+
+        # free cells 8-connected to an obstacle: free space minus its erosion
+        free = ~self.obs_map
+        self.out_map = free & ~binary_erosion(
+            free, structure=np.ones((3, 3), dtype=bool), border_value=1)
+        out_ix, out_iy = np.nonzero(self.out_map)
+        self.out_x = out_ix + self.min_x
+        self.out_y = out_iy + self.min_y
+
+    def calc_grid_index(self, x, y):
+        return (np.rint(x).astype(int) - self.min_x,
+                np.rint(y).astype(int) - self.min_y)
+
+    def is_in(self, grid_map, x, y):
+        ix = int(round(x)) - self.min_x
+        iy = int(round(y)) - self.min_y
+        if 0 <= ix < self.x_width and 0 <= iy < self.y_width:
+            return bool(grid_map[ix, iy])
+        return False
+
+    def is_out(self, x, y):
+        return self.is_in(self.out_map, x, y)
+
+    def is_obstacle(self, x, y):
+        return self.is_in(self.obs_map, x, y)
 
     def mov_normal(self):
         return self.r_x[-1] + np.sign(self.goal_x - self.r_x[-1]), \
                self.r_y[-1] + np.sign(self.goal_y - self.r_y[-1])
 
-    def mov_to_next_obs(self, visited_x, visited_y):
+    def mov_to_next_obs(self, visited):
         for add_x, add_y in zip([1, 0, -1, 0], [0, 1, 0, -1]):
             c_x, c_y = self.r_x[-1] + add_x, self.r_y[-1] + add_y
-            for _x, _y in zip(self.out_x, self.out_y):
-                use_pt = True
-                if c_x == _x and c_y == _y:
-                    for v_x, v_y in zip(visited_x, visited_y):
-                        if c_x == v_x and c_y == v_y:
-                            use_pt = False
-                            break
-                    if use_pt:
-                        return c_x, c_y, False
-                if not use_pt:
-                    break
+            if self.is_out(c_x, c_y) and (c_x, c_y) not in visited:
+                return c_x, c_y, False
         return self.r_x[-1], self.r_y[-1], True
 
+    def calc_m_line_hits(self):
+        """
+        Walk the straight line from start to goal once and return it with
+        the boundary cells it crosses, in order, and a bitmap of them
+        """
+        straight_x, straight_y = [self.r_x[-1]], [self.r_y[-1]]
+        hits = []
+        hit_map = np.zeros_like(self.out_map)
+        while not (straight_x[-1] == self.goal_x and
+                   straight_y[-1] == self.goal_y):
+            c_x = straight_x[-1] + np.sign(self.goal_x - straight_x[-1])
+            c_y = straight_y[-1] + np.sign(self.goal_y - straight_y[-1])
+            if self.is_out(c_x, c_y):
+                hits.append((c_x, c_y))
+                hit_map[self.calc_grid_index(c_x, c_y)] = True
+            straight_x.append(c_x), straight_y.append(c_y)
+        return straight_x, straight_y, hits, hit_map
+
+    def plot_map(self, title=None):
+        plt.plot(self.obs_x, self.obs_y, ".k")
+        plt.plot(self.r_x[-1], self.r_y[-1], "og")
+        plt.plot(self.goal_x, self.goal_y, "xb")
+        plt.plot(self.out_x, self.out_y, ".")
+        if title is not None:
+            plt.grid(True)
+            plt.title(title)
+
     def bug0(self):
         """
         Greedy algorithm where you move towards goal
@@ -62,19 +106,12 @@ class BugPlanner:
         mov_dir = 'normal'
         cand_x, cand_y = -np.inf, -np.inf
         if show_animation:
-            plt.plot(self.obs_x, self.obs_y, ".k")
-            plt.plot(self.r_x[-1], self.r_y[-1], "og")
-            plt.plot(self.goal_x, self.goal_y, "xb")
-            plt.plot(self.out_x, self.out_y, ".")
-            plt.grid(True)
-            plt.title('BUG 0')
+            self.plot_map('BUG 0')
 
-        for x_ob, y_ob in zip(self.out_x, self.out_y):
-            if self.r_x[-1] == x_ob and self.r_y[-1] == y_ob:
-                mov_dir = 'obs'
-                break
+        if self.is_out(self.r_x[-1], self.r_y[-1]):
+            mov_dir = 'obs'
 
-        visited_x, visited_y = [], []
+        visited = set()
         while True:
             if self.r_x[-1] == self.goal_x and \
                     self.r_y[-1] == self.goal_y:
@@ -82,31 +119,18 @@ class BugPlanner:
             if mov_dir == 'normal':
                 cand_x, cand_y = self.mov_normal()
             if mov_dir == 'obs':
-                cand_x, cand_y, _ = self.mov_to_next_obs(visited_x, visited_y)
+                cand_x, cand_y, _ = self.mov_to_next_obs(visited)
             if mov_dir == 'normal':
-                found_boundary = False
-                for x_ob, y_ob in zip(self.out_x, self.out_y):
-                    if cand_x == x_ob and cand_y == y_ob:
-                        self.r_x.append(cand_x), self.r_y.append(cand_y)
-                        visited_x[:], visited_y[:] = [], []
-                        visited_x.append(cand_x), visited_y.append(cand_y)
-                        mov_dir = 'obs'
-                        found_boundary = True
-                        break
-                if not found_boundary:
-                    self.r_x.append(cand_x), self.r_y.append(cand_y)
+                self.r_x.append(cand_x), self.r_y.append(cand_y)
+                if self.is_out(cand_x, cand_y):
+                    visited = {(cand_x, cand_y)}
+                    mov_dir = 'obs'
             elif mov_dir == 'obs':
-                can_go_normal = True
-                for x_ob, y_ob in zip(self.obs_x, self.obs_y):
-                    if self.mov_normal()[0] == x_ob and \
-                            self.mov_normal()[1] == y_ob:
-                        can_go_normal = False
-                        break
-                if can_go_normal:
+                if not self.is_obstacle(*self.mov_normal()):
                     mov_dir = 'normal'
                 else:
                     self.r_x.append(cand_x), self.r_y.append(cand_y)
-                    visited_x.append(cand_x), visited_y.append(cand_y)
+                    visited.add((cand_x, cand_y))
             if show_animation:
                 plt.plot(self.r_x, self.r_y, "-r")
                 plt.pause(0.001)
@@ -129,19 +153,13 @@ class BugPlanner:
         back_to_start = False
         second_round = False
         if show_animation:
-            plt.plot(self.obs_x, self.obs_y, ".k")
-            plt.plot(self.r_x[-1], self.r_y[-1], "og")
-            plt.plot(self.goal_x, self.goal_y, "xb")
-            plt.plot(self.out_x, self.out_y, ".")
-            plt.grid(True)
-            plt.title('BUG 1')
+            self.plot_map('BUG 1')
 
-        for xob, yob in zip(self.out_x, self.out_y):
-            if self.r_x[-1] == xob and self.r_y[-1] == yob:
-                mov_dir = 'obs'
-                break
+        if self.is_out(self.r_x[-1], self.r_y[-1]):
+            mov_dir = 'obs'
 
-        visited_x, visited_y = [], []
+        visited = set()
+        n_visited = 0
         while True:
             if self.r_x[-1] == self.goal_x and \
                     self.r_y[-1] == self.goal_y:
@@ -150,36 +168,30 @@ class BugPlanner:
                 cand_x, cand_y = self.mov_normal()
             if mov_dir == 'obs':
                 cand_x, cand_y, back_to_start = \
-                    self.mov_to_next_obs(visited_x, visited_y)
+                    self.mov_to_next_obs(visited)
             if mov_dir == 'normal':
-                found_boundary = False
-                for x_ob, y_ob in zip(self.out_x, self.out_y):
-                    if cand_x == x_ob and cand_y == y_ob:
-                        self.r_x.append(cand_x), self.r_y.append(cand_y)
-                        visited_x[:], visited_y[:] = [], []
-                        visited_x.append(cand_x), visited_y.append(cand_y)
-                        mov_dir = 'obs'
-                        dist = np.inf
-                        back_to_start = False
-                        second_round = False
-                        found_boundary = True
-                        break
-                if not found_boundary:
-                    self.r_x.append(cand_x), self.r_y.append(cand_y)
+                self.r_x.append(cand_x), self.r_y.append(cand_y)
+                if self.is_out(cand_x, cand_y):
+                    visited = {(cand_x, cand_y)}
+                    n_visited = 1
+                    mov_dir = 'obs'
+                    dist = np.inf
+                    back_to_start = False
+                    second_round = False
             elif mov_dir == 'obs':
-                d = np.linalg.norm(np.array([cand_x, cand_y] -
-                                            np.array([self.goal_x,
-                                                      self.goal_y])))
+                d = np.hypot(cand_x - self.goal_x, cand_y - self.goal_y)
                 if d < dist and not second_round:
                     exit_x, exit_y = cand_x, cand_y
                     dist = d
                 if back_to_start and not second_round:
                     second_round = True
-                    del self.r_x[-len(visited_x):]
-                    del self.r_y[-len(visited_y):]
-                    visited_x[:], visited_y[:] = [], []
+                    del self.r_x[-n_visited:]
+                    del self.r_y[-n_visited:]
+                    visited = set()
+                    n_visited = 0
                 self.r_x.append(cand_x), self.r_y.append(cand_y)
-                visited_x.append(cand_x), visited_y.append(cand_y)
+                visited.add((cand_x, cand_y))
+                n_visited += 1
                 if cand_x == exit_x and \
                         cand_y == exit_y and \
                         second_round:
@@ -206,36 +218,20 @@ class BugPlanner:
         mov_dir = 'normal'
         cand_x, cand_y = -np.inf, -np.inf
         if show_animation:
-            plt.plot(self.obs_x, self.obs_y, ".k")
-            plt.plot(self.r_x[-1], self.r_y[-1], "og")
-            plt.plot(self.goal_x, self.goal_y, "xb")
-            plt.plot(self.out_x, self.out_y, ".")
+            self.plot_map()
 
-        straight_x, straight_y = [self.r_x[-1]], [self.r_y[-1]]
-        hit_x, hit_y = [], []
-        while True:
-            if straight_x[-1] == self.goal_x and \
-                    straight_y[-1] == self.goal_y:
-                break
-            c_x = straight_x[-1] + np.sign(self.goal_x - straight_x[-1])
-            c_y = straight_y[-1] + np.sign(self.goal_y - straight_y[-1])
-            for x_ob, y_ob in zip(self.out_x, self.out_y):
-                if c_x == x_ob and c_y == y_ob:
-                    hit_x.append(c_x), hit_y.append(c_y)
-                    break
-            straight_x.append(c_x), straight_y.append(c_y)
+        straight_x, straight_y, hits, hit_map = self.calc_m_line_hits()
         if show_animation:
             plt.plot(straight_x, straight_y, ",")
-            plt.plot(hit_x, hit_y, "d")
+            plt.plot([x for (x, _) in hits], [y for (_, y) in hits], "d")
             plt.grid(True)
             plt.title('BUG 2')
 
-        for x_ob, y_ob in zip(self.out_x, self.out_y):
-            if self.r_x[-1] == x_ob and self.r_y[-1] == y_ob:
-                mov_dir = 'obs'
-                break
+        if self.is_out(self.r_x[-1], self.r_y[-1]):
+            mov_dir = 'obs'
 
-        visited_x, visited_y = [], []
+        visited = set()
+        next_hit = 0
         while True:
             if self.r_x[-1] == self.goal_x \
                     and self.r_y[-1] == self.goal_y:
@@ -243,30 +239,23 @@ class BugPlanner:
             if mov_dir == 'normal':
                 cand_x, cand_y = self.mov_normal()
             if mov_dir == 'obs':
-                cand_x, cand_y, _ = self.mov_to_next_obs(visited_x, visited_y)
+                cand_x, cand_y, _ = self.mov_to_next_obs(visited)
             if mov_dir == 'normal':
-                found_boundary = False
-                for x_ob, y_ob in zip(self.out_x, self.out_y):
-                    if cand_x == x_ob and cand_y == y_ob:
-                        self.r_x.append(cand_x), self.r_y.append(cand_y)
-                        visited_x[:], visited_y[:] = [], []
-                        visited_x.append(cand_x), visited_y.append(cand_y)
-                        del hit_x[0]
-                        del hit_y[0]
-                        mov_dir = 'obs'
-                        found_boundary = True
-                        break
-                if not found_boundary:
-                    self.r_x.append(cand_x), self.r_y.append(cand_y)
+                self.r_x.append(cand_x), self.r_y.append(cand_y)
+                if self.is_out(cand_x, cand_y):
+                    visited = {(cand_x, cand_y)}
+                    # drop the first M-line hit that is still pending
+                    while not hit_map[self.calc_grid_index(
+                            *hits[next_hit])]:
+                        next_hit += 1
+                    hit_map[self.calc_grid_index(*hits[next_hit])] = False
+                    mov_dir = 'obs'
             elif mov_dir == 'obs':
                 self.r_x.append(cand_x), self.r_y.append(cand_y)
-                visited_x.append(cand_x), visited_y.append(cand_y)
-                for i_x, i_y in zip(range(len(hit_x)), range(len(hit_y))):
-                    if cand_x == hit_x[i_x] and cand_y == hit_y[i_y]:
-                        del hit_x[i_x]
-                        del hit_y[i_y]
-                        mov_dir = 'normal'
-                        break
+                visited.add((cand_x, cand_y))
+                if self.is_in(hit_map, cand_x, cand_y):
+                    hit_map[self.calc_grid_index(cand_x, cand_y)] = False
+                    mov_dir = 'normal'
             if show_animation:
                 plt.plot(self.r_x, self.r_y, "-r")
                 plt.pause(0.001)
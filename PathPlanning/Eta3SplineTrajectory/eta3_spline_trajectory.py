@@ -25,6 +25,9 @@ except:
 
 show_animation = True
 
+# number of intervals per segment in the arc length -> parameter table
+ARC_LENGTH_TABLE_SIZE = 1000
+
 
 class MaxVelocityNotReached(Exception):
     def __init__(self, actual_vel, max_vel):
@@ -57,8 +60,7 @@ class eta3_trajectory(eta3_path):
             (np.array([0]), np.cumsum(length_array)))
         # compute velocity profile on top of the path
         self.velocity_profile()
-        self.ui_prev = 0
-        self.prev_seg_id = 0
+        self.arc_length_table()
 
     def velocity_profile(self):
         '''                   /~~~~~----------------~~~~~\
@@ -89,14 +91,13 @@ class eta3_trajectory(eta3_path):
         # s_sf: length of final section
         s_sf = self.max_jerk * t_sf**3 / 6.
         # solve for the maximum achievable velocity based on the kinematic limits imposed by max_accel and max_jerk
-        # this leads to a quadratic equation in v_max: a*v_max**2 + b*v_max + c = 0
+        # the lengths of sections 0-2 and 4-6 sum up to the path length,
+        # a quadratic equation in v_max: a*v_max**2 + b*v_max + c = 0
         a = 1 / self.max_accel
-        b = 3. * self.max_accel / (2. * self.max_jerk) + v_s1 / self.max_accel - (
-            self.max_accel**2 / self.max_jerk + v_s1) / self.max_accel
-        c = s_s1 + s_sf - self.total_length - 7. * self.max_accel**3 / (3. * self.max_jerk**2) \
-            - v_s1 * (self.max_accel / self.max_jerk + v_s1 / self.max_accel) \
-            + (self.max_accel**2 / self.max_jerk + v_s1 /
-               self.max_accel)**2 / (2. * self.max_accel)
+        b = self.max_accel / self.max_jerk
+        c = s_s1 + s_sf - self.total_length \
+            - 5. * self.max_accel**3 / (24. * self.max_jerk**2) \
+            - v_s1**2 / (2. * self.max_accel)
         v_max = (-b + np.sqrt(b**2 - 4. * a * c)) / (2. * a)
 
         # v_max represents the maximum velocity that could be attained if there was no cruise period
@@ -189,106 +190,116 @@ class eta3_trajectory(eta3_path):
         assert(np.all(self.times >= 0))
         self.total_time = self.times.sum()
 
-    def get_interp_param(self, seg_id, s, ui, tol=0.001):
-        def f(u):
-            return self.segments[seg_id].f_length(u)[0] - s
-
-        def fprime(u):
-            return self.segments[seg_id].s_dot(u)
-        while (ui >= 0 and ui <= 1) and abs(f(ui)) > tol:
-            ui -= f(ui) / fprime(ui)
-        ui = max(0, min(ui, 1))
-        return ui
+    def arc_length_table(self, n_intervals=ARC_LENGTH_TABLE_SIZE):
+        """
+        tabulate the path parameter p = seg_id + u against the arc length
+        along the whole path, integrating s_dot with Gauss-Legendre
+        quadrature on every table interval
+        """
+        self.coeffs = np.array([seg.coeffs for seg in self.segments])
+        nodes, weights = np.polynomial.legendre.leggauss(5)
+        u = np.linspace(0., 1., n_intervals + 1)
+        h = np.diff(u)
+        uq = u[:-1, np.newaxis] + h[:, np.newaxis] * (nodes + 1.) / 2.
+        self.s_table = [np.zeros(1)]
+        self.p_table = [np.zeros(1)]
+        for seg_id in range(len(self.segments)):
+            seg_ids = np.full(uq.size, seg_id)
+            s_dot = self.calc_s_dot(seg_ids, uq.ravel()).reshape(uq.shape)
+            ds = s_dot.dot(weights) * h / 2.
+            s = np.cumsum(ds)
+            # pin the table end to the segment length used by the profile
+            s *= self.segments[seg_id].segment_length / s[-1]
+            self.s_table.append(self.cum_lengths[seg_id] + s)
+            self.p_table.append(seg_id + u[1:])
+        self.s_table = np.concatenate(self.s_table)
+        self.p_table = np.concatenate(self.p_table)
+
+    def calc_derivs(self, seg_ids, u):
+        """
+        first and second derivatives w.r.t. u for arrays of segment ids
+        and interpolation parameters, each of shape (len(u), 2)
+        """
+        powers = u[:, np.newaxis] ** np.arange(7)
+        d = np.einsum('nij,nj->ni', self.coeffs[seg_ids, :, 1:],
+                      np.arange(1, 8) * powers)
+        dd = np.einsum('nij,nj->ni', self.coeffs[seg_ids, :, 2:],
+                       np.arange(2, 8) * np.arange(1, 7) * powers[:, :6])
+        return d, dd
+
+    def calc_s_dot(self, seg_ids, u):
+        d, _ = self.calc_derivs(seg_ids, u)
+        return np.maximum(np.hypot(d[:, 0], d[:, 1]), 1e-6)
+
+    def calc_velocity_profile(self, time):
+        """
+        arc length, velocity and acceleration of the velocity profile
+        for an array of times
+        """
+        # jerk is constant on every section, so each one is a cubic in time
+        t_start = np.concatenate(([0.], np.cumsum(self.times)))
+        s_start = np.concatenate(([0.], np.cumsum(self.seg_lengths)))
+        v_start = np.array([self.v0, self.vels[0], self.vels[1],
+                            self.max_vel, self.max_vel,
+                            self.vels[4], self.vels[5]])
+        a_start = np.array([self.a0, self.max_accel, self.max_accel,
+                            0., 0., -self.max_accel, -self.max_accel])
+        jerk = self.max_jerk * np.array([1., 0., -1., 0., -1., 0., 1.])
+
+        time = np.asarray(time, dtype=float)
+        k = np.minimum(np.searchsorted(t_start[1:], time), 6)
+        dt = time - t_start[k]
+        s = s_start[k] + v_start[k] * dt + a_start[k] * dt**2 / 2. \
+            + jerk[k] * dt**3 / 6.
+        linear_velocity = v_start[k] + a_start[k] * dt + jerk[k] * dt**2 / 2.
+        linear_accel = a_start[k] + jerk[k] * dt
+
+        # at rest at the end of the path
+        done = time >= self.total_time
+        s[done] = self.total_length
+        linear_velocity[done] = 0.
+        linear_accel[done] = 0.
+        return s, linear_velocity, linear_accel
+
+    def calc_traj_points(self, times):
+        """
+        states [x, y, yaw, linear velocity, angular velocity] for an
+        array of times, one column per time
+        """
+        s, linear_velocity, linear_accel = self.calc_velocity_profile(times)
+
+        # invert arc length through the table
+        p = np.interp(s, self.s_table, self.p_table)
+        seg_ids = np.minimum(p.astype(int), len(self.segments) - 1)
+        ui = np.clip(p - seg_ids, 0., 1.)
 
-    def calc_traj_point(self, time):
-        # compute velocity at time
-        if time <= self.times[0]:
-            linear_velocity = self.v0 + self.max_jerk * time**2 / 2.
-            s = self.v0 * time + self.max_jerk * time**3 / 6
-            linear_accel = self.max_jerk * time
-        elif time <= self.times[:2].sum():
-            delta_t = time - self.times[0]
-            linear_velocity = self.vels[0] + self.max_accel * delta_t
-            s = self.seg_lengths[0] + self.vels[0] * \
-                delta_t + self.max_accel * delta_t**2 / 2.
-            linear_accel = self.max_accel
-        elif time <= self.times[:3].sum():
-            delta_t = time - self.times[:2].sum()
-            linear_velocity = self.vels[1] + self.max_accel * \
-                delta_t - self.max_jerk * delta_t**2 / 2.
-            s = self.seg_lengths[:2].sum() + self.vels[1] * delta_t + self.max_accel * delta_t**2 / 2. \
-                - self.max_jerk * delta_t**3 / 6.
-            linear_accel = self.max_accel - self.max_jerk * delta_t
-        elif time <= self.times[:4].sum():
-            delta_t = time - self.times[:3].sum()
-            linear_velocity = self.vels[3]
-            s = self.seg_lengths[:3].sum() + self.vels[3] * delta_t
-            linear_accel = 0.
-        elif time <= self.times[:5].sum():
-            delta_t = time - self.times[:4].sum()
-            linear_velocity = self.vels[3] - self.max_jerk * delta_t**2 / 2.
-            s = self.seg_lengths[:4].sum() + self.vels[3] * \
-                delta_t - self.max_jerk * delta_t**3 / 6.
-            linear_accel = -self.max_jerk * delta_t
-        elif time <= self.times[:-1].sum():
-            delta_t = time - self.times[:5].sum()
-            linear_velocity = self.vels[4] - self.max_accel * delta_t
-            s = self.seg_lengths[:5].sum() + self.vels[4] * \
-                delta_t - self.max_accel * delta_t**2 / 2.
-            linear_accel = -self.max_accel
-        elif time < self.times.sum():
-            delta_t = time - self.times[:-1].sum()
-            linear_velocity = self.vels[5] - self.max_accel * \
-                delta_t + self.max_jerk * delta_t**2 / 2.
-            s = self.seg_lengths[:-1].sum() + self.vels[5] * delta_t - self.max_accel * delta_t**2 / 2. \
-                + self.max_jerk * delta_t**3 / 6.
-            linear_accel = -self.max_accel + self.max_jerk * delta_t
-        else:
-            linear_velocity = 0.
-            s = self.total_length
-            linear_accel = 0.
-        seg_id = np.max(np.argwhere(self.cum_lengths <= s))
-
-        # will happen at the end of the segment
-        if seg_id == len(self.segments):
-            seg_id -= 1
-            ui = 1
-        else:
-            # compute interpolation parameter using length from current segment's starting point
-            curr_segment_length = s - self.cum_lengths[seg_id]
-            ui = self.get_interp_param(
-                seg_id=seg_id, s=curr_segment_length, ui=self.ui_prev)
-
-        if not seg_id == self.prev_seg_id:
-            self.ui_prev = 0
-        else:
-            self.ui_prev = ui
-
-        self.prev_seg_id = seg_id
         # compute angular velocity of current point= (ydd*xd - xdd*yd) / (xd**2 + yd**2)
-        d = self.segments[seg_id].calc_deriv(ui, order=1)
-        dd = self.segments[seg_id].calc_deriv(ui, order=2)
+        d, dd = self.calc_derivs(seg_ids, ui)
         # su - the rate of change of arclength wrt u
-        su = self.segments[seg_id].s_dot(ui)
-        if not np.isclose(su, 0.) and not np.isclose(linear_velocity, 0.):
-            # ut - time-derivative of interpolation parameter u
-            ut = linear_velocity / su
-            # utt - time-derivative of ut
-            utt = linear_accel / su - \
-                (d[0] * dd[0] + d[1] * dd[1]) / su**2 * ut
-            xt = d[0] * ut
-            yt = d[1] * ut
-            xtt = dd[0] * ut**2 + d[0] * utt
-            ytt = dd[1] * ut**2 + d[1] * utt
-            angular_velocity = (ytt * xt - xtt * yt) / linear_velocity**2
-        else:
-            angular_velocity = 0.
+        su = np.maximum(np.hypot(d[:, 0], d[:, 1]), 1e-6)
+        moving = ~np.isclose(su, 0.) & ~np.isclose(linear_velocity, 0.)
+        angular_velocity = np.zeros_like(s)
+        su, v, a = su[moving], linear_velocity[moving], linear_accel[moving]
+        dm, ddm = d[moving], dd[moving]
+        # ut - time-derivative of interpolation parameter u
+        ut = v / su
+        # utt - time-derivative of ut
+        utt = a / su - (dm[:, 0] * ddm[:, 0] + dm[:, 1] * ddm[:, 1]) / \
+            su**2 * ut
+        xt = dm[:, 0] * ut
+        yt = dm[:, 1] * ut
+        xtt = ddm[:, 0] * ut**2 + dm[:, 0] * utt
+        ytt = ddm[:, 1] * ut**2 + dm[:, 1] * utt
+        angular_velocity[moving] = (ytt * xt - xtt * yt) / v**2
 
         # combine path point with orientation and velocities
-        pos = self.segments[seg_id].calc_point(ui)
-        state = np.array([pos[0], pos[1], np.arctan2(
-            d[1], d[0]), linear_velocity, angular_velocity])
-        return state
+        powers = ui[:, np.newaxis] ** np.arange(8)
+        pos = np.einsum('nij,nj->ni', self.coeffs[seg_ids], powers)
+        return np.array([pos[:, 0], pos[:, 1], np.arctan2(d[:, 1], d[:, 0]),
+                         linear_velocity, angular_velocity])
+
+    def calc_traj_point(self, time):
+        return self.calc_traj_points(np.atleast_1d(time))[:, 0]
 
 
 def test1(max_vel=0.5):
@@ -309,9 +320,7 @@ def test1(max_vel=0.5):
 
         # interpolate at several points along the path
         times = np.linspace(0, traj.total_time, 101)
-        state = np.empty((5, times.size))
-        for j, t in enumerate(times):
-            state[:, j] = traj.calc_traj_point(t)
+        state = traj.calc_traj_points(times)
 
         if show_animation:  # pragma: no cover
             # plot the path
@@ -343,9 +352,7 @@ def test2(max_vel=0.5):
 
         # interpolate at several points along the path
         times = np.linspace(0, traj.total_time, 101)
-        state = np.empty((5, times.size))
-        for j, t in enumerate(times):
-            state[:, j] = traj.calc_traj_point(t)
+        state = traj.calc_traj_points(times)
 
         if show_animation:
             # plot the path
@@ -409,9 +416,7 @@ def test3(max_vel=2.0):
 
     # interpolate at several points along the path
     times = np.linspace(0, traj.total_time, 1001)
-    state = np.empty((5, times.size))
-    for i, t in enumerate(times):
-        state[:, i] = traj.calc_traj_point(t)
+    state = traj.calc_traj_points(times)
 
     # plot the path
 
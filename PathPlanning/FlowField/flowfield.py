@@ -4,6 +4,8 @@ author: Sarim Mehdi (muhammadsarim.mehdi@studio.unibo.it)
 Source: https://leifnode.com/2013/12/flow-field-pathfinding/
 """
 
+import heapq
+
 import numpy as np
 import matplotlib.pyplot as plt
 
@@ -27,110 +29,131 @@ def draw_vertical_line(start_x, start_y, length, o_x, o_y, o_dict, path):
 
 
 class FlowField:
+    TERRAIN_COST = {'free': 1, 'medium': 7, 'hard': 20}
+
     def __init__(self, obs_grid, goal_x, goal_y, start_x, start_y,
                  limit_x, limit_y):
         self.start_pt = [start_x, start_y]
         self.goal_pt = [goal_x, goal_y]
         self.obs_grid = obs_grid
         self.limit_x, self.limit_y = limit_x, limit_y
-        self.cost_field = {}
-        self.integration_field = {}
-        self.vector_field = {}
+        # neighbor shifts in (x, y), the center one included
+        self.shifts = [(i, j) for i in range(-1, 2) for j in range(-1, 2)]
+        # fields are stored in arrays padded with an obstacle border,
+        # cell (x, y) is at index [x + 1, y + 1]
+        self.cost_field = None
+        self.integration_field = None
+        self.vector_field = None
 
     def find_path(self):
-        self.create_cost_field()
-        self.create_integration_field()
-        self.assign_vectors()
+        self.create_fields()
         self.follow_vectors()
 
+    def create_fields(self):
+        """Create the fields towards the goal. They only depend on the
+        goal, so they are computed once and shared by every start."""
+        if self.vector_field is None:
+            self.create_cost_field()
+            self.create_integration_field()
+            self.assign_vectors()
+
     def create_cost_field(self):
         """Assign cost to each grid which defines the energy
-        it would take to get there."""
+        it would take to get there. Obstacles get a cost of infinity."""
+        self.cost_field = np.full((self.limit_x + 2, self.limit_y + 2),
+                                  np.inf)
         for i in range(self.limit_x):
             for j in range(self.limit_y):
-                if self.obs_grid[(i, j)] == 'free':
-                    self.cost_field[(i, j)] = 1
-                elif self.obs_grid[(i, j)] == 'medium':
-                    self.cost_field[(i, j)] = 7
-                elif self.obs_grid[(i, j)] == 'hard':
-                    self.cost_field[(i, j)] = 20
-                elif self.obs_grid[(i, j)] == 'obs':
-                    continue
+                terrain = self.obs_grid[(i, j)]
+                if terrain in self.TERRAIN_COST:
+                    self.cost_field[i + 1, j + 1] = self.TERRAIN_COST[terrain]
 
-                if [i, j] == self.goal_pt:
-                    self.cost_field[(i, j)] = 0
+        goal_x, goal_y = int(self.goal_pt[0]), int(self.goal_pt[1])
+        self.cost_field[goal_x + 1, goal_y + 1] = 0
 
     def create_integration_field(self):
         """Start from the goal node and calculate the value
-        of the integration field at each node. Start by
-        assigning a value of infinity to every node except
-        the goal node which is assigned a value of 0. Put the
-        goal node in the open list and then get its neighbors
-        (must not be obstacles). For each neighbor, the new
-        cost is equal to the cost of the current node in the
-        integration field (in the beginning, this will simply
-        be the goal node) + the cost of the neighbor in the
-        cost field + the extra cost (optional). The new cost
-        is only assigned if it is less than the previously
-        assigned cost of the node in the integration field and,
-        when that happens, the neighbor is put on the open list.
-        This process continues until the open list is empty."""
-        for i in range(self.limit_x):
-            for j in range(self.limit_y):
-                if self.obs_grid[(i, j)] == 'obs':
+        of the integration field at each node with Dijkstra's
+        algorithm. Every node starts with a value of infinity
+        except the goal node which is assigned a value of 0. The
+        node with the lowest integration value is taken out of a
+        priority queue and its neighbors (must not be obstacles)
+        are relaxed: the new cost is equal to the cost of the
+        current node in the integration field + the cost of the
+        neighbor in the cost field + the extra cost (10 for
+        straight moves, 14 for diagonal ones). Since every node
+        is finalized the first time it leaves the queue, each
+        node is expanded only once."""
+        n_cols = self.limit_y + 2
+        cost = self.cost_field.ravel().tolist()
+        is_obstacle = np.isinf(self.cost_field).ravel().tolist()
+        neighbors = [(i * n_cols + j, 10 if i == 0 or j == 0 else 14)
+                     for (i, j) in self.shifts if (i, j) != (0, 0)]
+
+        integration = [np.inf] * len(cost)
+        is_closed = [False] * len(cost)
+        goal_index = (int(self.goal_pt[0]) + 1) * n_cols + \
+            int(self.goal_pt[1]) + 1
+        integration[goal_index] = 0
+        open_heap = [(0, goal_index)]
+        while open_heap:
+            curr_cost, curr_index = heapq.heappop(open_heap)
+            if is_closed[curr_index]:
+                continue
+            is_closed[curr_index] = True
+            for offset, e_cost in neighbors:
+                index = curr_index + offset
+                if is_obstacle[index] or is_closed[index]:
                     continue
-                self.integration_field[(i, j)] = np.inf
-                if [i, j] == self.goal_pt:
-                    self.integration_field[(i, j)] = 0
-
-        open_list = [(self.goal_pt, 0)]
-        while open_list:
-            curr_pos, curr_cost = open_list[0]
-            curr_x, curr_y = curr_pos
-            for i in range(-1, 2):
-                for j in range(-1, 2):
-                    x, y = curr_x + i, curr_y + j
-                    if self.obs_grid[(x, y)] == 'obs':
-                        continue
-                    if (i, j) in [(1, 0), (0, 1), (-1, 0), (0, -1)]:
-                        e_cost = 10
-                    else:
-                        e_cost = 14
-                    neighbor_energy = self.cost_field[(x, y)]
-                    neighbor_old_cost = self.integration_field[(x, y)]
-                    neighbor_new_cost = curr_cost + neighbor_energy + e_cost
-                    if neighbor_new_cost < neighbor_old_cost:
-                        self.integration_field[(x, y)] = neighbor_new_cost
-                        open_list.append(([x, y], neighbor_new_cost))
-            del open_list[0]
+                neighbor_new_cost = curr_cost + cost[index] + e_cost
+                if neighbor_new_cost < integration[index]:
+                    integration[index] = neighbor_new_cost
+                    heapq.heappush(open_heap, (neighbor_new_cost, index))
+
+        self.integration_field = np.array(integration).reshape(
+            self.cost_field.shape)
 
     def assign_vectors(self):
         """For each node, assign a vector from itself to the node with
         the lowest cost in the integration field. An agent will simply
-        follow this vector field to the goal"""
-        for i in range(self.limit_x):
-            for j in range(self.limit_y):
-                if self.obs_grid[(i, j)] == 'obs':
-                    continue
-                if [i, j] == self.goal_pt:
-                    self.vector_field[(i, j)] = (None, None)
-                    continue
-                offset_list = [(i + a, j + b)
-                               for a in range(-1, 2)
-                               for b in range(-1, 2)]
-                neighbor_list = [{'loc': pt,
-                                  'cost': self.integration_field[pt]}
-                                 for pt in offset_list
-                                 if self.obs_grid[pt] != 'obs']
-                neighbor_list = sorted(neighbor_list, key=lambda x: x['cost'])
-                best_neighbor = neighbor_list[0]['loc']
-                self.vector_field[(i, j)] = best_neighbor
+        follow this vector field to the goal. The lowest cost neighbor
+        of every node is found at once with an argmin over the
+        shifted integration fields."""
+        # obstacles and nodes the goal cannot be reached from have an
+        # infinite integration value and get no vector
+        is_unreachable = np.isinf(self.integration_field)
+        field = np.pad(self.integration_field, 1, constant_values=np.inf)
+
+        n_x, n_y = self.limit_x, self.limit_y
+        shifted = np.stack([field[1 + i:n_x + 3 + i, 1 + j:n_y + 3 + j]
+                            for (i, j) in self.shifts])
+        best = np.argmin(shifted, axis=0)
+        shifts = np.array(self.shifts)
+
+        x, y = np.meshgrid(np.arange(-1, n_x + 1), np.arange(-1, n_y + 1),
+                           indexing='ij')
+        self.vector_field = np.stack([x + shifts[best, 0],
+                                      y + shifts[best, 1]], axis=-1)
+        self.vector_field[is_unreachable] = -1
+        goal_x, goal_y = int(self.goal_pt[0]), int(self.goal_pt[1])
+        self.vector_field[goal_x + 1, goal_y + 1] = -1
+
+    def get_path(self, start_x, start_y):
+        """Follow the vector field from a start to the goal,
+        an empty path is returned when the goal cannot be reached"""
+        self.create_fields()
+        path = []
+        curr_x, curr_y = int(start_x), int(start_y)
+        if np.isinf(self.integration_field[curr_x + 1, curr_y + 1]):
+            return path
+        while curr_x >= 0 and curr_y >= 0:
+            path.append((int(curr_x), int(curr_y)))
+            curr_x, curr_y = self.vector_field[curr_x + 1, curr_y + 1]
+        return path
 
     def follow_vectors(self):
-        curr_x, curr_y = self.start_pt
-        while curr_x is not None and curr_y is not None:
+        for curr_x, curr_y in self.get_path(*self.start_pt):
             plt.plot(curr_x, curr_y, "b*")
-            curr_x, curr_y = self.vector_field[(curr_x, curr_y)]
             plt.pause(0.001)
         if show_animation:
             plt.show()
@@ -61,13 +61,27 @@ class SweepSearcher:
                     return None, None
             else:
                 # keep moving until end
-                while not grid_map.check_occupied_from_xy_index(
-                        next_c_x_index + self.moving_direction,
-                        next_c_y_index, occupied_val=0.5):
-                    next_c_x_index += self.moving_direction
+                next_c_x_index += self.moving_direction * \
+                    self.count_free_grid_ahead(next_c_x_index,
+                                               next_c_y_index, grid_map)
                 self.swap_moving_direction()
             return next_c_x_index, next_c_y_index
 
+    def count_free_grid_ahead(self, c_x_index, c_y_index, grid_map):
+        """
+        number of consecutive free grids from the current one
+        along the moving direction
+        """
+        row = grid_map.data[c_y_index]
+        if self.moving_direction == self.MovingDirection.RIGHT:
+            ahead = row[c_x_index + 1:]
+        else:
+            ahead = row[:c_x_index][::-1]
+        is_occupied = ahead >= 0.5
+        if not np.any(is_occupied):
+            return len(ahead)
+        return int(np.argmax(is_occupied))
+
     def find_safe_turning_grid(self, c_x_index, c_y_index, grid_map):
 
         for (d_x_ind, d_y_ind) in self.turing_window:
@@ -84,13 +98,13 @@ class SweepSearcher:
         return None, None
 
     def is_search_done(self, grid_map):
-        for ix in self.x_indexes_goal_y:
-            if not grid_map.check_occupied_from_xy_index(ix, self.goal_y,
-                                                         occupied_val=0.5):
-                return False
+        values = grid_map.get_values_from_xy_index(
+            self.x_indexes_goal_y,
+            np.full(len(self.x_indexes_goal_y), self.goal_y),
+            default_val=1.0)
 
         # all lower grid is occupied
-        return True
+        return bool(np.all(values >= 0.5))
 
     def update_turning_window(self):
         # turning window definition
@@ -162,25 +176,17 @@ def convert_global_coordinate(x, y, sweep_vec, sweep_start_position):
 
 
 def search_free_grid_index_at_edge_y(grid_map, from_upper=False):
-    y_index = None
-    x_indexes = []
+    is_free = grid_map.data < 1.0
+    y_indexes = np.flatnonzero(np.any(is_free, axis=1))
+    if len(y_indexes) == 0:
+        return [], None
 
+    y_index = y_indexes[-1] if from_upper else y_indexes[0]
+    x_indexes = np.flatnonzero(is_free[y_index])
     if from_upper:
-        x_range = range(grid_map.height)[::-1]
-        y_range = range(grid_map.width)[::-1]
-    else:
-        x_range = range(grid_map.height)
-        y_range = range(grid_map.width)
-
-    for iy in x_range:
-        for ix in y_range:
-            if not grid_map.check_occupied_from_xy_index(ix, iy):
-                y_index = iy
-                x_indexes.append(ix)
-        if y_index:
-            break
+        x_indexes = x_indexes[::-1]
 
-    return x_indexes, y_index
+    return x_indexes.tolist(), int(y_index)
 
 
 def setup_grid_map(ox, oy, resolution, sweep_direction, offset_grid=10):
@@ -243,11 +249,27 @@ def sweep_path_search(sweep_searcher, grid_map, grid_search_animation=False):
 
         grid_map.set_value_from_xy_index(c_x_index, c_y_index, 0.5)
 
+        # sweep straight over the free grids ahead in one step, the search
+        # cannot finish on them since the goal row still has a free grid
+        n_free = sweep_searcher.count_free_grid_ahead(c_x_index, c_y_index,
+                                                      grid_map)
+        if n_free > 0:
+            x_inds = c_x_index + sweep_searcher.moving_direction * \
+                np.arange(1, n_free + 1)
+            x, y = grid_map.calc_grid_central_xy_position_from_xy_index(
+                x_inds, c_y_index)
+            px.extend(x.tolist())
+            py.extend([y] * n_free)
+            grid_map.set_values_from_xy_index(
+                x_inds, np.full(n_free, c_y_index), 0.5)
+            c_x_index = int(x_inds[-1])
+
         if grid_search_animation:
             grid_map.plot_grid_map(ax=ax)
             plt.pause(1.0)
 
-    grid_map.plot_grid_map()
+    if do_animation:
+        grid_map.plot_grid_map()
 
     return px, py
 
@@ -10,11 +10,10 @@ https://arxiv.org/pdf/1404.2334.pdf
 
 """
 
-import copy
 import math
-import random
 
 import matplotlib.pyplot as plt
+from scipy.spatial import cKDTree
 from scipy.spatial.transform import Rotation as Rot
 import numpy as np
 
@@ -25,7 +24,8 @@ class InformedRRTStar:
 
     def __init__(self, start, goal,
                  obstacleList, randArea,
-                 expandDis=0.5, goalSampleRate=10, maxIter=200):
+                 expandDis=0.5, goalSampleRate=10, maxIter=200,
+                 batchSize=1000):
 
         self.start = Node(start[0], start[1])
         self.goal = Node(goal[0], goal[1])
@@ -34,17 +34,55 @@ class InformedRRTStar:
         self.expand_dis = expandDis
         self.goal_sample_rate = goalSampleRate
         self.max_iter = maxIter
+        self.batch_size = batchSize
         self.obstacle_list = obstacleList
-        self.node_list = None
+        self.obstacles = np.array(obstacleList, dtype=float).reshape(-1, 3)
+        self.obstacle_size2 = self.obstacles[:, 2] ** 2
+
+        # tree nodes, the parent of the start node is -1
+        self.n_node = 0
+        self.node_xy = None
+        self.node_cost = None
+        self.node_parent = None
+        self.children = None
+
+        # KD-tree of the nodes up to n_indexed, the later ones are searched
+        # by brute force until the next rebuild
+        self.kd_tree = None
+        self.n_indexed = 0
+
+        # nodes connectable to the goal and the best of them
+        self.is_solution = None
+        self.best_index = None
+
+    @property
+    def node_list(self):
+        nodes = []
+        for (x, y), cost, parent in zip(self.node_xy[:self.n_node].tolist(),
+                                        self.node_cost[:self.n_node].tolist(),
+                                        self.node_parent[:self.n_node]):
+            node = Node(x, y)
+            node.cost = cost
+            node.parent = None if parent < 0 else int(parent)
+            nodes.append(node)
+        return nodes
 
     def informed_rrt_star_search(self, animation=True):
 
-        self.node_list = [self.start]
+        n_max = self.max_iter + 1
+        self.node_xy = np.zeros((n_max, 2))
+        self.node_cost = np.zeros(n_max)
+        self.node_parent = np.full(n_max, -1, dtype=int)
+        self.is_solution = np.zeros(n_max, dtype=bool)
+        self.children = []
+        self.n_node = 0
+        self.n_indexed = 0
+        self.best_index = None
+        self.add_node(self.start.x, self.start.y, -1, 0.0)
+
         # max length we expect to find in our 'informed' sample space,
         # starts as infinite
         cBest = float('inf')
-        solutionSet = set()
-        path = None
 
         # Computing the sampling space
         cMin = math.sqrt(pow(self.start.x - self.goal.x, 2)
@@ -54,7 +92,7 @@ class InformedRRTStar:
         a1 = np.array([[(self.goal.x - self.start.x) / cMin],
                        [(self.goal.y - self.start.y) / cMin], [0]])
 
-        e_theta = math.atan2(a1[1], a1[0])
+        e_theta = math.atan2(a1[1, 0], a1[0, 0])
         # first column of identity matrix transposed
         id1_t = np.array([1.0, 0.0, 0.0]).reshape(1, 3)
         M = a1 @ id1_t
@@ -63,210 +101,238 @@ class InformedRRTStar:
             [1.0, 1.0, np.linalg.det(U) * np.linalg.det(np.transpose(Vh))])),
                    Vh)
 
+        samples = []
         for i in range(self.max_iter):
             # Sample space is defined by cBest
             # cMin is the minimum distance between the start point and the goal
             # xCenter is the midpoint between the start and the goal
             # cBest changes when a new path is found
+            if not samples:
+                samples = self.informed_sample(
+                    cBest, cMin, xCenter, C, self.batch_size).tolist()[::-1]
+            rnd = samples.pop()
 
-            rnd = self.informed_sample(cBest, cMin, xCenter, C)
-            n_ind = self.get_nearest_list_index(self.node_list, rnd)
-            nearestNode = self.node_list[n_ind]
+            n_ind = self.get_nearest_index(rnd)
+            nearest = self.node_xy[n_ind]
             # steer
-            theta = math.atan2(rnd[1] - nearestNode.y, rnd[0] - nearestNode.x)
-            newNode = self.get_new_node(theta, n_ind, nearestNode)
-            d = self.line_cost(nearestNode, newNode)
-
-            noCollision = self.check_collision(nearestNode, theta, d)
-
-            if noCollision:
-                nearInds = self.find_near_nodes(newNode)
-                newNode = self.choose_parent(newNode, nearInds)
-
-                self.node_list.append(newNode)
-                self.rewire(newNode, nearInds)
-
-                if self.is_near_goal(newNode):
-                    if self.check_segment_collision(newNode.x, newNode.y,
-                                                    self.goal.x, self.goal.y):
-                        solutionSet.add(newNode)
-                        lastIndex = len(self.node_list) - 1
-                        tempPath = self.get_final_course(lastIndex)
-                        tempPathLen = self.get_path_len(tempPath)
-                        if tempPathLen < cBest:
-                            path = tempPath
-                            cBest = tempPathLen
+            theta = math.atan2(rnd[1] - nearest[1], rnd[0] - nearest[0])
+            new_x = nearest[0] + self.expand_dis * math.cos(theta)
+            new_y = nearest[1] + self.expand_dis * math.sin(theta)
+
+            if self.check_segment_collision(nearest[0], nearest[1],
+                                            new_x, new_y):
+                nearInds = self.find_near_nodes(new_x, new_y)
+                parent, cost = self.choose_parent(new_x, new_y, nearInds,
+                                                  n_ind)
+                new_ind = self.add_node(new_x, new_y, parent, cost)
+                self.rewire(new_ind, nearInds)
+
+                d_goal = math.hypot(new_x - self.goal.x, new_y - self.goal.y)
+                if d_goal < self.expand_dis and self.check_segment_collision(
+                        new_x, new_y, self.goal.x, self.goal.y):
+                    self.is_solution[new_ind] = True
+                    self.update_best(np.array([new_ind]))
+
+            cost = self.get_best_cost()
+            if cost < cBest:
+                # sample again in the smaller ellipse
+                cBest = cost
+                samples = []
+
             if animation:
                 self.draw_graph(xCenter=xCenter,
                                 cBest=cBest, cMin=cMin,
                                 e_theta=e_theta, rnd=rnd)
 
-        return path
-
-    def choose_parent(self, newNode, nearInds):
-        if len(nearInds) == 0:
-            return newNode
-
-        dList = []
-        for i in nearInds:
-            dx = newNode.x - self.node_list[i].x
-            dy = newNode.y - self.node_list[i].y
-            d = math.hypot(dx, dy)
-            theta = math.atan2(dy, dx)
-            if self.check_collision(self.node_list[i], theta, d):
-                dList.append(self.node_list[i].cost + d)
-            else:
-                dList.append(float('inf'))
-
-        minCost = min(dList)
-        minInd = nearInds[dList.index(minCost)]
-
-        if minCost == float('inf'):
-            print("min cost is inf")
-            return newNode
-
-        newNode.cost = minCost
-        newNode.parent = minInd
-
-        return newNode
-
-    def find_near_nodes(self, newNode):
-        n_node = len(self.node_list)
+        if self.best_index is None:
+            return None
+        return self.get_final_course(self.best_index)
+
+    def add_node(self, x, y, parent, cost):
+        ind = self.n_node
+        self.node_xy[ind] = x, y
+        self.node_cost[ind] = cost
+        self.node_parent[ind] = parent
+        self.children.append(set())
+        if parent >= 0:
+            self.children[parent].add(ind)
+        self.n_node += 1
+
+        if self.n_node - self.n_indexed > max(64, self.n_indexed // 16):
+            self.kd_tree = cKDTree(self.node_xy[:self.n_node])
+            self.n_indexed = self.n_node
+        return ind
+
+    def get_nearest_index(self, rnd):
+        # nearest node in the KD-tree and in the nodes added after it
+        d_min, min_ind = float('inf'), 0
+        if self.kd_tree is not None:
+            d_min, min_ind = self.kd_tree.query(rnd)
+        if self.n_indexed < self.n_node:
+            d = self.node_xy[self.n_indexed:self.n_node] - rnd
+            d2 = (d * d).sum(axis=1)
+            i = int(d2.argmin())
+            if d2[i] < d_min ** 2:
+                min_ind = self.n_indexed + i
+        return int(min_ind)
+
+    def find_near_nodes(self, x, y):
+        n_node = self.n_node
         r = 50.0 * math.sqrt((math.log(n_node) / n_node))
-        d_list = [(node.x - newNode.x) ** 2 + (node.y - newNode.y) ** 2
-                  for node in self.node_list]
-        near_inds = [d_list.index(i) for i in d_list if i <= r ** 2]
+        # at most the k nearest nodes in the ball as in k-nearest RRT*,
+        # the ball alone holds thousands of nodes in a thin informed ellipse
+        k = int(2.0 * math.e * math.log(n_node)) + 1
+        near_inds = np.zeros(0, dtype=int)
+        near_d2 = np.zeros(0)
+        if self.kd_tree is not None:
+            d, inds = self.kd_tree.query([x, y], min(k, self.n_indexed),
+                                         distance_upper_bound=r)
+            d, inds = np.atleast_1d(d), np.atleast_1d(inds)
+            near_inds, near_d2 = inds[d <= r], d[d <= r] ** 2
+        d2 = np.sum((self.node_xy[self.n_indexed:n_node] - (x, y)) ** 2,
+                    axis=1)
+        tail = np.flatnonzero(d2 <= r ** 2)
+        near_inds = np.concatenate((near_inds, self.n_indexed + tail))
+        near_d2 = np.concatenate((near_d2, d2[tail]))
+        if len(near_inds) > k:
+            near_inds = near_inds[np.argpartition(near_d2, k)[:k]]
         return near_inds
 
-    def informed_sample(self, cMax, cMin, xCenter, C):
+    def choose_parent(self, x, y, nearInds, parent):
+        # default parent is the nearest node
+        cost = self.node_cost[parent] + self.expand_dis
+        if len(nearInds) == 0:
+            return parent, cost
+
+        near_xy = self.node_xy[nearInds]
+        d = np.hypot(x - near_xy[:, 0], y - near_xy[:, 1])
+        dList = self.node_cost[nearInds] + d
+
+        # collision check in order of the cost, until a free one is found
+        order = np.argsort(dList, kind="stable")
+        for start in range(0, len(order), 16):
+            chunk = order[start:start + 16]
+            free = self.check_segments_collision(
+                near_xy[chunk, 0], near_xy[chunk, 1], x, y)
+            if np.any(free):
+                i = chunk[np.argmax(free)]
+                return nearInds[i], dList[i]
+
+        print("min cost is inf")
+        return parent, cost
+
+    def informed_sample(self, cMax, cMin, xCenter, C, n=None):
+        # one sample [x, y], or n samples with shape (n, 2)
+        if n is None:
+            return self.informed_sample(cMax, cMin, xCenter, C, 1)[0].tolist()
+
         if cMax < float('inf'):
             r = [cMax / 2.0,
                  math.sqrt(cMax ** 2 - cMin ** 2) / 2.0,
                  math.sqrt(cMax ** 2 - cMin ** 2) / 2.0]
             L = np.diag(r)
-            xBall = self.sample_unit_ball()
-            rnd = np.dot(np.dot(C, L), xBall) + xCenter
-            rnd = [rnd[(0, 0)], rnd[(1, 0)]]
+            xBall = self.sample_unit_ball(n)
+            rnd = (np.dot(np.dot(C, L), xBall) + xCenter)[0:2].T
         else:
-            rnd = self.sample_free_space()
+            rnd = self.sample_free_space(n)
 
         return rnd
 
     @staticmethod
-    def sample_unit_ball():
-        a = random.random()
-        b = random.random()
-
-        if b < a:
-            a, b = b, a
-
-        sample = (b * math.cos(2 * math.pi * a / b),
-                  b * math.sin(2 * math.pi * a / b))
-        return np.array([[sample[0]], [sample[1]], [0]])
-
-    def sample_free_space(self):
-        if random.randint(0, 100) > self.goal_sample_rate:
-            rnd = [random.uniform(self.min_rand, self.max_rand),
-                   random.uniform(self.min_rand, self.max_rand)]
-        else:
-            rnd = [self.goal.x, self.goal.y]
+    def sample_unit_ball(n=None):
+        # one sample with shape (3, 1), or n samples with shape (3, n)
+        if n is None:
+            return InformedRRTStar.sample_unit_ball(1)
+        a = np.random.random(n)
+        b = np.random.random(n)
+        a, b = np.minimum(a, b), np.maximum(a, b)
+
+        return np.array([b * np.cos(2 * math.pi * a / b),
+                         b * np.sin(2 * math.pi * a / b),
+                         np.zeros(n)])
+
+    def sample_free_space(self, n=None):
+        # one sample [x, y], or n samples with shape (n, 2)
+        if n is None:
+            return self.sample_free_space(1)[0].tolist()
+
+        rnd = np.random.uniform(self.min_rand, self.max_rand, (n, 2))
+        to_goal = np.random.randint(0, 101, n) <= self.goal_sample_rate
+        rnd[to_goal] = self.goal.x, self.goal.y
 
         return rnd
 
     @staticmethod
     def get_path_len(path):
-        pathLen = 0
-        for i in range(1, len(path)):
-            node1_x = path[i][0]
-            node1_y = path[i][1]
-            node2_x = path[i - 1][0]
-            node2_y = path[i - 1][1]
-            pathLen += math.sqrt((node1_x - node2_x)
-                                 ** 2 + (node1_y - node2_y) ** 2)
-
-        return pathLen
-
-    @staticmethod
-    def line_cost(node1, node2):
-        return math.sqrt((node1.x - node2.x) ** 2 + (node1.y - node2.y) ** 2)
-
-    @staticmethod
-    def get_nearest_list_index(nodes, rnd):
-        dList = [(node.x - rnd[0]) ** 2
-                 + (node.y - rnd[1]) ** 2 for node in nodes]
-        minIndex = dList.index(min(dList))
-        return minIndex
-
-    def get_new_node(self, theta, n_ind, nearestNode):
-        newNode = copy.deepcopy(nearestNode)
-
-        newNode.x += self.expand_dis * math.cos(theta)
-        newNode.y += self.expand_dis * math.sin(theta)
-
-        newNode.cost += self.expand_dis
-        newNode.parent = n_ind
-        return newNode
-
-    def is_near_goal(self, node):
-        d = self.line_cost(node, self.goal)
-        if d < self.expand_dis:
-            return True
-        return False
-
-    def rewire(self, newNode, nearInds):
-        n_node = len(self.node_list)
-        for i in nearInds:
-            nearNode = self.node_list[i]
-
-            d = math.sqrt((nearNode.x - newNode.x) ** 2
-                          + (nearNode.y - newNode.y) ** 2)
-
-            s_cost = newNode.cost + d
-
-            if nearNode.cost > s_cost:
-                theta = math.atan2(newNode.y - nearNode.y,
-                                   newNode.x - nearNode.x)
-                if self.check_collision(nearNode, theta, d):
-                    nearNode.parent = n_node - 1
-                    nearNode.cost = s_cost
-
-    @staticmethod
-    def distance_squared_point_to_segment(v, w, p):
-        # Return minimum distance between line segment vw and point p
-        if np.array_equal(v, w):
-            return (p - v).dot(p - v)  # v == w case
-        l2 = (w - v).dot(w - v)  # i.e. |w-v|^2 -  avoid a sqrt
-        # Consider the line extending the segment,
-        # parameterized as v + t (w - v).
-        # We find projection of point p onto the line.
-        # It falls where t = [(p-v) . (w-v)] / |w-v|^2
-        # We clamp t from [0,1] to handle points outside the segment vw.
-        t = max(0, min(1, (p - v).dot(w - v) / l2))
-        projection = v + t * (w - v)  # Projection falls on the segment
-        return (p - projection).dot(p - projection)
+        path = np.asarray(path, dtype=float)
+        return float(np.sum(np.hypot(*np.diff(path, axis=0).T)))
+
+    def rewire(self, new_ind, nearInds):
+        new_xy = self.node_xy[new_ind]
+        near_xy = self.node_xy[nearInds]
+        d = np.hypot(*(near_xy - new_xy).T)
+        s_cost = self.node_cost[new_ind] + d
+
+        improved = self.node_cost[nearInds] > s_cost
+        if not np.any(improved):
+            return
+        free = self.check_segments_collision(
+            near_xy[improved, 0], near_xy[improved, 1], *new_xy)
+        for i, cost in zip(nearInds[improved][free].tolist(),
+                           s_cost[improved][free].tolist()):
+            self.children[self.node_parent[i]].discard(i)
+            self.children[new_ind].add(i)
+            self.node_parent[i] = new_ind
+            self.update_subtree_cost(i, cost - self.node_cost[i])
+
+    def update_subtree_cost(self, ind, delta):
+        # shift the costs of the node and its descendants
+        subtree = [ind]
+        for i in subtree:
+            subtree.extend(self.children[i])
+        subtree = np.array(subtree)
+        self.node_cost[subtree] += delta
+        self.update_best(subtree[self.is_solution[subtree]])
+
+    def update_best(self, inds):
+        # update the best goal connection with the solution nodes
+        if len(inds) == 0:
+            return
+        costs = self.node_cost[inds] + np.hypot(
+            *(self.node_xy[inds] - (self.goal.x, self.goal.y)).T)
+        i = int(np.argmin(costs))
+        if costs[i] < self.get_best_cost():
+            self.best_index = int(inds[i])
+
+    def get_best_cost(self):
+        if self.best_index is None:
+            return float('inf')
+        x, y = self.node_xy[self.best_index]
+        return self.node_cost[self.best_index] + math.hypot(
+            x - self.goal.x, y - self.goal.y)
+
+    def check_segments_collision(self, x1, y1, x2, y2):
+        # collision free flags of the segments against all the obstacles,
+        # from the squared distance between each obstacle and its projection
+        # on the segment
+        x1 = np.asarray(x1, dtype=float)[..., None]
+        y1 = np.asarray(y1, dtype=float)[..., None]
+        dx, dy = np.asarray(x2)[..., None] - x1, np.asarray(y2)[..., None] - y1
+        l2 = np.maximum(dx * dx + dy * dy, 1e-300)
+        px, py = self.obstacles[:, 0] - x1, self.obstacles[:, 1] - y1
+        t = np.clip((px * dx + py * dy) / l2, 0, 1)
+        px -= t * dx
+        py -= t * dy
+        return (px * px + py * py > self.obstacle_size2).all(axis=-1)
 
     def check_segment_collision(self, x1, y1, x2, y2):
-        for (ox, oy, size) in self.obstacle_list:
-            dd = self.distance_squared_point_to_segment(
-                np.array([x1, y1]),
-                np.array([x2, y2]),
-                np.array([ox, oy]))
-            if dd <= size ** 2:
-                return False  # collision
-        return True
-
-    def check_collision(self, nearNode, theta, d):
-        tmpNode = copy.deepcopy(nearNode)
-        end_x = tmpNode.x + math.cos(theta) * d
-        end_y = tmpNode.y + math.sin(theta) * d
-        return self.check_segment_collision(tmpNode.x, tmpNode.y, end_x, end_y)
+        return bool(self.check_segments_collision(x1, y1, x2, y2))
 
     def get_final_course(self, lastIndex):
         path = [[self.goal.x, self.goal.y]]
-        while self.node_list[lastIndex].parent is not None:
-            node = self.node_list[lastIndex]
-            path.append([node.x, node.y])
-            lastIndex = node.parent
+        while self.node_parent[lastIndex] >= 0:
+            path.append(self.node_xy[lastIndex].tolist())
+            lastIndex = self.node_parent[lastIndex]
         path.append([self.start.x, self.start.y])
         return path
 
@@ -282,11 +348,12 @@ class InformedRRTStar:
             if cBest != float('inf'):
                 self.plot_ellipse(xCenter, cBest, cMin, e_theta)
 
-        for node in self.node_list:
-            if node.parent is not None:
-                if node.x or node.y is not None:
-                    plt.plot([node.x, self.node_list[node.parent].x], [
-                        node.y, self.node_list[node.parent].y], "-g")
+        # tree edges in one line, separated by nan
+        child = np.flatnonzero(self.node_parent[:self.n_node] >= 0)
+        edges = np.full((len(child), 3, 2), np.nan)
+        edges[:, 0] = self.node_xy[child]
+        edges[:, 1] = self.node_xy[self.node_parent[child]]
+        plt.plot(edges[:, :, 0].ravel(), edges[:, :, 1].ravel(), "-g")
 
         for (ox, oy, size) in self.obstacle_list:
             plt.plot(ox, oy, "ok", ms=30 * size)
@@ -24,6 +24,9 @@ class LQRPlanner:
         self.GOAL_DIST = 0.1
         self.MAX_ITER = 150
         self.EPS = 0.01
+        self.CLOSED_FORM_DARE = False  # solve the DARE with the Schur method
+
+        self.gain_cache = {}  # LQR gain per system model
 
     def lqr_planning(self, sx, sy, gx, gy, show_animation=True):
 
@@ -92,7 +95,10 @@ class LQRPlanner:
         """
 
         # first, try to solve the ricatti equation
-        X = self.solve_dare(A, B, Q, R)
+        if self.CLOSED_FORM_DARE:
+            X = la.solve_discrete_are(A, B, Q, R)
+        else:
+            X = self.solve_dare(A, B, Q, R)
 
         # compute the LQR gain
         K = la.inv(B.T @ X @ B + R) @ (B.T @ X @ A)
@@ -109,9 +115,21 @@ class LQRPlanner:
 
         return A, B
 
+    def get_gain(self, A, B):
+        """
+        return the LQR gain of the model, solving the DARE only
+        the first time the model is seen
+        """
+        key = (A.tobytes(), B.tobytes(), self.CLOSED_FORM_DARE)
+        if key not in self.gain_cache:
+            Kopt, X, ev = self.dlqr(A, B, np.eye(2), np.eye(1))
+            self.gain_cache[key] = Kopt
+
+        return self.gain_cache[key]
+
     def lqr_control(self, A, B, x):
 
-        Kopt, X, ev = self.dlqr(A, B, np.eye(2), np.eye(1))
+        Kopt = self.get_gain(A, B)
 
         u = -Kopt @ x
 
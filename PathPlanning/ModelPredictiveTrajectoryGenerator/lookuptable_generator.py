@@ -5,13 +5,26 @@ Lookup Table generation for model predictive trajectory generator
 author: Atsushi Sakai
 
 """
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 from matplotlib import pyplot as plt
 import numpy as np
-import math
 import model_predictive_trajectory_generator as planner
 import motion_model
 import pandas as pd
 
+# version of the binary lookup table format
+TABLE_VERSION = 2
+
+# binary table file, its metadata is saved next to it as a .json file
+TABLE_PATH = os.path.dirname(os.path.abspath(__file__)) + "/lookuptable.npy"
+
+N_WORKERS = os.cpu_count()  # number of worker processes
+WAVE_SIZE = 16  # number of states optimized in parallel
+
 
 def calc_states_list():
     maxyaw = np.deg2rad(-30.0)
@@ -31,27 +44,44 @@ def calc_states_list():
 
 
 def search_nearest_one_from_lookuptable(tx, ty, tyaw, lookuptable):
-    mind = float("inf")
-    minid = -1
+    table = np.asarray(lookuptable)
+    d = np.hypot(np.hypot(tx - table[:, 0], ty - table[:, 1]),
+                 tyaw - table[:, 2])
+    # the last one of the nearest entries
+    minid = len(d) - 1 - np.argmin(d[::-1])
 
-    for (i, table) in enumerate(lookuptable):
+    return lookuptable[minid]
 
-        dx = tx - table[0]
-        dy = ty - table[1]
-        dyaw = tyaw - table[2]
-        d = math.sqrt(dx ** 2 + dy ** 2 + dyaw ** 2)
-        if d <= mind:
-            minid = i
-            mind = d
 
-    # print(minid)
+def calc_table_hash(states, k0, wave_size=WAVE_SIZE):
+    """
+    Hash of the table version, the target states and the motion model and
+    optimization parameters, which the lookup table depends on.
+    wave_size sets the warm starts, so it changes the table too
+    """
+    params = np.hstack((TABLE_VERSION, motion_model.L, motion_model.ds,
+                        motion_model.v, planner.max_iter, planner.h,
+                        planner.cost_th, k0, wave_size, np.ravel(states)))
+
+    return hashlib.sha1(params.astype(float).tobytes()).hexdigest()
 
-    return lookuptable[minid]
 
+def get_metadata_path(fname):
+    return os.path.splitext(fname)[0] + ".json"
 
-def save_lookup_table(fname, table):
+
+def save_lookup_table(fname, table, table_hash=""):
     mt = np.array(table)
     print(mt)
+    if fname.endswith(".npy"):
+        # a raw .npy file, so the table can be memory-mapped when loading
+        np.save(fname, mt)
+        with open(get_metadata_path(fname), "w") as f:
+            json.dump({"version": TABLE_VERSION, "table_hash": table_hash},
+                      f)
+        print("lookup table file is saved as " + fname)
+        return
+
     # save csv
     df = pd.DataFrame()
     df["x"] = mt[:, 0]
@@ -65,31 +95,82 @@ def save_lookup_table(fname, table):
     print("lookup table file is saved as " + fname)
 
 
-def generate_lookup_table():
-    states = calc_states_list()
-    k0 = 0.0
+def load_lookup_table(fname, table_hash=None):
+    """
+    Load a binary lookup table memory-mapped,
+    return None if it is not found or generated with other parameters
+    """
+    metadata_path = get_metadata_path(fname)
+    if not os.path.exists(fname) or not os.path.exists(metadata_path):
+        return None
+
+    with open(metadata_path) as f:
+        metadata = json.load(f)
+    if metadata.get("version") != TABLE_VERSION or (
+            table_hash is not None and
+            metadata.get("table_hash") != table_hash):
+        return None
+
+    return np.load(fname, mmap_mode="r")
 
-    # x, y, yaw, s, km, kf
-    lookuptable = [[1.0, 0.0, 0.0, 1.0, 0.0, 0.0]]
 
-    for state in states:
-        bestp = search_nearest_one_from_lookuptable(
-            state[0], state[1], state[2], lookuptable)
+def optimize_states(states, init_p, k0):
+    """
+    Optimize the trajectories to the states,
+    return the table rows of the found ones
+    """
+    p, found = planner.optimize_trajectories(states, k0, init_p)
+    p = p[found]
+    x, y, yaw = motion_model.generate_last_states(
+        p[:, 0], p[:, 1], p[:, 2], k0)
 
-        target = motion_model.State(x=state[0], y=state[1], yaw=state[2])
-        init_p = np.array(
-            [math.sqrt(state[0] ** 2 + state[1] ** 2), bestp[4], bestp[5]]).reshape(3, 1)
+    return np.column_stack((x, y, yaw, p))
 
-        x, y, yaw, p = planner.optimize_trajectory(target, k0, init_p)
 
-        if x is not None:
-            print("find good path")
-            lookuptable.append(
-                [x[-1], y[-1], yaw[-1], float(p[0]), float(p[1]), float(p[2])])
+def generate_lookup_table(fname=TABLE_PATH, k0=0.0,
+                          n_workers=N_WORKERS, wave_size=WAVE_SIZE):
+    states = np.array(calc_states_list())
+    table_hash = calc_table_hash(states, k0, wave_size)
+
+    lookuptable = load_lookup_table(fname, table_hash) \
+        if fname.endswith(".npy") else None
+    if lookuptable is not None:
+        print("lookup table is loaded from " + fname)
+        return lookuptable
+
+    # optimize the states in waves ordered by the distance from the origin,
+    # the states of a wave are warm started from the previous waves
+    states = states[np.argsort(np.hypot(states[:, 0], states[:, 1]),
+                               kind="stable")]
+    n_waves = max(1, int(np.ceil(len(states) / wave_size)))
+
+    # x, y, yaw, s, km, kf
+    lookuptable = np.array([[1.0, 0.0, 0.0, 1.0, 0.0, 0.0]])
+
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        for wave in np.array_split(states, n_waves):
+            bestp = np.array([search_nearest_one_from_lookuptable(
+                state[0], state[1], state[2], lookuptable) for state in wave])
+            init_p = np.column_stack(
+                (np.hypot(wave[:, 0], wave[:, 1]), bestp[:, 4], bestp[:, 5]))
+
+            n_chunks = min(n_workers, len(wave))
+            rows = executor.map(optimize_states,
+                                np.array_split(wave, n_chunks),
+                                np.array_split(init_p, n_chunks),
+                                [k0] * n_chunks)
+            lookuptable = np.vstack([lookuptable] + list(rows))
 
     print("finish lookup table generation")
 
-    save_lookup_table("lookuptable.csv", lookuptable)
+    save_lookup_table(fname, lookuptable, table_hash)
+
+    return lookuptable
+
+
+def main():
+    k0 = 0.0
+    lookuptable = generate_lookup_table(k0=k0)
 
     for table in lookuptable:
         xc, yc, yawc = motion_model.generate_trajectory(
@@ -106,9 +187,5 @@ def generate_lookup_table():
     print("Done")
 
 
-def main():
-    generate_lookup_table()
-
-
 if __name__ == '__main__':
     main()
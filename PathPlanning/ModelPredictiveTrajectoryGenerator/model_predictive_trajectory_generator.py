@@ -39,57 +39,68 @@ def calc_diff(target, x, y, yaw):
     return d
 
 
+def calc_diffs(targets, x, y, yaw):
+    """
+    Differences between the target states (n, 3) and the last states
+    """
+    return np.column_stack((targets[:, 0] - x,
+                            targets[:, 1] - y,
+                            motion_model.pi_2_pi(targets[:, 2] - yaw)))
+
+
 def calc_j(target, p, h, k0):
-    xp, yp, yawp = motion_model.generate_last_state(
-        p[0, 0] + h[0], p[1, 0], p[2, 0], k0)
-    dp = calc_diff(target, [xp], [yp], [yawp])
-    xn, yn, yawn = motion_model.generate_last_state(
-        p[0, 0] - h[0], p[1, 0], p[2, 0], k0)
-    dn = calc_diff(target, [xn], [yn], [yawn])
-    d1 = np.array((dp - dn) / (2.0 * h[0])).reshape(3, 1)
-
-    xp, yp, yawp = motion_model.generate_last_state(
-        p[0, 0], p[1, 0] + h[1], p[2, 0], k0)
-    dp = calc_diff(target, [xp], [yp], [yawp])
-    xn, yn, yawn = motion_model.generate_last_state(
-        p[0, 0], p[1, 0] - h[1], p[2, 0], k0)
-    dn = calc_diff(target, [xn], [yn], [yawn])
-    d2 = np.array((dp - dn) / (2.0 * h[1])).reshape(3, 1)
-
-    xp, yp, yawp = motion_model.generate_last_state(
-        p[0, 0], p[1, 0], p[2, 0] + h[2], k0)
-    dp = calc_diff(target, [xp], [yp], [yawp])
-    xn, yn, yawn = motion_model.generate_last_state(
-        p[0, 0], p[1, 0], p[2, 0] - h[2], k0)
-    dn = calc_diff(target, [xn], [yn], [yawn])
-    d3 = np.array((dp - dn) / (2.0 * h[2])).reshape(3, 1)
-
-    J = np.hstack((d1, d2, d3))
-
-    return J
+    targets = np.array([[target.x, target.y, target.yaw]])
+
+    return calc_jacobians(targets, p.reshape(1, 3), h, k0)[0]
+
+
+def calc_jacobians(targets, ps, h, k0):
+    """
+    Central difference jacobians of the last state differences,
+    all the perturbed parameters are integrated in one batch
+
+    :param targets: target states, shape (n, 3)
+    :param ps: trajectory parameters (s, km, kf), shape (n, 3)
+    :return: jacobians, shape (n, 3, 3)
+    """
+    n = len(ps)
+    dps = np.vstack((np.diag(h), -np.diag(h)))  # (6, 3)
+    tps = (ps[:, None, :] + dps).reshape(-1, 3)
+    k0s = np.repeat(np.broadcast_to(k0, n), len(dps))
+    xs, ys, yaws = motion_model.generate_last_states(
+        tps[:, 0], tps[:, 1], tps[:, 2], k0s)
+    ds = calc_diffs(np.repeat(targets, len(dps), axis=0), xs, ys,
+                    yaws).reshape(n, len(dps), 3)
+
+    # columns are the derivatives by each parameter
+    return ((ds[:, :3] - ds[:, 3:]) / (2.0 * h[:, None])).transpose(0, 2, 1)
 
 
 def selection_learning_param(dp, p, k0, target):
-    mincost = float("inf")
-    mina = 1.0
-    maxa = 2.0
-    da = 0.5
+    targets = np.array([[target.x, target.y, target.yaw]])
 
-    for a in np.arange(mina, maxa, da):
-        tp = p + a * dp
-        xc, yc, yawc = motion_model.generate_last_state(
-            tp[0], tp[1], tp[2], k0)
-        dc = calc_diff(target, [xc], [yc], [yawc])
-        cost = np.linalg.norm(dc)
+    return selection_learning_params(
+        dp.reshape(1, 3), p.reshape(1, 3), k0, targets)[0]
 
-        if cost <= mincost and a != 0.0:
-            mina = a
-            mincost = cost
 
-    #  print(mincost, mina)
-    #  input()
+def selection_learning_params(dps, ps, k0, targets):
+    """
+    Step sizes with the minimum cost for each target,
+    all the candidates are integrated in one batch
+    """
+    n = len(ps)
+    alphas = np.arange(1.0, 2.0, 0.5)
+    tps = (ps[:, None, :] + alphas[:, None] * dps[:, None, :]).reshape(-1, 3)
+    k0s = np.repeat(np.broadcast_to(k0, n), len(alphas))
+    xc, yc, yawc = motion_model.generate_last_states(
+        tps[:, 0], tps[:, 1], tps[:, 2], k0s)
+    costs = np.linalg.norm(calc_diffs(np.repeat(targets, len(alphas), axis=0),
+                                      xc, yc, yawc), axis=1).reshape(n, -1)
+
+    # the last one of the minimum cost candidates
+    best = len(alphas) - 1 - np.argmin(costs[:, ::-1], axis=1)
 
-    return mina
+    return alphas[best]
 
 
 def show_trajectory(target, xc, yc):  # pragma: no cover
@@ -102,34 +113,76 @@ def show_trajectory(target, xc, yc):  # pragma: no cover
 
 
 def optimize_trajectory(target, k0, p):
+    targets = np.array([[target.x, target.y, target.yaw]])
+    ps, found = optimize_trajectories(targets, k0, p.reshape(1, 3),
+                                      animation_target=target)
+
+    if not found[0]:
+        return None, None, None, None
+
+    p[:] = ps[0].reshape(3, 1)
+    xc, yc, yawc = motion_model.generate_trajectory(p[0], p[1], p[2], k0)
+
+    return xc, yc, yawc, p
+
+
+def optimize_trajectories(targets, k0, ps, animation_target=None):
+    """
+    Optimize the trajectory parameters of all the targets in parallel
+
+    :param targets: target states (x, y, yaw), shape (n, 3)
+    :param k0: initial curvature
+    :param ps: initial trajectory parameters (s, km, kf), shape (n, 3)
+    :param animation_target: target state to show the trajectories of
+    :return: optimized parameters and the flags of the found paths
+    """
+    targets = np.asarray(targets, dtype=float).reshape(-1, 3)
+    ps = np.array(ps, dtype=float).reshape(-1, 3)
+    found = np.zeros(len(ps), dtype=bool)
+    active = np.ones(len(ps), dtype=bool)
+
     for i in range(max_iter):
-        xc, yc, yawc = motion_model.generate_trajectory(p[0], p[1], p[2], k0)
-        dc = np.array(calc_diff(target, xc, yc, yawc)).reshape(3, 1)
+        ids = np.flatnonzero(active)
+        if len(ids) == 0:
+            break
 
-        cost = np.linalg.norm(dc)
-        if cost <= cost_th:
-            print("path is ok cost is:" + str(cost))
+        p = ps[ids]
+        xc, yc, yawc = motion_model.generate_last_states(
+            p[:, 0], p[:, 1], p[:, 2], k0)
+        dc = calc_diffs(targets[ids], xc, yc, yawc)
+
+        cost = np.linalg.norm(dc, axis=1)
+        ok = cost <= cost_th
+        for c in cost[ok]:
+            print("path is ok cost is:" + str(c))
+        found[ids[ok]] = True
+        active[ids[ok]] = False
+        ids, p, dc = ids[~ok], p[~ok], dc[~ok]
+        if len(ids) == 0:
             break
 
-        J = calc_j(target, p, h, k0)
-        try:
-            dp = - np.linalg.inv(J) @ dc
-        except np.linalg.linalg.LinAlgError:
+        J = calc_jacobians(targets[ids], p, h, k0)
+        singular = np.abs(np.linalg.det(J)) == 0.0
+        if np.any(singular):
             print("cannot calc path LinAlgError")
-            xc, yc, yawc, p = None, None, None, None
-            break
-        alpha = selection_learning_param(dp, p, k0, target)
+            active[ids[singular]] = False
+            ids, p, dc, J = ids[~singular], p[~singular], dc[~singular], \
+                J[~singular]
 
-        p += alpha * np.array(dp)
-        #  print(p.T)
+        dp = - np.linalg.solve(J, dc[:, :, None])[:, :, 0]
+        alpha = selection_learning_params(dp, p, k0, targets[ids])
 
-        if show_animation:  # pragma: no cover
-            show_trajectory(target, xc, yc)
-    else:
-        xc, yc, yawc, p = None, None, None, None
+        ps[ids] = p + alpha[:, None] * dp
+
+        if show_animation and animation_target is not None:  # pragma: no cover
+            xc, yc, yawc = motion_model.generate_trajectory(
+                ps[0, 0], ps[0, 1], ps[0, 2], k0)
+            show_trajectory(animation_target, xc, yc)
+
+    for _ in np.flatnonzero(active):
         print("cannot calc path")
 
-    return xc, yc, yawc, p
+    return ps, found
 
 
 def test_optimize_trajectory():  # pragma: no cover
@@ -1,6 +1,5 @@
 import math
 import numpy as np
-import scipy.interpolate
 
 # motion parameter
 L = 1.0  # wheel base
@@ -32,58 +31,67 @@ def update(state, v, delta, dt, L):
     return state
 
 
-def generate_trajectory(s, km, kf, k0):
-
+def calc_curvatures(tau, k0, km, kf):
+    """
+    Quadratic curvature profile through k0, km and kf at the normalized
+    times 0, 0.5 and 1
+    """
+    return k0 * 2.0 * (tau - 0.5) * (tau - 1.0) \
+        - km * 4.0 * tau * (tau - 1.0) \
+        + kf * 2.0 * tau * (tau - 0.5)
+
+
+def generate_trajectories(s, km, kf, k0):
+    """
+    Integrate a batch of trajectories at once
+
+    :param s: course lengths, shape (n,)
+    :param km: middle curvatures, shape (n,)
+    :param kf: final curvatures, shape (n,)
+    :param k0: initial curvature(s)
+    :return: x, y, yaw with shape (n, max_steps + 1) padded with the last
+        state, and the number of steps of each trajectory
+    """
+    s, km, kf, k0 = np.broadcast_arrays(*[np.asarray(a, dtype=float).ravel()
+                                          for a in (s, km, kf, k0)])
     n = s / ds
     time = s / v  # [s]
-    
-    if isinstance(time, type(np.array([]))): time = time[0]
-    if isinstance(km, type(np.array([]))): km = km[0]
-    if isinstance(kf, type(np.array([]))): kf = kf[0]
-    
-    tk = np.array([0.0, time / 2.0, time])
-    kk = np.array([k0, km, kf])
-    t = np.arange(0.0, time, time / n)
-    fkp = scipy.interpolate.interp1d(tk, kk, kind="quadratic")
-    kp = [fkp(ti) for ti in t]
-    dt = float(time / n)
+    dt = time / n
+    n_steps = np.ceil(time / dt).astype(int)
 
-    #  plt.plot(t, kp)
-    #  plt.show()
+    steps = np.arange(n_steps.max(initial=0))
+    active = steps < n_steps[:, None]
+    t = steps * dt[:, None]
+    kp = calc_curvatures(t / time[:, None], k0[:, None], km[:, None],
+                         kf[:, None])
 
-    state = State()
-    x, y, yaw = [state.x], [state.y], [state.yaw]
+    dyaw = np.where(active, v / L * np.tan(kp) * dt[:, None], 0.0)
+    yaw = np.zeros((len(s), len(steps) + 1))
+    yaw[:, 1:] = np.cumsum(dyaw, axis=1)
 
-    for ikp in kp:
-        state = update(state, v, ikp, dt, L)
-        x.append(state.x)
-        y.append(state.y)
-        yaw.append(state.yaw)
+    step_length = np.where(active, v * dt[:, None], 0.0)
+    x = np.zeros_like(yaw)
+    y = np.zeros_like(yaw)
+    x[:, 1:] = np.cumsum(step_length * np.cos(yaw[:, :-1]), axis=1)
+    y[:, 1:] = np.cumsum(step_length * np.sin(yaw[:, :-1]), axis=1)
 
-    return x, y, yaw
+    return x, y, pi_2_pi(yaw), n_steps
 
 
-def generate_last_state(s, km, kf, k0):
+def generate_last_states(s, km, kf, k0):
+    x, y, yaw, _ = generate_trajectories(s, km, kf, k0)
+
+    return x[:, -1], y[:, -1], yaw[:, -1]
 
-    n = s / ds
-    time = s / v  # [s]
-    
-    if isinstance(time,  type(np.array([]))): time = time[0]
-    if isinstance(km, type(np.array([]))): km = km[0]
-    if isinstance(kf, type(np.array([]))): kf = kf[0]
-    
-    tk = np.array([0.0, time / 2.0, time])
-    kk = np.array([k0, km, kf])
-    t = np.arange(0.0, time, time / n)
-    fkp = scipy.interpolate.interp1d(tk, kk, kind="quadratic")
-    kp = [fkp(ti) for ti in t]
-    dt = time / n
 
-    #  plt.plot(t, kp)
-    #  plt.show()
+def generate_trajectory(s, km, kf, k0):
+    x, y, yaw, n_steps = generate_trajectories(s, km, kf, k0)
+    n = n_steps[0] + 1
 
-    state = State()
+    return x[0, :n].tolist(), y[0, :n].tolist(), yaw[0, :n].tolist()
 
-    _ = [update(state, v, ikp, dt, L) for ikp in kp]
 
-    return state.x, state.y, state.yaw
+def generate_last_state(s, km, kf, k0):
+    x, y, yaw = generate_last_states(s, km, kf, k0)
+
+    return float(x[0]), float(y[0]), float(yaw[0])
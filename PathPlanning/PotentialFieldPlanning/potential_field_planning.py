@@ -10,8 +10,20 @@ https://www.cs.cmu.edu/~motionplanning/lecture/Chap4-Potential-Field_howie.pdf
 """
 
 from collections import deque
+import os
+import sys
+
 import numpy as np
 import matplotlib.pyplot as plt
+from scipy.spatial import cKDTree
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__))
+                + "/../../Mapping/gaussian_grid_map/")
+
+try:
+    from gaussian_grid_map import calc_update_window
+except ImportError:
+    raise
 
 # Parameters
 KP = 5.0  # attractive potential gain
@@ -23,56 +35,124 @@ OSCILLATIONS_DETECTION_LENGTH = 3
 show_animation = True
 
 
-def calc_potential_field(gx, gy, ox, oy, reso, rr, sx, sy):
-    minx = min(min(ox), sx, gx) - AREA_WIDTH / 2.0
-    miny = min(min(oy), sy, gy) - AREA_WIDTH / 2.0
-    maxx = max(max(ox), sx, gx) + AREA_WIDTH / 2.0
-    maxy = max(max(oy), sy, gy) + AREA_WIDTH / 2.0
-    xw = int(round((maxx - minx) / reso))
-    yw = int(round((maxy - miny) / reso))
-
-    # calc each potential
-    pmap = [[0.0 for i in range(yw)] for i in range(xw)]
+class PotentialField:
+    """
+    Potential map on a grid
+
+    The attractive potential is computed over the whole grid at once and
+    the repulsive potential comes from nearest obstacle queries on a
+    KD-tree, batched over all the cells. The map can be reused for
+    several plannings and updated in place when some obstacles move.
+    """
+
+    def __init__(self, gx, gy, ox, oy, reso, rr, sx, sy):
+        self.gx, self.gy = gx, gy
+        self.reso = reso
+        self.rr = rr
+        self.minx = min(min(ox), sx, gx) - AREA_WIDTH / 2.0
+        self.miny = min(min(oy), sy, gy) - AREA_WIDTH / 2.0
+        self.maxx = max(max(ox), sx, gx) + AREA_WIDTH / 2.0
+        self.maxy = max(max(oy), sy, gy) + AREA_WIDTH / 2.0
+        self.xw = int(round((self.maxx - self.minx) / reso))
+        self.yw = int(round((self.maxy - self.miny) / reso))
+
+        self.ox = np.array(ox, dtype=float)
+        self.oy = np.array(oy, dtype=float)
+        self.obstacle_tree = cKDTree(np.stack([self.ox, self.oy], axis=1))
+        x = np.arange(self.xw) * reso + self.minx
+        y = np.arange(self.yw) * reso + self.miny
+        self.x, self.y = np.meshgrid(x, y, indexing="ij")
+
+        self.pmap = calc_attractive_potential(self.x, self.y, gx, gy)
+        self.pmap += self.calc_repulsive_map(0, self.xw, 0, self.yw)
+        self.next_ids = None
+
+    def calc_repulsive_map(self, ix0, ix1, iy0, iy1):
+        """
+        repulsive potential of the grid window [ix0:ix1, iy0:iy1]
+        """
+        x, y = self.x[ix0:ix1, iy0:iy1], self.y[ix0:ix1, iy0:iy1]
+
+        # search nearest obstacle, only the ones within rr matter
+        dq, _ = self.obstacle_tree.query(
+            np.stack([x.ravel(), y.ravel()], axis=1),
+            distance_upper_bound=self.rr * (1.0 + 1e-9))
+        dq = dq.reshape(x.shape)
+
+        upot = np.zeros(x.shape)
+        is_near = dq <= self.rr
+        dq = np.maximum(dq[is_near], 0.1)
+        upot[is_near] = 0.5 * ETA * (1.0 / dq - 1.0 / self.rr) ** 2
+
+        return upot
+
+    def update_obstacles(self, ox, oy):
+        """
+        move the obstacles to new positions and recompute the potential
+        around the ones that moved only
+
+        returns False when the obstacles do not fit in the map anymore,
+        a new PotentialField has to be built in that case
+        """
+        ox = np.array(ox, dtype=float)
+        oy = np.array(oy, dtype=float)
+        if len(ox) != len(self.ox) or \
+                ox.min() < self.minx or ox.max() > self.maxx or \
+                oy.min() < self.miny or oy.max() > self.maxy:
+            return False
+
+        # only the cells within rr of an old or new position change
+        window = calc_update_window(self.ox, self.oy, ox, oy, self.rr,
+                                    self.minx, self.miny, self.reso,
+                                    self.xw, self.yw)
+        if window is None:
+            return True
+        self.ox, self.oy = ox, oy
+        self.obstacle_tree = cKDTree(np.stack([ox, oy], axis=1))
+
+        ix0, ix1, iy0, iy1 = window
+        self.pmap[ix0:ix1, iy0:iy1] = calc_attractive_potential(
+            self.x[ix0:ix1, iy0:iy1], self.y[ix0:ix1, iy0:iy1],
+            self.gx, self.gy) + self.calc_repulsive_map(ix0, ix1, iy0, iy1)
+        self.next_ids = None
+
+        return True
+
+    def is_inside(self, x, y):
+        ix = round((x - self.minx) / self.reso)
+        iy = round((y - self.miny) / self.reso)
+        return 0 <= ix < self.xw and 0 <= iy < self.yw
+
+    def calc_next_ids(self):
+        """
+        lowest potential neighbor of every cell, the descent
+        direction of the whole map
+        """
+        if self.next_ids is None:
+            motion = np.array(get_motion_model())
+            padded = np.pad(self.pmap, 1, constant_values=np.inf)
+            neighbor_p = np.stack([
+                padded[1 + dx:self.xw + 1 + dx, 1 + dy:self.yw + 1 + dy]
+                for (dx, dy) in motion])
+            best = np.argmin(neighbor_p, axis=0)
+            ix, iy = np.meshgrid(np.arange(self.xw), np.arange(self.yw),
+                                 indexing="ij")
+            self.next_ids = np.stack([ix + motion[best, 0],
+                                      iy + motion[best, 1]], axis=-1)
+
+        return self.next_ids
 
-    for ix in range(xw):
-        x = ix * reso + minx
 
-        for iy in range(yw):
-            y = iy * reso + miny
-            ug = calc_attractive_potential(x, y, gx, gy)
-            uo = calc_repulsive_potential(x, y, ox, oy, rr)
-            uf = ug + uo
-            pmap[ix][iy] = uf
+def calc_potential_field(gx, gy, ox, oy, reso, rr, sx, sy):
+    pf = PotentialField(gx, gy, ox, oy, reso, rr, sx, sy)
 
-    return pmap, minx, miny
+    return pf.pmap, pf.minx, pf.miny
 
 
 def calc_attractive_potential(x, y, gx, gy):
     return 0.5 * KP * np.hypot(x - gx, y - gy)
 
 
-def calc_repulsive_potential(x, y, ox, oy, rr):
-    # search nearest obstacle
-    minid = -1
-    dmin = float("inf")
-    for i, _ in enumerate(ox):
-        d = np.hypot(x - ox[i], y - oy[i])
-        if dmin >= d:
-            dmin = d
-            minid = i
-
-    # calc repulsive potential
-    dq = np.hypot(x - ox[minid], y - oy[minid])
-
-    if dq <= rr:
-        if dq <= 0.1:
-            dq = 0.1
-
-        return 0.5 * ETA * (1.0 / dq - 1.0 / rr) ** 2
-    else:
-        return 0.0
-
-
 def get_motion_model():
     # dx, dy
     motion = [[1, 0],
@@ -103,10 +183,25 @@ def oscillations_detection(previous_ids, ix, iy):
     return False
 
 
-def potential_field_planning(sx, sy, gx, gy, ox, oy, reso, rr):
+def potential_field_planning(sx, sy, gx, gy, ox, oy, reso, rr,
+                             potential_field=None):
+    """
+    potential_field: PotentialField to reuse, built for the same goal,
+    reso and rr. A new one is built from the obstacles when it is None
+    """
 
     # calc potential field
-    pmap, minx, miny = calc_potential_field(gx, gy, ox, oy, reso, rr, sx, sy)
+    if potential_field is None:
+        potential_field = PotentialField(gx, gy, ox, oy, reso, rr, sx, sy)
+    elif (gx, gy, reso, rr) != (potential_field.gx, potential_field.gy,
+                                potential_field.reso, potential_field.rr):
+        raise ValueError("potential field is built for another goal, "
+                         "reso or rr")
+    elif not potential_field.is_inside(sx, sy):
+        raise ValueError("start is outside the potential field")
+    pmap = potential_field.pmap
+    minx, miny = potential_field.minx, potential_field.miny
+    next_ids = potential_field.calc_next_ids()
 
     # search path
     d = np.hypot(sx - gx, sy - gy)
@@ -124,26 +219,10 @@ def potential_field_planning(sx, sy, gx, gy, ox, oy, reso, rr):
         plt.plot(gix, giy, "*m")
 
     rx, ry = [sx], [sy]
-    motion = get_motion_model()
     previous_ids = deque()
 
     while d >= reso:
-        minp = float("inf")
-        minix, miniy = -1, -1
-        for i, _ in enumerate(motion):
-            inx = int(ix + motion[i][0])
-            iny = int(iy + motion[i][1])
-            if inx >= len(pmap) or iny >= len(pmap[0]) or inx < 0 or iny < 0:
-                p = float("inf")  # outside area
-                print("outside potential!")
-            else:
-                p = pmap[inx][iny]
-            if minp > p:
-                minp = p
-                minix = inx
-                miniy = iny
-        ix = minix
-        iy = miniy
+        ix, iy = next_ids[ix, iy]
         xp = ix * reso + minx
         yp = iy * reso + miny
         d = np.hypot(gx - xp, gy - yp)
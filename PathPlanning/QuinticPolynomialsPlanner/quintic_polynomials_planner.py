@@ -25,23 +25,10 @@ show_animation = True
 class QuinticPolynomial:
 
     def __init__(self, xs, vxs, axs, xe, vxe, axe, time):
-        # calc coefficient of quintic polynomial
-        # See jupyter notebook document for derivation of this equation.
-        self.a0 = xs
-        self.a1 = vxs
-        self.a2 = axs / 2.0
-
-        A = np.array([[time ** 3, time ** 4, time ** 5],
-                      [3 * time ** 2, 4 * time ** 3, 5 * time ** 4],
-                      [6 * time, 12 * time ** 2, 20 * time ** 3]])
-        b = np.array([xe - self.a0 - self.a1 * time - self.a2 * time ** 2,
-                      vxe - self.a1 - 2 * self.a2 * time,
-                      axe - 2 * self.a2])
-        x = np.linalg.solve(A, b)
-
-        self.a3 = x[0]
-        self.a4 = x[1]
-        self.a5 = x[2]
+        (self.a0, self.a1, self.a2,
+         self.a3, self.a4, self.a5) = [float(a) for a in
+                                       calc_quintic_coefficients(
+                                           xs, vxs, axs, xe, vxe, axe, time)]
 
     def calc_point(self, t):
         xt = self.a0 + self.a1 * t + self.a2 * t ** 2 + \
@@ -66,6 +53,47 @@ class QuinticPolynomial:
         return xt
 
 
+def calc_quintic_coefficients(xs, vxs, axs, xe, vxe, axe, time):
+    """
+    Coefficients a0..a5 of the quintic polynomials for one or several
+    horizons at once. With an array of horizons every coefficient is an
+    array with one entry per horizon.
+    """
+    # See jupyter notebook document for derivation of this equation.
+    time = np.asarray(time, dtype=float)
+    a0 = np.full_like(time, xs)
+    a1 = np.full_like(time, vxs)
+    a2 = np.full_like(time, axs / 2.0)
+
+    A = np.stack([
+        np.stack([time ** 3, time ** 4, time ** 5], axis=-1),
+        np.stack([3 * time ** 2, 4 * time ** 3, 5 * time ** 4], axis=-1),
+        np.stack([6 * time, 12 * time ** 2, 20 * time ** 3], axis=-1)],
+        axis=-2)
+    b = np.stack([xe - a0 - a1 * time - a2 * time ** 2,
+                  vxe - a1 - 2 * a2 * time,
+                  axe - 2 * a2], axis=-1)
+    x = np.linalg.solve(A, b[..., np.newaxis])[..., 0]
+
+    return a0, a1, a2, x[..., 0], x[..., 1], x[..., 2]
+
+
+def calc_quintic_states(coefficients, t):
+    """
+    Position and its first three derivatives of the quintic polynomials
+    given by calc_quintic_coefficients, on a grid of times t.
+    Every result has shape (number of horizons, len(t)).
+    """
+    a0, a1, a2, a3, a4, a5 = [np.asarray(a)[..., np.newaxis]
+                              for a in coefficients]
+    p = a0 + a1 * t + a2 * t ** 2 + a3 * t ** 3 + a4 * t ** 4 + a5 * t ** 5
+    dp = a1 + 2 * a2 * t + 3 * a3 * t ** 2 + 4 * a4 * t ** 3 + \
+        5 * a5 * t ** 4
+    ddp = 2 * a2 + 6 * a3 * t + 12 * a4 * t ** 2 + 20 * a5 * t ** 3
+    dddp = 6 * a3 + 24 * a4 * t + 60 * a5 * t ** 2
+    return p, dp, ddp, dddp
+
+
 def quintic_polynomials_planner(sx, sy, syaw, sv, sa, gx, gy, gyaw, gv, ga, max_accel, max_jerk, dt):
     """
     quintic polynomial planner
@@ -103,43 +131,43 @@ def quintic_polynomials_planner(sx, sy, syaw, sv, sa, gx, gy, gyaw, gv, ga, max_
     axg = ga * math.cos(gyaw)
     ayg = ga * math.sin(gyaw)
 
-    time, rx, ry, ryaw, rv, ra, rj = [], [], [], [], [], [], []
-
-    for T in np.arange(MIN_T, MAX_T, MIN_T):
-        xqp = QuinticPolynomial(sx, vxs, axs, gx, vxg, axg, T)
-        yqp = QuinticPolynomial(sy, vys, ays, gy, vyg, ayg, T)
-
-        time, rx, ry, ryaw, rv, ra, rj = [], [], [], [], [], [], []
-
-        for t in np.arange(0.0, T + dt, dt):
-            time.append(t)
-            rx.append(xqp.calc_point(t))
-            ry.append(yqp.calc_point(t))
-
-            vx = xqp.calc_first_derivative(t)
-            vy = yqp.calc_first_derivative(t)
-            v = np.hypot(vx, vy)
-            yaw = math.atan2(vy, vx)
-            rv.append(v)
-            ryaw.append(yaw)
-
-            ax = xqp.calc_second_derivative(t)
-            ay = yqp.calc_second_derivative(t)
-            a = np.hypot(ax, ay)
-            if len(rv) >= 2 and rv[-1] - rv[-2] < 0.0:
-                a *= -1
-            ra.append(a)
-
-            jx = xqp.calc_third_derivative(t)
-            jy = yqp.calc_third_derivative(t)
-            j = np.hypot(jx, jy)
-            if len(ra) >= 2 and ra[-1] - ra[-2] < 0.0:
-                j *= -1
-            rj.append(j)
-
-        if max([abs(i) for i in ra]) <= max_accel and max([abs(i) for i in rj]) <= max_jerk:
-            print("find path!!")
-            break
+    # solve and sample every candidate horizon at once, padding the
+    # shorter ones past their end time
+    horizons = np.arange(MIN_T, MAX_T, MIN_T)
+    n_samples = np.array([len(np.arange(0.0, T + dt, dt)) for T in horizons])
+    t = np.arange(n_samples.max()) * dt
+    valid = np.arange(len(t)) < n_samples[:, np.newaxis]
+
+    x, vx, ax, jx = calc_quintic_states(
+        calc_quintic_coefficients(sx, vxs, axs, gx, vxg, axg, horizons), t)
+    y, vy, ay, jy = calc_quintic_states(
+        calc_quintic_coefficients(sy, vys, ays, gy, vyg, ayg, horizons), t)
+
+    v = np.hypot(vx, vy)
+    a = np.hypot(ax, ay)
+    j = np.hypot(jx, jy)
+
+    # the sign only carries whether speed / accel is decreasing,
+    # so the limits can be checked on the magnitudes
+    feasible = np.all(((a <= max_accel) & (j <= max_jerk)) | ~valid, axis=1)
+    if np.any(feasible):
+        print("find path!!")
+        ind = int(np.argmax(feasible))
+    else:
+        ind = len(horizons) - 1
+    n = n_samples[ind]
+
+    rv = v[ind, :n]
+    ra = a[ind, :n]
+    ra[1:][np.diff(rv) < 0.0] *= -1
+    rj = j[ind, :n]
+    rj[1:][np.diff(ra) < 0.0] *= -1
+
+    time = t[:n].tolist()
+    rx = x[ind, :n].tolist()
+    ry = y[ind, :n].tolist()
+    ryaw = np.arctan2(vy[ind, :n], vx[ind, :n]).tolist()
+    rv, ra, rj = rv.tolist(), ra.tolist(), rj.tolist()
 
     if show_animation:  # pragma: no cover
         for i, _ in enumerate(time):
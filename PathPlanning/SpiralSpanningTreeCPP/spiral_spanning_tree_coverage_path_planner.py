@@ -31,7 +31,19 @@ class SpiralSpanningTreeCoveragePlanner:
         self.merged_map_height = self.origin_map_height // 2
         self.merged_map_width = self.origin_map_width // 2
 
+        # a merged node is free only when the 4 sub-cells are all free
+        free = occ_map != 0
+        self.merged_free = free[0::2, 0::2] & free[1::2, 0::2] \
+            & free[0::2, 1::2] & free[1::2, 1::2]
+
+        # counter-clockwise neighbor finding order
+        self.order = [[1, 0], [0, 1], [-1, 0], [0, -1]]
+
         self.edge = []
+        # spanning tree adjacency, bit k set when the tree has an edge
+        # from the node towards self.order[k]
+        self.tree_dirs = np.zeros(
+            (self.merged_map_height, self.merged_map_width), dtype=np.uint8)
 
     def plan(self, start):
         """plan
@@ -42,90 +54,191 @@ class SpiralSpanningTreeCoveragePlanner:
         """
 
         visit_times = np.zeros(
-            (self.merged_map_height, self.merged_map_width), dtype=np.int)
+            (self.merged_map_height, self.merged_map_width), dtype=int)
         visit_times[start[0]][start[1]] = 1
 
         # generate route by
-        # recusively call perform_spanning_tree_coverage() from start node
+        # performing spanning tree coverage from start node
         route = []
         self.perform_spanning_tree_coverage(start, visit_times, route)
 
-        path = []
         # generate path from route
-        for idx in range(len(route)-1):
-            dp = abs(route[idx][0] - route[idx+1][0]) + \
-                abs(route[idx][1] - route[idx+1][1])
-            if dp == 0:
-                # special handle for round-trip path
-                path.append(self.get_round_trip_path(route[idx-1], route[idx]))
-            elif dp == 1:
-                path.append(self.move(route[idx], route[idx+1]))
-            elif dp == 2:
-                # special handle for non-adjacent route nodes
-                mid_node = self.get_intermediate_node(route[idx], route[idx+1])
-                path.append(self.move(route[idx], mid_node))
-                path.append(self.move(mid_node, route[idx+1]))
-            else:
-                sys.exit('adjacent path node distance larger than 2')
+        path = self.generate_path(route)
 
         return self.edge, route, path
 
-    def perform_spanning_tree_coverage(self, current_node, visit_times, route):
-        """perform_spanning_tree_coverage
+    def generate_path(self, route):
+        """generate_path
+
+        sub-node moves between consecutive route nodes for the whole route
+        at once, as an array of [p, q] sub-node pairs
+
+        :param route: route of merged nodes
+        """
+        nodes = np.array(route, dtype=int).reshape(-1, 2)
+        p, q = nodes[:-1], nodes[1:]
+        dp = np.abs(q - p).sum(axis=1)
+        if np.any(dp > 2):
+            sys.exit('adjacent path node distance larger than 2')
+
+        steps = self.calc_moves(p, q)
+        # special handle for round-trip path,
+        # route[idx - 1] wraps around for idx 0 as before
+        is_round_trip = dp == 0
+        last = np.roll(nodes, 1, axis=0)[:-1]
+        steps[is_round_trip] = self.calc_round_trip_paths(
+            last[is_round_trip], p[is_round_trip])
+
+        # special handle for non-adjacent route nodes,
+        # which take two moves through their common tree neighbor
+        is_far = dp == 2
+        mid = self.get_intermediate_nodes(p[is_far], q[is_far])
+        n_moves = np.where(is_far, 2, 1)
+        first = np.cumsum(n_moves) - n_moves
+        path = np.empty((n_moves.sum(), 2, 2), dtype=int)
+        path[first[~is_far]] = steps[~is_far]
+        path[first[is_far]] = self.calc_moves(p[is_far], mid)
+        path[first[is_far] + 1] = self.calc_moves(mid, q[is_far])
+
+        return path
+
+    def calc_moves(self, p, q):
+        """calc_moves
+
+        bulk version of move for arrays of adjacent nodes
+        """
+        # sub-node offsets of [p, q] for a move E/W/S/N, see move
+        offsets = np.array([[[1, 1], [1, 0]], [[0, 0], [0, 1]],
+                            [[1, 0], [0, 0]], [[0, 1], [1, 1]]])
+        moves = np.stack([2 * p, 2 * q], axis=1)
+        return moves + offsets[self.calc_vector_directions(p, q)]
+
+    def calc_round_trip_paths(self, last, pivot):
+        """calc_round_trip_paths
 
-        recursive function for function <plan>
+        bulk version of get_round_trip_path
+        """
+        # sub-node offsets for a last->pivot direction E/W/S/N,
+        # see get_round_trip_path
+        offsets = np.array([[[1, 1], [0, 1]], [[0, 0], [1, 0]],
+                            [[1, 0], [1, 1]], [[0, 1], [0, 0]]])
+        return 2 * pivot[:, np.newaxis, :] + \
+            offsets[self.calc_vector_directions(last, pivot)]
+
+    @staticmethod
+    def calc_vector_directions(p, q):
+        # 0: E, 1: W, 2: S, 3: N, see get_vector_direction
+        d = q - p
+        return np.select([d[:, 1] > 0, d[:, 1] < 0, d[:, 0] > 0], [0, 1, 2], 3)
+
+    def has_tree_edges(self, p, q):
+        """has_tree_edges
+
+        whether the spanning tree links each of the adjacent nodes p and q
+        """
+        d = q - p
+        # index of d in self.order
+        k = np.select([d[:, 0] > 0, d[:, 1] > 0, d[:, 0] < 0], [0, 1, 2], 3)
+        return (self.tree_dirs[p[:, 0], p[:, 1]] >> k) & 1 == 1
+
+    def get_intermediate_nodes(self, p, q):
+        """get_intermediate_nodes
 
-        :param current_node: current node
+        bulk version of get_intermediate_node
         """
+        d = q - p
+        # two steps along a line have a single candidate, a diagonal step
+        # goes through one of the two corners
+        first = p + np.where(np.abs(d) == 2, d // 2, d * [1, 0])
+        second = p + np.where(np.abs(d) == 2, d // 2, d * [0, 1])
+        is_first = self.has_tree_edges(p, first) & \
+            self.has_tree_edges(first, q)
+        mid = np.where(is_first[:, np.newaxis], first, second)
+        if not np.all(is_first | (self.has_tree_edges(p, second) &
+                                  self.has_tree_edges(second, q))):
+            sys.exit('get_intermediate_node: no intermediate node')
+        return mid
+
+    def perform_spanning_tree_coverage(self, start_node, visit_times, route):
+        """perform_spanning_tree_coverage
 
-        def is_valid_node(i, j):
-            is_i_valid_bounded = 0 <= i < self.merged_map_height
-            is_j_valid_bounded = 0 <= j < self.merged_map_width
-            if is_i_valid_bounded and is_j_valid_bounded:
-                # free only when the 4 sub-cells are all free
-                return bool(
-                    self.occ_map[2*i][2*j]
-                    and self.occ_map[2*i+1][2*j]
-                    and self.occ_map[2*i][2*j+1]
-                    and self.occ_map[2*i+1][2*j+1])
+        depth first spanning tree construction for function <plan>,
+        iterative with an explicit stack so that large maps
+        do not hit the recursion limit
 
+        :param start_node: start node
+        """
+
+        # flat index over the merged map padded by one blocked node,
+        # so that neighbor lookups need no bound checks
+        width = self.merged_map_width + 2
+        is_free = np.pad(self.merged_free, 1).ravel().tolist()
+        visits = np.pad(visit_times, 1).ravel().tolist()
+
+        def to_node(index):
+            i, j = divmod(index, width)
+            return i - 1, j - 1
+
+        def has_unvisited_neighbor(index):
+            for inc in order:
+                n_index = index + inc
+                if is_free[n_index] and visits[n_index] == 0:
+                    return True
             return False
 
-        # counter-clockwise neighbor finding order
-        order = [[1, 0], [0, 1], [-1, 0], [0, -1]]
-
-        found = False
-        route.append(current_node)
-        for inc in order:
-            ni, nj = current_node[0] + inc[0], current_node[1] + inc[1]
-            if is_valid_node(ni, nj) and visit_times[ni][nj] == 0:
-                neighbor_node = (ni, nj)
-                self.edge.append((current_node, neighbor_node))
-                found = True
-                visit_times[ni][nj] += 1
-                self.perform_spanning_tree_coverage(
-                    neighbor_node, visit_times, route)
-
-        # backtrace route from node with neighbors all visited
-        # to first node with unvisited neighbor
-        if not found:
-            has_node_with_unvisited_ngb = False
-            for node in reversed(route):
-                # drop nodes that have been visited twice
-                if visit_times[node[0]][node[1]] == 2:
-                    continue
-
-                visit_times[node[0]][node[1]] += 1
-                route.append(node)
-
-                for inc in order:
-                    ni, nj = node[0] + inc[0], node[1] + inc[1]
-                    if is_valid_node(ni, nj) and visit_times[ni][nj] == 0:
-                        has_node_with_unvisited_ngb = True
+        # self.order as flat index offsets
+        order = [inc[0] * width + inc[1] for inc in self.order]
+        tree_dirs = bytearray(len(is_free))
+
+        start_node = tuple(start_node)
+        start_index = (start_node[0] + 1) * width + start_node[1] + 1
+        # nodes visited once, in route order; these are the only nodes
+        # the backtrace below can stop at
+        visited_once, visited_once_nodes = [start_index], [start_node]
+        # call stack of the depth first search
+        stack, stack_nodes = [start_index], [start_node]
+        # next neighbor to try, and whether an unvisited one was found,
+        # for each node on the stack
+        next_dir = bytearray(len(is_free))
+        found = bytearray(len(is_free))
+        route.append(start_node)
+        while stack:
+            index = stack[-1]
+            k = next_dir[index]
+            if k < len(order):
+                n_index = index + order[k]
+                next_dir[index] = k + 1
+                if is_free[n_index] and visits[n_index] == 0:
+                    neighbor_node = to_node(n_index)
+                    self.edge.append((stack_nodes[-1], neighbor_node))
+                    tree_dirs[index] |= 1 << k
+                    tree_dirs[n_index] |= 1 << ((k + 2) % 4)
+                    found[index] = True
+                    visits[n_index] += 1
+                    route.append(neighbor_node)
+                    visited_once.append(n_index)
+                    visited_once_nodes.append(neighbor_node)
+                    stack.append(n_index)
+                    stack_nodes.append(neighbor_node)
+                continue
+
+            # backtrace route from node with neighbors all visited
+            # to first node with unvisited neighbor,
+            # dropping nodes that have been visited twice
+            if not found[index]:
+                while visited_once:
+                    b_index = visited_once.pop()
+                    visits[b_index] += 1
+                    route.append(visited_once_nodes.pop())
+                    if has_unvisited_neighbor(b_index):
                         break
 
-                if has_node_with_unvisited_ngb:
-                    break
+            stack.pop()
+            stack_nodes.pop()
+
+        visit_times[:, :] = np.reshape(visits, (-1, width))[1:-1, 1:-1]
+        self.tree_dirs = np.frombuffer(tree_dirs, dtype=np.uint8).reshape(
+            -1, width)[1:-1, 1:-1].copy()
 
         return route
 
@@ -208,27 +321,8 @@ class SpiralSpanningTreeCoveragePlanner:
         return ipx, ipy
 
     def get_intermediate_node(self, p, q):
-        p_ngb, q_ngb = set(), set()
-
-        for m, n in self.edge:
-            if m == p:
-                p_ngb.add(n)
-            if n == p:
-                p_ngb.add(m)
-            if m == q:
-                q_ngb.add(n)
-            if n == q:
-                q_ngb.add(m)
-
-        itsc = p_ngb.intersection(q_ngb)
-        if len(itsc) == 0:
-            sys.exit('get_intermediate_node: \
-                 no intermediate node between', p, q)
-        elif len(itsc) == 1:
-            return list(itsc)[0]
-        else:
-            sys.exit('get_intermediate_node: \
-                more than 1 intermediate node between', p, q)
+        mid = self.get_intermediate_nodes(np.array([p]), np.array([q]))
+        return tuple(mid[0].tolist())
 
     def visualize_path(self, edge, path, start):
         def coord_transform(p):
@@ -17,6 +17,7 @@ from matplotlib import pyplot as plt
 import numpy as np
 import math
 import pandas as pd
+from scipy.spatial import cKDTree
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__))
                 + "/../ModelPredictiveTrajectoryGenerator/")
@@ -25,57 +26,75 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__))
 try:
     import model_predictive_trajectory_generator as planner
     import motion_model
+    import lookuptable_generator
 except:
     raise
 
 
 table_path = os.path.dirname(os.path.abspath(__file__)) + "/lookuptable.csv"
 
+# binary table made by lookuptable_generator.main(),
+# used instead of the csv table when it is up to date
+binary_table_path = lookuptable_generator.TABLE_PATH
+
 show_animation = True
 
 
-def search_nearest_one_from_lookuptable(tx, ty, tyaw, lookup_table):
-    mind = float("inf")
-    minid = -1
+# lookup table and KD-tree of its states, loaded once per table file
+_lookup_table_cache = {}
 
-    for (i, table) in enumerate(lookup_table):
 
-        dx = tx - table[0]
-        dy = ty - table[1]
-        dyaw = tyaw - table[2]
-        d = math.sqrt(dx ** 2 + dy ** 2 + dyaw ** 2)
-        if d <= mind:
-            minid = i
-            mind = d
+def search_nearest_one_from_lookuptable(tx, ty, tyaw, lookup_table):
+    d = np.hypot(np.hypot(tx - lookup_table[:, 0], ty - lookup_table[:, 1]),
+                 tyaw - lookup_table[:, 2])
+    # the last one of the nearest entries
+    minid = len(d) - 1 - np.argmin(d[::-1])
 
     return lookup_table[minid]
 
 
-def get_lookup_table():
-    data = pd.read_csv(table_path)
+def search_nearest_from_lookuptable(states):
+    lookup_table, kd_tree = load_lookup_table()
+    _, ids = kd_tree.query(np.asarray(states, dtype=float).reshape(-1, 3))
+
+    return lookup_table[ids]
+
 
-    return np.array(data)
+def load_lookup_table():
+    key = (binary_table_path, table_path)
+    if key not in _lookup_table_cache:
+        table_hash = lookuptable_generator.calc_table_hash(
+            lookuptable_generator.calc_states_list(), 0.0)
+        lookup_table = lookuptable_generator.load_lookup_table(
+            binary_table_path, table_hash)
+        if lookup_table is None:
+            lookup_table = np.array(pd.read_csv(table_path))
+        _lookup_table_cache[key] = (lookup_table,
+                                    cKDTree(lookup_table[:, :3]))
+
+    return _lookup_table_cache[key]
+
+
+def get_lookup_table():
+    return load_lookup_table()[0]
 
 
 def generate_path(target_states, k0):
     # x, y, yaw, s, km, kf
-    lookup_table = get_lookup_table()
-    result = []
-
-    for state in target_states:
-        bestp = search_nearest_one_from_lookuptable(
-            state[0], state[1], state[2], lookup_table)
+    states = np.asarray(target_states, dtype=float).reshape(-1, 3)
+    bestp = search_nearest_from_lookuptable(states)
 
-        target = motion_model.State(x=state[0], y=state[1], yaw=state[2])
-        init_p = np.array(
-            [math.sqrt(state[0] ** 2 + state[1] ** 2), bestp[4], bestp[5]]).reshape(3, 1)
+    init_p = np.column_stack(
+        (np.hypot(states[:, 0], states[:, 1]), bestp[:, 4], bestp[:, 5]))
 
-        x, y, yaw, p = planner.optimize_trajectory(target, k0, init_p)
+    p, found = planner.optimize_trajectories(states, k0, init_p)
+    p = p[found]
+    x, y, yaw = motion_model.generate_last_states(
+        p[:, 0], p[:, 1], p[:, 2], k0)
 
-        if x is not None:
-            print("find good path")
-            result.append(
-                [x[-1], y[-1], yaw[-1], float(p[0]), float(p[1]), float(p[2])])
+    for _ in p:
+        print("find good path")
+    result = np.column_stack((x, y, yaw, p)).tolist()
 
     print("finish path generation")
     return result
@@ -1,3 +1,6 @@
+import numpy as np
+
+
 class Geometry:
     class Point:
         def __init__(self, x, y):
@@ -40,4 +43,29 @@ class Geometry:
         if (o4 == 0) and on_segment(p2, q1, q2):
             return True
 
-        return False
\ No newline at end of file
+        return False
+
+    @staticmethod
+    def is_seg_intersect_array(p1x, p1y, q1x, q1y, p2x, p2y, q2x, q2y):
+        """
+        is_seg_intersect for arrays of segments (p1, q1) and (p2, q2),
+        the arrays are broadcast against each other
+        """
+
+        def on_segment(px, py, qx, qy, rx, ry):
+            return ((qx <= np.maximum(px, rx)) & (qx >= np.minimum(px, rx)) &
+                    (qy <= np.maximum(py, ry)) & (qy >= np.minimum(py, ry)))
+
+        def orientation(px, py, qx, qy, rx, ry):
+            return np.sign((qy - py) * (rx - qx) - (qx - px) * (ry - qy))
+
+        o1 = orientation(p1x, p1y, q1x, q1y, p2x, p2y)
+        o2 = orientation(p1x, p1y, q1x, q1y, q2x, q2y)
+        o3 = orientation(p2x, p2y, q2x, q2y, p1x, p1y)
+        o4 = orientation(p2x, p2y, q2x, q2y, q1x, q1y)
+
+        return (((o1 != o2) & (o3 != o4)) |
+                ((o1 == 0) & on_segment(p1x, p1y, p2x, p2y, q1x, q1y)) |
+                ((o2 == 0) & on_segment(p1x, p1y, q2x, q2y, q1x, q1y)) |
+                ((o3 == 0) & on_segment(p2x, p2y, p1x, p1y, q2x, q2y)) |
+                ((o4 == 0) & on_segment(p2x, p2y, q1x, q1y, q2x, q2y)))
@@ -20,6 +20,8 @@ from dijkstra_search import DijkstraSearch
 
 show_animation = True
 
+FIRST_SAMPLE_BLOCK = 2  # number of samples per segment in the first block
+
 
 class VisibilityRoadMap:
 
@@ -63,8 +65,9 @@ class VisibilityRoadMap:
             for (vx, vy) in zip(cvx_list, cvy_list):
                 nodes.append(DijkstraSearch.Node(vx, vy))
 
-        for node in nodes:
-            plt.plot(node.x, node.y, "xr")
+        if self.do_plot:
+            for node in nodes:
+                plt.plot(node.x, node.y, "xr")
 
         return nodes
 
@@ -88,40 +91,156 @@ class VisibilityRoadMap:
 
     def generate_road_map_info(self, nodes, obstacles):
 
-        road_map_info_list = []
-
-        for target_node in nodes:
-            road_map_info = []
-            for node_id, node in enumerate(nodes):
-                if np.hypot(target_node.x - node.x,
-                            target_node.y - node.y) <= 0.1:
-                    continue
+        node_x = np.array([node.x for node in nodes], dtype=float)
+        node_y = np.array([node.y for node in nodes], dtype=float)
+        edges = self.ObstacleEdges(obstacles)
 
-                is_valid = True
-                for obstacle in obstacles:
-                    if not self.is_edge_valid(target_node, node, obstacle):
-                        is_valid = False
-                        break
-                if is_valid:
-                    road_map_info.append(node_id)
+        # edge validity is symmetric, only the upper triangle is checked
+        n_node = len(nodes)
+        is_valid = np.zeros((n_node, n_node), dtype=bool)
+        for i in range(n_node - 1):
+            ids = np.arange(i + 1, n_node)
+            ids = ids[np.hypot(node_x[ids] - node_x[i],
+                               node_y[ids] - node_y[i]) > 0.1]
+            is_valid[i, ids] = edges.check_segments_free(
+                node_x[i], node_y[i], node_x[ids], node_y[ids])
+        is_valid |= is_valid.T
 
-            road_map_info_list.append(road_map_info)
+        road_map_info_list = [np.flatnonzero(valid).tolist()
+                              for valid in is_valid]
 
         return road_map_info_list
 
     @staticmethod
     def is_edge_valid(target_node, node, obstacle):
 
-        for i in range(len(obstacle.x_list) - 1):
-            p1 = Geometry.Point(target_node.x, target_node.y)
-            p2 = Geometry.Point(node.x, node.y)
-            p3 = Geometry.Point(obstacle.x_list[i], obstacle.y_list[i])
-            p4 = Geometry.Point(obstacle.x_list[i + 1], obstacle.y_list[i + 1])
-
-            if Geometry.is_seg_intersect(p1, p2, p3, p4):
-                return False
-
-        return True
+        edges = VisibilityRoadMap.ObstacleEdges([obstacle])
+
+        return bool(edges.check_segments_free(target_node.x, target_node.y,
+                                              np.array([node.x]),
+                                              np.array([node.y]))[0])
+
+    class ObstacleEdges:
+        """
+        Edges of all obstacles as arrays with a uniform grid index
+
+        Each edge is registered in the grid cells overlapped by its
+        bounding box inflated by half of the sampling step. Any point of a
+        segment sampled with this step is then close enough to a sample,
+        so the edges in the cells of the samples include all edges which
+        can intersect the segment.
+        """
+
+        def __init__(self, obstacles):
+            x1, y1, x2, y2 = [], [], [], []
+            for obstacle in obstacles:
+                x1.extend(obstacle.x_list[:-1])
+                y1.extend(obstacle.y_list[:-1])
+                x2.extend(obstacle.x_list[1:])
+                y2.extend(obstacle.y_list[1:])
+            self.x1 = np.array(x1, dtype=float)
+            self.y1 = np.array(y1, dtype=float)
+            self.x2 = np.array(x2, dtype=float)
+            self.y2 = np.array(y2, dtype=float)
+            self.n_edge = len(self.x1)
+            if self.n_edge == 0:
+                return
+
+            # grid resolution and sampling step, a few edges per cell
+            length = np.hypot(self.x2 - self.x1, self.y2 - self.y1)
+            area = np.ptp(np.concatenate([self.x1, self.x2])) * \
+                np.ptp(np.concatenate([self.y1, self.y2]))
+            self.step = max(float(np.median(length)),
+                            float(np.sqrt(area / self.n_edge)), 1e-3)
+            margin = 0.6 * self.step
+            self.min_x = min(self.x1.min(), self.x2.min()) - margin
+            self.min_y = min(self.y1.min(), self.y2.min()) - margin
+            self.x_width = int((max(self.x1.max(), self.x2.max()) + margin -
+                                self.min_x) // self.step) + 1
+            self.y_width = int((max(self.y1.max(), self.y2.max()) + margin -
+                                self.min_y) // self.step) + 1
+
+            # register edges to the cells
+            ix_min, iy_min = self.calc_xy_index(
+                np.minimum(self.x1, self.x2) - margin,
+                np.minimum(self.y1, self.y2) - margin)
+            ix_max, iy_max = self.calc_xy_index(
+                np.maximum(self.x1, self.x2) + margin,
+                np.maximum(self.y1, self.y2) + margin)
+            nx = ix_max - ix_min + 1
+            ny = iy_max - iy_min + 1
+            edge_ids = np.repeat(np.arange(self.n_edge), nx * ny)
+            local_ids = np.arange(len(edge_ids)) - np.repeat(
+                np.cumsum(nx * ny) - nx * ny, nx * ny)
+            cell_ids = (ix_min[edge_ids] + local_ids % nx[edge_ids]) + \
+                (iy_min[edge_ids] + local_ids // nx[edge_ids]) * self.x_width
+
+            order = np.argsort(cell_ids, kind="stable")
+            self.cell_ids = cell_ids[order]
+            self.cell_edge_ids = edge_ids[order]
+
+        def calc_xy_index(self, x, y):
+            return ((x - self.min_x) // self.step).astype(int), \
+                   ((y - self.min_y) // self.step).astype(int)
+
+        def check_segments_free(self, sx, sy, gx, gy):
+            """
+            check segments from (sx, sy) to each (gx, gy) do not
+            intersect with any edge
+
+            The segments are sampled from (sx, sy) in blocks of growing
+            size, and a segment is dropped once it hits an edge, so the
+            blocked segments are resolved close to (sx, sy).
+
+            :return: bool array for each segment
+            """
+            gx, gy = np.asarray(gx, dtype=float), np.asarray(gy, dtype=float)
+            is_free = np.ones(len(gx), dtype=bool)
+            if self.n_edge == 0:
+                return is_free
+
+            n_sample = np.ceil(np.hypot(gx - sx, gy - sy) /
+                               self.step).astype(int) + 1
+            seg_ids = np.arange(len(gx))
+            sample_start, block = 0, FIRST_SAMPLE_BLOCK
+            while len(seg_ids) > 0:
+                # samples in this block
+                n = np.clip(n_sample[seg_ids] - sample_start, 0, block)
+                ids = np.repeat(seg_ids, n)
+                k = sample_start + np.arange(len(ids)) - np.repeat(
+                    np.cumsum(n) - n, n)
+                # a zero length segment has its only sample at t = 0
+                t = k / np.maximum(n_sample[ids] - 1, 1)
+                ix, iy = self.calc_xy_index(sx + t * (gx[ids] - sx),
+                                            sy + t * (gy[ids] - sy))
+                is_in = (0 <= ix) & (ix < self.x_width) & \
+                        (0 <= iy) & (iy < self.y_width)
+                n_cell = self.x_width * self.y_width
+                keys = np.unique(ids[is_in] * n_cell +
+                                 ix[is_in] + iy[is_in] * self.x_width)
+                ids, cells = keys // n_cell, keys % n_cell
+
+                # candidate edges in the cells
+                starts = np.searchsorted(self.cell_ids, cells, "left")
+                counts = np.searchsorted(self.cell_ids, cells, "right") - \
+                    starts
+                pair_seg = np.repeat(ids, counts)
+                pair_edge = self.cell_edge_ids[
+                    np.repeat(starts - np.cumsum(counts) + counts, counts) +
+                    np.arange(len(pair_seg))]
+
+                is_hit = Geometry.is_seg_intersect_array(
+                    sx, sy, gx[pair_seg], gy[pair_seg],
+                    self.x1[pair_edge], self.y1[pair_edge],
+                    self.x2[pair_edge], self.y2[pair_edge])
+                is_free[pair_seg[is_hit]] = False
+
+                sample_start += block
+                block *= 2
+                seg_ids = seg_ids[is_free[seg_ids] &
+                                  (n_sample[seg_ids] > sample_start)]
+
+            return is_free
 
     def calc_offset_xy(self, px, py, x, y, nx, ny):
         p_vec = math.atan2(y - py, x - px)
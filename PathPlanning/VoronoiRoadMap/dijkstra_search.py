@@ -6,8 +6,8 @@ author: Atsushi Sakai (@Atsushi_twi)
 
 """
 
+import heapq
 import matplotlib.pyplot as plt
-import math
 import numpy as np
 
 
@@ -28,6 +28,37 @@ class DijkstraSearch:
             return str(self.x) + "," + str(self.y) + "," + str(
                 self.cost) + "," + str(self.parent)
 
+    class RoadMap:
+        """
+        Road map in compressed sparse row (CSR) form
+
+        The edges of node i are indices[indptr[i]:indptr[i + 1]] and
+        their lengths are in the same slice of lengths.
+        """
+
+        def __init__(self, node_x, node_y, edge_ids_list):
+            self.node_x = np.array(node_x, dtype=float)
+            self.node_y = np.array(node_y, dtype=float)
+            n_edges = [len(edge_ids) for edge_ids in edge_ids_list]
+            self.indptr = np.concatenate(([0], np.cumsum(n_edges))).astype(
+                int)
+            self.indices = np.array(
+                [n_id for edge_ids in edge_ids_list for n_id in edge_ids],
+                dtype=int)
+            from_ids = np.repeat(np.arange(len(edge_ids_list)), n_edges)
+            self.lengths = np.hypot(
+                self.node_x[self.indices] - self.node_x[from_ids],
+                self.node_y[self.indices] - self.node_y[from_ids])
+
+        def find_id(self, x, y):
+            """
+            index of the node at (x, y), None if there is no such node
+            """
+            dist = np.hypot(self.node_x - x, self.node_y - y)
+            if len(dist) == 0 or dist.min() > 0.1:
+                return None
+            return int(np.argmin(dist))
+
     def __init__(self, show_animation):
         self.show_animation = show_animation
 
@@ -35,106 +66,95 @@ class DijkstraSearch:
         """
         Search shortest path
 
-        s_x: start x positions [m]
-        s_y: start y positions [m]
-        gx: goal x position [m]
+        sx: start x position [m]
+        sy: start y position [m]
         gx: goal x position [m]
+        gy: goal y position [m]
         node_x: node x position
         node_y: node y position
         edge_ids_list: edge_list each item includes a list of edge ids
         """
+        road_map = self.RoadMap(node_x, node_y, edge_ids_list)
 
-        start_node = self.Node(sx, sy, 0.0, -1)
-        goal_node = self.Node(gx, gy, 0.0, -1)
-        current_node = None
+        return self.search_road_map(sx, sy, gx, gy, road_map)
 
-        open_set, close_set = dict(), dict()
-        open_set[self.find_id(node_x, node_y, start_node)] = start_node
-
-        while True:
-            if self.has_node_in_set(close_set, goal_node):
-                print("goal is found!")
-                goal_node.parent = current_node.parent
-                goal_node.cost = current_node.cost
-                break
-            elif not open_set:
-                print("Cannot find path")
-                break
+    def search_road_map(self, sx, sy, gx, gy, road_map):
+        """
+        Search shortest path on a RoadMap, which can be shared
+        by many searches on the same map
 
-            current_id = min(open_set, key=lambda o: open_set[o].cost)
-            current_node = open_set[current_id]
+        sx: start x position [m]
+        sy: start y position [m]
+        gx: goal x position [m]
+        gy: goal y position [m]
+        road_map: RoadMap object
+        """
+        start_id = road_map.find_id(sx, sy)
+        goal_id = road_map.find_id(gx, gy)
+        if start_id is None or goal_id is None:
+            print("Cannot find path")
+            return [], []
+
+        indptr = road_map.indptr.tolist()
+        indices = road_map.indices.tolist()
+        lengths = road_map.lengths.tolist()
+        n_node = len(indptr) - 1
+
+        cost = [float("inf")] * n_node
+        parent = [-1] * n_node
+        is_closed = [False] * n_node
+        n_closed = 0
+        cost[start_id] = 0.0
+        open_heap = [(0.0, start_id)]
+
+        while open_heap:
+            current_cost, current_id = heapq.heappop(open_heap)
+            if is_closed[current_id]:
+                continue
 
             # show graph
-            if self.show_animation and len(
-                    close_set.keys()) % 2 == 0:  # pragma: no cover
-                plt.plot(current_node.x, current_node.y, "xg")
+            if self.show_animation and n_closed % 2 == 0:  # pragma: no cover
+                plt.plot(road_map.node_x[current_id],
+                         road_map.node_y[current_id], "xg")
                 # for stopping simulation with the esc key.
                 plt.gcf().canvas.mpl_connect(
                     'key_release_event',
                     lambda event: [exit(0) if event.key == 'escape' else None])
                 plt.pause(0.1)
 
-            # Remove the item from the open set
-            del open_set[current_id]
             # Add it to the closed set
-            close_set[current_id] = current_node
-
-            # expand search grid based on motion model
-            for i in range(len(edge_ids_list[current_id])):
-                n_id = edge_ids_list[current_id][i]
-                dx = node_x[n_id] - current_node.x
-                dy = node_y[n_id] - current_node.y
-                d = math.hypot(dx, dy)
-                node = self.Node(node_x[n_id], node_y[n_id],
-                                 current_node.cost + d, current_id)
-
-                if n_id in close_set:
+            is_closed[current_id] = True
+            n_closed += 1
+            if current_id == goal_id:
+                print("goal is found!")
+                break
+
+            # expand search grid based on the road map
+            for i in range(indptr[current_id], indptr[current_id + 1]):
+                n_id = indices[i]
+                if is_closed[n_id]:
                     continue
-                # Otherwise if it is already in the open set
-                if n_id in open_set:
-                    if open_set[n_id].cost > node.cost:
-                        open_set[n_id] = node
-                else:
-                    open_set[n_id] = node
+                new_cost = current_cost + lengths[i]
+                if new_cost < cost[n_id]:
+                    cost[n_id] = new_cost
+                    parent[n_id] = current_id
+                    heapq.heappush(open_heap, (new_cost, n_id))
+        else:
+            print("Cannot find path")
+            return [], []
 
         # generate final course
-        rx, ry = self.generate_final_path(close_set, goal_node)
+        rx, ry = self.generate_final_path(road_map, parent, goal_id)
 
         return rx, ry
 
     @staticmethod
-    def generate_final_path(close_set, goal_node):
-        rx, ry = [goal_node.x], [goal_node.y]
-        parent = goal_node.parent
-        while parent != -1:
-            n = close_set[parent]
-            rx.append(n.x)
-            ry.append(n.y)
-            parent = n.parent
+    def generate_final_path(road_map, parent, goal_id):
+        rx, ry = [], []
+        n_id = goal_id
+        while n_id != -1:
+            rx.append(float(road_map.node_x[n_id]))
+            ry.append(float(road_map.node_y[n_id]))
+            n_id = parent[n_id]
         rx, ry = rx[::-1], ry[::-1]  # reverse it
         return rx, ry
-
-    def has_node_in_set(self, target_set, node):
-        for key in target_set:
-            if self.is_same_node(target_set[key], node):
-                return True
-        return False
-
-    def find_id(self, node_x_list, node_y_list, target_node):
-        for i, _ in enumerate(node_x_list):
-            if self.is_same_node_with_xy(node_x_list[i], node_y_list[i],
-                                         target_node):
-                return i
-        return None
-
-    @staticmethod
-    def is_same_node_with_xy(node_x, node_y, node_b):
-        dist = np.hypot(node_x - node_b.x,
-                        node_y - node_b.y)
-        return dist <= 0.1
-
-    @staticmethod
-    def is_same_node(node_a, node_b):
-        dist = np.hypot(node_a.x - node_b.x,
-                        node_b.y - node_b.y)
-        return dist <= 0.1
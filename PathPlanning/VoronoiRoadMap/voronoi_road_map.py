@@ -22,80 +22,198 @@ class VoronoiRoadMapPlanner:
         self.N_KNN = 10  # number of edge from one sampled point
         self.MAX_EDGE_LEN = 30.0  # [m] Maximum edge length
 
-    def planning(self, sx, sy, gx, gy, ox, oy, robot_radius):
-        obstacle_tree = cKDTree(np.vstack((ox, oy)).T)
+        # road maps between voronoi vertices, per obstacle map
+        self.road_map_cache = {}
 
-        sample_x, sample_y = self.voronoi_sampling(sx, sy, gx, gy, ox, oy)
+    def planning(self, sx, sy, gx, gy, ox, oy, robot_radius):
+        vertex_road_map = self.get_vertex_road_map(sx, sy, gx, gy, ox, oy,
+                                                   robot_radius)
+        sample_x = vertex_road_map["x"] + [sx, gx]
+        sample_y = vertex_road_map["y"] + [sy, gy]
         if show_animation:  # pragma: no cover
             plt.plot(sample_x, sample_y, ".b")
 
-        road_map_info = self.generate_road_map_info(
-            sample_x, sample_y, robot_radius, obstacle_tree)
+        road_map_info = self.connect_start_goal(
+            sample_x, sample_y, robot_radius, vertex_road_map)
 
         rx, ry = DijkstraSearch(show_animation).search(sx, sy, gx, gy,
                                                        sample_x, sample_y,
                                                        road_map_info)
         return rx, ry
 
-    def is_collision(self, sx, sy, gx, gy, rr, obstacle_kd_tree):
-        x = sx
-        y = sy
-        dx = gx - sx
-        dy = gy - sy
-        yaw = math.atan2(gy - sy, gx - sx)
-        d = math.hypot(dx, dy)
+    def get_vertex_road_map(self, sx, sy, gx, gy, ox, oy, robot_radius):
+        """
+        Road map between the voronoi vertices of the obstacles. It does
+        not depend on the start and the goal, so it is built once per
+        obstacle map and robot radius.
+        """
+        key = (np.array(ox, dtype=float).tobytes(),
+               np.array(oy, dtype=float).tobytes(), robot_radius,
+               self.N_KNN, self.MAX_EDGE_LEN)
+        if key not in self.road_map_cache:
+            obstacle_tree = cKDTree(np.vstack((ox, oy)).T)
+            sample_x, sample_y = self.voronoi_sampling(sx, sy, gx, gy,
+                                                       ox, oy)
+            vertex_x, vertex_y = sample_x[:-2], sample_y[:-2]
+            road_map = self.generate_road_map_info(
+                vertex_x, vertex_y, robot_radius, obstacle_tree)
+
+            # length of the longest edge of the nodes with N_KNN edges,
+            # a new node has to be closer than it to get an edge
+            max_edge_len = np.full(len(road_map), np.inf)
+            for i, edge_ids in enumerate(road_map):
+                if len(edge_ids) >= self.N_KNN:
+                    max_edge_len[i] = math.hypot(
+                        vertex_x[edge_ids[-1]] - vertex_x[i],
+                        vertex_y[edge_ids[-1]] - vertex_y[i])
+
+            self.road_map_cache[key] = {
+                "x": vertex_x, "y": vertex_y, "road_map": road_map,
+                "max_edge_len": max_edge_len, "obstacle_tree": obstacle_tree}
+
+        return self.road_map_cache[key]
+
+    def connect_start_goal(self, node_x, node_y, rr, vertex_road_map):
+        """
+        Add the start and the goal (the last two nodes) to a vertex
+        road map, the edges are the same as the ones of a road map
+        generated with all the nodes
 
-        if d >= self.MAX_EDGE_LEN:
-            return True
+        node_x: [m] x positions of vertexes, start and goal
+        node_y: [m] y positions of vertexes, start and goal
+        rr: Robot Radius[m]
+        vertex_road_map: road map of the vertexes
+        """
+        obstacle_tree = vertex_road_map["obstacle_tree"]
+        node_x = np.array(node_x, dtype=float)
+        node_y = np.array(node_y, dtype=float)
+        n_vertex = len(node_x) - 2
+        new_ids = np.array([n_vertex, n_vertex + 1])
+
+        # edges from the start and the goal
+        road_map = list(vertex_road_map["road_map"])
+        for i in new_ids:
+            to_ids = np.delete(np.arange(len(node_x)), i)
+            d = np.hypot(node_x[to_ids] - node_x[i],
+                         node_y[to_ids] - node_y[i])
+            to_ids = to_ids[np.argsort(d, kind="stable")]
+            is_collision = self.check_collisions(
+                np.full(len(to_ids), node_x[i]), np.full(len(to_ids),
+                                                         node_y[i]),
+                node_x[to_ids], node_y[to_ids], rr, obstacle_tree)
+            road_map.append(to_ids[~is_collision][:self.N_KNN].tolist())
+
+        # edges from the vertexes to the start and the goal
+        from_ids, to_ids = np.meshgrid(np.arange(n_vertex), new_ids,
+                                       indexing="ij")
+        from_ids, to_ids = from_ids.ravel(), to_ids.ravel()
+        d = np.hypot(node_x[to_ids] - node_x[from_ids],
+                     node_y[to_ids] - node_y[from_ids])
+        is_candidate = d < vertex_road_map["max_edge_len"][from_ids]
+        from_ids, to_ids = from_ids[is_candidate], to_ids[is_candidate]
+        is_collision = self.check_collisions(
+            node_x[from_ids], node_y[from_ids],
+            node_x[to_ids], node_y[to_ids], rr, obstacle_tree)
+        for i, n_id in zip(from_ids[~is_collision], to_ids[~is_collision]):
+            edge_ids = road_map[i] + [n_id]
+            edge_ids.sort(key=lambda e: math.hypot(node_x[e] - node_x[i],
+                                                   node_y[e] - node_y[i]))
+            road_map[i] = [int(e) for e in edge_ids[:self.N_KNN]]
 
-        D = rr
-        n_step = round(d / D)
+        return road_map
 
-        for i in range(n_step):
-            dist, _ = obstacle_kd_tree.query([x, y])
-            if dist <= rr:
-                return True  # collision
-            x += D * math.cos(yaw)
-            y += D * math.sin(yaw)
+    def is_collision(self, sx, sy, gx, gy, rr, obstacle_kd_tree):
+        return bool(self.check_collisions([sx], [sy], [gx], [gy], rr,
+                                          obstacle_kd_tree)[0])
 
-        # goal point check
-        dist, _ = obstacle_kd_tree.query([gx, gy])
-        if dist <= rr:
-            return True  # collision
+    def check_collisions(self, sx, sy, gx, gy, rr, obstacle_kd_tree):
+        """
+        Collision check of many edges. The points sampled along all the
+        edges are checked with a single KD-tree query.
 
-        return False  # OK
+        sx, sy: [m] start positions of the edges
+        gx, gy: [m] goal positions of the edges
+        rr: Robot Radius[m]
+        obstacle_kd_tree: KDTree object of obstacles
+        """
+        sx, sy = np.asarray(sx, dtype=float), np.asarray(sy, dtype=float)
+        gx, gy = np.asarray(gx, dtype=float), np.asarray(gy, dtype=float)
+        dx, dy = gx - sx, gy - sy
+        yaw = np.arctan2(dy, dx)
+        d = np.hypot(dx, dy)
+        is_too_long = d >= self.MAX_EDGE_LEN
+
+        # points every rr from the start, plus the goal point
+        n_step = np.where(is_too_long, 0, np.round(d / rr)).astype(int)
+        n_point = n_step + 1
+        edge_ids = np.repeat(np.arange(len(d)), n_point)
+        step = np.arange(n_point.sum()) - np.repeat(
+            np.cumsum(n_point) - n_point, n_point)
+        is_goal = step == n_step[edge_ids]
+        x = np.where(is_goal, gx[edge_ids],
+                     sx[edge_ids] + step * rr * np.cos(yaw[edge_ids]))
+        y = np.where(is_goal, gy[edge_ids],
+                     sy[edge_ids] + step * rr * np.sin(yaw[edge_ids]))
+
+        dist, _ = obstacle_kd_tree.query(np.vstack((x, y)).T)
+        n_hit = np.bincount(edge_ids, weights=dist <= rr, minlength=len(d))
+
+        return is_too_long | (n_hit > 0)
 
     def generate_road_map_info(self, node_x, node_y, rr, obstacle_tree):
         """
         Road map generation
 
+        Candidate edges of every node are checked nearest first, in
+        rounds of N_KNN edges batched over all the nodes, until every
+        node has N_KNN collision free edges or no candidate left.
+
         node_x: [m] x positions of sampled points
         node_y: [m] y positions of sampled points
         rr: Robot Radius[m]
         obstacle_tree: KDTree object of obstacles
         """
 
-        road_map = []
+        node_x = np.array(node_x, dtype=float)
+        node_y = np.array(node_y, dtype=float)
         n_sample = len(node_x)
         node_tree = cKDTree(np.vstack((node_x, node_y)).T)
 
-        for (i, ix, iy) in zip(range(n_sample), node_x, node_y):
-
-            dists, indexes = node_tree.query([ix, iy], k=n_sample)
-
-            edge_id = []
-
-            for ii in range(1, len(indexes)):
-                nx = node_x[indexes[ii]]
-                ny = node_y[indexes[ii]]
-
-                if not self.is_collision(ix, iy, nx, ny, rr, obstacle_tree):
-                    edge_id.append(indexes[ii])
-
-                if len(edge_id) >= self.N_KNN:
-                    break
-
-            road_map.append(edge_id)
+        # candidate edges, grouped by node and sorted by length
+        pairs = node_tree.query_pairs(self.MAX_EDGE_LEN, output_type="ndarray")
+        from_ids = np.concatenate((pairs[:, 0], pairs[:, 1]))
+        to_ids = np.concatenate((pairs[:, 1], pairs[:, 0]))
+        d = np.hypot(node_x[to_ids] - node_x[from_ids],
+                     node_y[to_ids] - node_y[from_ids])
+        order = np.lexsort((d, from_ids))
+        from_ids, to_ids = from_ids[order], to_ids[order]
+        group_end = np.searchsorted(from_ids, np.arange(n_sample),
+                                    side="right")
+        next_edge = np.searchsorted(from_ids, np.arange(n_sample))
+
+        is_valid = np.zeros(len(from_ids), dtype=bool)
+        n_valid = np.zeros(n_sample, dtype=int)
+        while True:
+            is_active = (n_valid < self.N_KNN) & (next_edge < group_end)
+            if not is_active.any():
+                break
+            edges = next_edge[is_active, None] + np.arange(self.N_KNN)
+            edges = edges[edges < group_end[is_active, None]]
+            is_valid[edges] = ~self.check_collisions(
+                node_x[from_ids[edges]], node_y[from_ids[edges]],
+                node_x[to_ids[edges]], node_y[to_ids[edges]],
+                rr, obstacle_tree)
+            n_valid = np.bincount(from_ids[is_valid], minlength=n_sample)
+            next_edge[is_active] += self.N_KNN
+
+        # keep the N_KNN nearest collision free edges of every node
+        from_ids, to_ids = from_ids[is_valid], to_ids[is_valid]
+        rank = np.arange(len(from_ids)) - np.searchsorted(from_ids, from_ids)
+        from_ids, to_ids = (from_ids[rank < self.N_KNN],
+                            to_ids[rank < self.N_KNN])
+        split = np.searchsorted(from_ids, np.arange(1, n_sample))
+        road_map = [edge_ids.tolist()
+                    for edge_ids in np.split(to_ids, split)]
 
         #  plot_road_map(road_map, sample_x, sample_y)
 
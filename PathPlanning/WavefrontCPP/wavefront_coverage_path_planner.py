@@ -7,8 +7,10 @@ paper: Planning paths of complete coverage of an unstructured environment
 link: http://pinkwink.kr/attachment/cfile3.uf@1354654A4E8945BD13FE77.pdf
 """
 
+import heapq
 import os
 import sys
+from collections import deque
 
 import matplotlib.pyplot as plt
 import numpy as np
@@ -47,8 +49,6 @@ def transform(
     else:
         sys.exit('Unsupported distance type.')
 
-    transform_matrix = float('inf') * np.ones_like(grid_map, dtype=np.float)
-    transform_matrix[src[0], src[1]] = 0
     if transform_type == 'distance':
         eT = np.zeros_like(grid_map)
     elif transform_type == 'path':
@@ -56,41 +56,79 @@ def transform(
     else:
         sys.exit('Unsupported transform type.')
 
-    # set obstacle transform_matrix value to infinity
-    for i in range(n_rows):
-        for j in range(n_cols):
-            if grid_map[i][j] == 1.0:
-                transform_matrix[i][j] = float('inf')
-    is_visited = np.zeros_like(transform_matrix, dtype=bool)
-    is_visited[src[0], src[1]] = True
-    traversal_queue = [src]
-    calculated = [(src[0] - 1) * n_cols + src[1]]
+    # work on a flat grid padded with an obstacle border,
+    # so that neighbors never need a bound check
+    n_pad_cols = n_cols + 2
+    is_free = np.zeros((n_rows + 2, n_pad_cols), dtype=bool)
+    is_free[1:-1, 1:-1] = np.logical_not(grid_map)
+    is_free = is_free.ravel().tolist()
+    step_cost = np.zeros((n_rows + 2, n_pad_cols))
+    step_cost[1:-1, 1:-1] = alpha * eT
+    step_cost = step_cost.ravel().tolist()
+    offsets = [inc[0] * n_pad_cols + inc[1] for inc in inc_order]
+
+    src_index = (src[0] + 1) * n_pad_cols + src[1] + 1
+    distance = [float('inf')] * len(is_free)
+    distance[src_index] = 0.0
+
+    if transform_type == 'distance' and distance_type == 'chessboard':
+        _breadth_first_transform(distance, is_free, offsets, src_index)
+    else:
+        _dijkstra_transform(distance, is_free, offsets, cost, step_cost,
+                            src_index)
 
-    def is_valid_neighbor(g_i, g_j):
-        return 0 <= g_i < n_rows and 0 <= g_j < n_cols \
-               and not grid_map[g_i][g_j]
+    transform_matrix = np.array(distance).reshape(n_rows + 2, n_pad_cols)
+    transform_matrix = transform_matrix[1:-1, 1:-1].copy()
 
-    while traversal_queue:
-        i, j = traversal_queue.pop(0)
-        for k, inc in enumerate(inc_order):
-            ni = i + inc[0]
-            nj = j + inc[1]
-            if is_valid_neighbor(ni, nj):
-                is_visited[i][j] = True
-
-                # update transform_matrix
-                transform_matrix[i][j] = min(
-                    transform_matrix[i][j],
-                    transform_matrix[ni][nj] + cost[k] + alpha * eT[ni][nj])
-
-                if not is_visited[ni][nj] \
-                        and ((ni - 1) * n_cols + nj) not in calculated:
-                    traversal_queue.append((ni, nj))
-                    calculated.append((ni - 1) * n_cols + nj)
+    # set obstacle transform_matrix value to infinity
+    transform_matrix[grid_map == 1.0] = float('inf')
 
     return transform_matrix
 
 
+def _breadth_first_transform(distance, is_free, offsets, src_index):
+    """
+    unit cost wavefront: every cell is finalized when it is first reached
+    """
+    is_visited = [False] * len(is_free)
+    is_visited[src_index] = True
+    traversal_queue = deque([src_index])
+
+    while traversal_queue:
+        index = traversal_queue.popleft()
+        d = distance[index] + 1
+        for offset in offsets:
+            n_index = index + offset
+            if is_free[n_index] and not is_visited[n_index]:
+                is_visited[n_index] = True
+                distance[n_index] = d
+                traversal_queue.append(n_index)
+
+
+def _dijkstra_transform(distance, is_free, offsets, cost, step_cost,
+                        src_index):
+    """
+    weighted wavefront: cells are finalized in increasing transform order,
+    moving from a cell costs its step cost plus its weighted obstacle
+    transform value
+    """
+    is_visited = [False] * len(is_free)
+    open_heap = [(0.0, src_index)]
+
+    while open_heap:
+        d, index = heapq.heappop(open_heap)
+        if is_visited[index]:
+            continue
+        is_visited[index] = True
+        d += step_cost[index]
+        for offset, c in zip(offsets, cost):
+            n_index = index + offset
+            if is_free[n_index] and not is_visited[n_index] \
+                    and d + c < distance[n_index]:
+                distance[n_index] = d + c
+                heapq.heappush(open_heap, (d + c, n_index))
+
+
 def get_search_order_increment(start, goal):
     if start[0] >= goal[0] and start[1] >= goal[1]:
         order = [[1, 0], [0, 1], [-1, 0], [0, -1],
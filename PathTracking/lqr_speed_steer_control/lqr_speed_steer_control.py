@@ -6,16 +6,19 @@ author Atsushi Sakai (@Atsushi_twi)
 
 """
 import math
+import os
 import sys
 
 import matplotlib.pyplot as plt
 import numpy as np
-import scipy.linalg as la
 
 sys.path.append("../../PathPlanning/CubicSpline/")
+sys.path.append(os.path.dirname(os.path.abspath(__file__))
+                + "/../lqr_steer_control/")
 
 try:
     import cubic_spline_planner
+    from lqr_steer_control import get_gain_schedule
 except ImportError:
     raise
 
@@ -59,52 +62,7 @@ def pi_2_pi(angle):
     return (angle + math.pi) % (2 * math.pi) - math.pi
 
 
-def solve_dare(A, B, Q, R):
-    """
-    solve a discrete time_Algebraic Riccati equation (DARE)
-    """
-    x = Q
-    x_next = Q
-    max_iter = 150
-    eps = 0.01
-
-    for i in range(max_iter):
-        x_next = A.T @ x @ A - A.T @ x @ B @ \
-                 la.inv(R + B.T @ x @ B) @ B.T @ x @ A + Q
-        if (abs(x_next - x)).max() < eps:
-            break
-        x = x_next
-
-    return x_next
-
-
-def dlqr(A, B, Q, R):
-    """Solve the discrete time lqr controller.
-    x[k+1] = A x[k] + B u[k]
-    cost = sum x[k].T*Q*x[k] + u[k].T*R*u[k]
-    # ref Bertsekas, p.151
-    """
-
-    # first, try to solve the ricatti equation
-    X = solve_dare(A, B, Q, R)
-
-    # compute the LQR gain
-    K = la.inv(B.T @ X @ B + R) @ (B.T @ X @ A)
-
-    eig_result = la.eig(A - B @ K)
-
-    return K, X, eig_result[0]
-
-
-def lqr_speed_steering_control(state, cx, cy, cyaw, ck, pe, pth_e, sp, Q, R):
-    ind, e = calc_nearest_index(state, cx, cy, cyaw)
-
-    tv = sp[ind]
-
-    k = ck[ind]
-    v = state.v
-    th_e = pi_2_pi(state.yaw - cyaw[ind])
-
+def get_system_model(v):
     # A = [1.0, dt, 0.0, 0.0, 0.0
     #      0.0, 0.0, v, 0.0, 0.0]
     #      0.0, 0.0, 1.0, dt, 0.0]
@@ -127,7 +85,23 @@ def lqr_speed_steering_control(state, cx, cy, cyaw, ck, pe, pth_e, sp, Q, R):
     B[3, 0] = v / L
     B[4, 1] = dt
 
-    K, _, _ = dlqr(A, B, Q, R)
+    return A, B
+
+
+def lqr_speed_steering_control(state, cx, cy, cyaw, ck, pe, pth_e, sp, Q, R,
+                               gain_schedule=None):
+    ind, e = calc_nearest_index(state, cx, cy, cyaw)
+
+    tv = sp[ind]
+
+    k = ck[ind]
+    v = state.v
+    th_e = pi_2_pi(state.yaw - cyaw[ind])
+
+    if gain_schedule is None:
+        gain_schedule = get_gain_schedule(Q, R,
+                                          system_model=get_system_model)
+    K = gain_schedule.get_gain(v)
 
     # state vector
     # x = [e, dot_e, th_e, dot_th_e, delta_v]
@@ -198,9 +172,13 @@ def do_simulation(cx, cy, cyaw, ck, speed_profile, goal):
 
     e, e_th = 0.0, 0.0
 
+    gain_schedule = get_gain_schedule(lqr_Q, lqr_R,
+                                      system_model=get_system_model)
+
     while T >= time:
         dl, target_ind, e, e_th, ai = lqr_speed_steering_control(
-            state, cx, cy, cyaw, ck, e, e_th, speed_profile, lqr_Q, lqr_R)
+            state, cx, cy, cyaw, ck, e, e_th, speed_profile, lqr_Q, lqr_R,
+            gain_schedule)
 
         state = update(state, ai, dl)
 
@@ -29,6 +29,10 @@ dt = 0.1  # time tick[s]
 L = 0.5  # Wheel base of the vehicle [m]
 max_steer = np.deg2rad(45.0)  # maximum steering angle[rad]
 
+# gain schedule parameter
+max_schedule_speed = 20.0  # speed range of the gain table [m/s]
+schedule_speed_resolution = 0.05  # speed grid resolution [m/s]
+
 show_animation = True
 #  show_animation = False
 
@@ -85,7 +89,19 @@ def solve_DARE(A, B, Q, R):
     return Xn
 
 
-def dlqr(A, B, Q, R):
+def solve_DARE_closed_form(A, B, Q, R):
+    """
+    solve a discrete time_Algebraic Riccati equation (DARE)
+    with the Schur method, falling back to the fixed-point iteration
+    when the system is not stabilizable (e.g. zero speed)
+    """
+    try:
+        return la.solve_discrete_are(A, B, Q, R)
+    except (ValueError, np.linalg.LinAlgError):
+        return solve_DARE(A, B, Q, R)
+
+
+def dlqr(A, B, Q, R, closed_form=False):
     """Solve the discrete time lqr controller.
     x[k+1] = A x[k] + B u[k]
     cost = sum x[k].T*Q*x[k] + u[k].T*R*u[k]
@@ -93,7 +109,10 @@ def dlqr(A, B, Q, R):
     """
 
     # first, try to solve the ricatti equation
-    X = solve_DARE(A, B, Q, R)
+    if closed_form:
+        X = solve_DARE_closed_form(A, B, Q, R)
+    else:
+        X = solve_DARE(A, B, Q, R)
 
     # compute the LQR gain
     K = la.inv(B.T @ X @ B + R) @ (B.T @ X @ A)
@@ -103,25 +122,97 @@ def dlqr(A, B, Q, R):
     return K, X, eigVals
 
 
-def lqr_steering_control(state, cx, cy, cyaw, ck, pe, pth_e):
-    ind, e = calc_nearest_index(state, cx, cy, cyaw)
-
-    k = ck[ind]
-    v = state.v
-    th_e = pi_2_pi(state.yaw - cyaw[ind])
-
+def get_system_model(v):
     A = np.zeros((4, 4))
     A[0, 0] = 1.0
     A[0, 1] = dt
     A[1, 2] = v
     A[2, 2] = 1.0
     A[2, 3] = dt
-    # print(A)
 
     B = np.zeros((4, 1))
     B[3, 0] = v / L
 
-    K, _, _ = dlqr(A, B, Q, R)
+    return A, B
+
+
+class GainSchedule:
+    """
+    LQR gain table over a speed grid
+
+    The error model only depends on the vehicle speed, so the DARE is
+    solved once per grid speed (the first time the speed is visited)
+    and the gain is linearly interpolated at run time.
+    system_model(v) returns the (A, B) matrices of the error model,
+    the lateral one of this module by default.
+    """
+
+    def __init__(self, Q, R, max_speed=max_schedule_speed,
+                 speed_resolution=schedule_speed_resolution,
+                 closed_form=True, system_model=None):
+        self.Q = Q
+        self.R = R
+        self.closed_form = closed_form
+        self.system_model = system_model or get_system_model
+        n_grid = int(round(2.0 * max_speed / speed_resolution)) + 1
+        self.speeds = np.linspace(-max_speed, max_speed, n_grid)
+        self.gains = [None] * n_grid
+
+    def calc_grid_gain(self, i):
+        if self.gains[i] is None:
+            A, B = self.system_model(self.speeds[i])
+            self.gains[i], _, _ = dlqr(A, B, self.Q, self.R,
+                                       self.closed_form)
+
+        return self.gains[i]
+
+    def precompute(self):
+        for i in range(len(self.speeds)):
+            self.calc_grid_gain(i)
+
+    def get_gain(self, v):
+        v = min(max(v, self.speeds[0]), self.speeds[-1])
+        i = min(int(np.searchsorted(self.speeds, v, side="right")) - 1,
+                len(self.speeds) - 2)
+        w = (v - self.speeds[i]) / (self.speeds[i + 1] - self.speeds[i])
+
+        return (1.0 - w) * self.calc_grid_gain(i) + \
+            w * self.calc_grid_gain(i + 1)
+
+
+_gain_schedule_cache = {}
+
+
+def get_gain_schedule(Q, R, max_speed=max_schedule_speed,
+                      speed_resolution=schedule_speed_resolution,
+                      closed_form=True, system_model=None):
+    """
+    return the gain schedule for the given weights and model, building
+    it only the first time they are seen. The model at unit speed is
+    part of the key, so changing dt or L gives a new schedule.
+    """
+    system_model = system_model or get_system_model
+    A, B = system_model(1.0)
+    key = (system_model, Q.tobytes(), R.tobytes(), A.tobytes(), B.tobytes(),
+           max_speed, speed_resolution, closed_form)
+    if key not in _gain_schedule_cache:
+        _gain_schedule_cache[key] = GainSchedule(
+            Q, R, max_speed, speed_resolution, closed_form, system_model)
+
+    return _gain_schedule_cache[key]
+
+
+def lqr_steering_control(state, cx, cy, cyaw, ck, pe, pth_e,
+                         gain_schedule=None):
+    ind, e = calc_nearest_index(state, cx, cy, cyaw)
+
+    k = ck[ind]
+    v = state.v
+    th_e = pi_2_pi(state.yaw - cyaw[ind])
+
+    if gain_schedule is None:
+        gain_schedule = get_gain_schedule(Q, R)
+    K = gain_schedule.get_gain(v)
 
     x = np.zeros((4, 1))
 
@@ -176,9 +267,11 @@ def closed_loop_prediction(cx, cy, cyaw, ck, speed_profile, goal):
 
     e, e_th = 0.0, 0.0
 
+    gain_schedule = get_gain_schedule(Q, R)
+
     while T >= time:
         dl, target_ind, e, e_th = lqr_steering_control(
-            state, cx, cy, cyaw, ck, e, e_th)
+            state, cx, cy, cyaw, ck, e, e_th, gain_schedule)
 
         ai = PIDControl(speed_profile[target_ind], state.v)
         state = update(state, ai, dl)
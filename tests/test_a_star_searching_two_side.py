@@ -20,8 +20,13 @@ class Test(TestCase):
         m.show_animation = False
         m.main(5000)  # increase obstacle number, block path
 
+    def test3(self):
+        m.show_animation = False
+        m.main(1500, map_size=600)  # larger map
+
 
 if __name__ == '__main__':
     test = Test()
     test.test1()
     test.test2()
+    test.test3()
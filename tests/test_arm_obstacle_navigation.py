@@ -0,0 +1,54 @@
+import os
+import sys
+from math import pi
+from unittest import TestCase
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__))
+                + "/../ArmNavigation/arm_obstacle_navigation/")
+
+try:
+    import arm_obstacle_navigation as m
+    import arm_obstacle_navigation_2 as m2
+except ImportError:
+    raise
+
+print(__file__)
+
+
+def get_occupancy_grid_with_loop(arm, obstacles):
+    # collision check of the links cell by cell
+    grid = np.zeros((m.M, m.M), dtype=int)
+    theta_list = [2 * i * pi / m.M for i in range(-m.M // 2, m.M // 2 + 1)]
+    for i in range(m.M):
+        for j in range(m.M):
+            arm.update_joints([theta_list[i], theta_list[j]])
+            points = arm.points
+            grid[i, j] = any(
+                m.detect_collision([points[k], points[k + 1]], obstacle)
+                for k in range(len(points) - 1) for obstacle in obstacles)
+    return grid
+
+
+class Test(TestCase):
+
+    def test_occupancy_grid(self):
+        for link_lengths, obstacles in [([1, 1], m.obstacles),
+                                        ([0.5, 1.5], m2.obstacles),
+                                        ([0.5, 0.7, 0.6], m.obstacles)]:
+            arm = m.NLinkArm(link_lengths, [0] * len(link_lengths))
+            np.testing.assert_array_equal(
+                m.get_occupancy_grid(arm, obstacles),
+                get_occupancy_grid_with_loop(arm, obstacles))
+
+    def test_shared_search(self):
+        self.assertIs(m2.astar_torus, m.astar_torus)
+        self.assertIs(m2.get_occupancy_grid, m.get_occupancy_grid)
+
+        # the shortest route wraps around the torus
+        grid = np.zeros((m.M, m.M), dtype=int)
+        grid[m.M - 1, 51] = 1
+        route = m2.astar_torus(grid, (1, 50), (m.M - 2, 51))
+        self.assertEqual(route, [(1, 50), (0, 50), (m.M - 1, 50),
+                                 (m.M - 2, 50), (m.M - 2, 51)])
@@ -2,6 +2,9 @@ from unittest import TestCase
 import sys
 import os
 import random
+
+import numpy as np
+
 sys.path.append(os.path.dirname(__file__) + "/../")
 try:
     from PathPlanning.BatchInformedRRTStar import batch_informed_rrtstar as m
@@ -19,6 +22,66 @@ class Test(TestCase):
         m.show_animation = False
         m.main(maxIter=10)
 
+    def assert_scores_consistent(self, planner):
+        for vid, parent in planner.nodes.items():
+            self.assertAlmostEqual(
+                planner.g_scores[vid], planner.g_scores[parent] +
+                planner.compute_distance_cost(parent, vid))
+
+    def test_rewire(self):
+        planner = m.BITStar(start=[0, 0], goal=[10, 0], obstacleList=[],
+                            randArea=[-2, 15], maxIter=1)
+        planner.setup_planning()
+
+        # a chain start -> a -> b -> c, and d next to the start
+        ids = {}
+        for name, coord in [("a", [0, 5]), ("b", [3, 5]), ("c", [6, 5]),
+                            ("d", [1, 1])]:
+            ids[name] = planner.tree.add_vertex(coord)
+        for parent, child in [(planner.startId, ids["a"]),
+                              (ids["a"], ids["b"]), (ids["b"], ids["c"]),
+                              (planner.startId, ids["d"])]:
+            planner.tree.add_edge(parent, child)
+            planner.nodes[child] = parent
+            planner.update_graph(child)
+        self.assert_scores_consistent(planner)
+        planner.push_edge_queue((ids["c"], planner.goalId))
+        g_c = planner.g_scores[ids["c"]]
+
+        # moving a under d changes the scores of all its descendants
+        planner.rewire(ids["d"], ids["a"])
+        self.assertEqual(planner.nodes[ids["a"]], ids["d"])
+        self.assertNotIn(ids["a"], planner.tree.vertices[planner.startId])
+        self.assert_scores_consistent(planner)
+        self.assertNotAlmostEqual(planner.g_scores[ids["c"]], g_c)
+        for vid in ids.values():
+            self.assertAlmostEqual(
+                planner.f_scores[vid], planner.g_scores[vid] +
+                planner.compute_heuristic_cost(vid, planner.goalId))
+
+        # the queued edge from c is on top of the heap with its new value
+        self.assertEqual(planner.best_in_edge_queue(),
+                         (ids["c"], planner.goalId))
+        self.assertAlmostEqual(
+            planner.best_edge_queue_value(),
+            planner.edge_queue_value((ids["c"], planner.goalId)))
+
+    def test_plan_queues(self):
+        np.random.seed(1)
+        random.seed(1)
+        planner = m.BITStar(start=[-1, 0], goal=[3, 8],
+                            obstacleList=[(5, 5, 0.5), (1, 5, 1), (3, 6, 1)],
+                            randArea=[-2, 15], maxIter=40)
+        planner.plan(animation=False)
+        self.assert_scores_consistent(planner)
+
+        # both edge indexes hold the queued edges
+        for index, key in [(planner.queued_edges_from, 0),
+                           (planner.queued_edges_to, 1)]:
+            edges = {(v, x) if key == 0 else (x, v)
+                     for v, targets in index.items() for x in targets}
+            self.assertEqual(edges, planner.edge_queue)
+
 
 if __name__ == '__main__':  # pragma: no cover
     test = Test()
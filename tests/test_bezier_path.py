@@ -1,6 +1,8 @@
 from unittest import TestCase
 
 import sys
+
+import numpy as np
 sys.path.append("./PathPlanning/BezierPath/")
 
 from PathPlanning.BezierPath import bezier_path as m
@@ -14,3 +16,13 @@ class Test(TestCase):
         m.show_animation = False
         m.main()
         m.main2()
+
+    def test2(self):
+        control_points = np.array([[5., 1.], [-2.78, 1.], [-11.5, -4.5],
+                                   [-6., -8.]])
+        w = m.bezier_derivatives_control_points(control_points, 2)
+        t = np.linspace(0, 1, 50)
+        expected = [m.curvature(*m.bezier(ti, w[1]), *m.bezier(ti, w[2]))
+                    for ti in t]
+        np.testing.assert_allclose(
+            m.calc_bezier_curvature(control_points, n_points=50), expected)
@@ -1,5 +1,7 @@
 from unittest import TestCase
 
+import numpy as np
+
 from Mapping.circle_fitting import circle_fitting as m
 
 print(__file__)
@@ -10,3 +12,26 @@ class Test(TestCase):
     def test1(self):
         m.show_animation = False
         m.main()
+
+    def test_batch_fitting(self):
+        theta = np.linspace(0.0, 2.0 * np.pi, 20, endpoint=False)
+        x = np.concatenate([1.0 + 2.0 * np.cos(theta), -5.0 + np.cos(theta)])
+        y = np.concatenate([3.0 + 2.0 * np.sin(theta), np.sin(theta)])
+        labels = np.repeat([0, 1], len(theta))
+
+        cxe, cye, re, error = m.circle_fitting_batch(x, y, labels)
+
+        np.testing.assert_allclose(cxe, [1.0, -5.0], atol=1e-6)
+        np.testing.assert_allclose(cye, [3.0, 0.0], atol=1e-6)
+        np.testing.assert_allclose(re, [2.0, 1.0], atol=1e-6)
+
+    def test_batch_fitting_with_collinear_cluster(self):
+        x = [0.0, 1.0, 2.0, 5.0, 6.0, 7.0, 6.0]
+        y = [0.0, 0.0, 0.0, 0.0, 1.0, 0.0, -1.0]
+        labels = [0, 0, 0, 1, 1, 1, 1]
+
+        cxe, cye, re, error = m.circle_fitting_batch(x, y, labels)
+
+        self.assertTrue(np.isnan(cxe[0]) and np.isnan(re[0]))
+        np.testing.assert_allclose([cxe[1], cye[1], re[1]], [6.0, 0.0, 1.0],
+                                   atol=1e-6)
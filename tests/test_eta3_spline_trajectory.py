@@ -0,0 +1,98 @@
+from unittest import TestCase
+import sys
+import os
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__))
+                + "/../PathPlanning/Eta3SplinePath/")
+sys.path.append(os.path.dirname(os.path.abspath(__file__))
+                + "/../PathPlanning/Eta3SplineTrajectory/")
+try:
+    import eta3_spline_trajectory as m
+    from eta3_spline_path import eta3_path_segment
+except ImportError:
+    raise
+
+print(__file__)
+
+
+def make_segments():
+    # lane-change curve and line segment of the demo path
+    return [eta3_path_segment(start_pose=[0, 0, 0], end_pose=[4, 1.5, 0],
+                              eta=[4.27, 4.27, 0, 0, 0, 0],
+                              kappa=[0, 0, 0, 0]),
+            eta3_path_segment(start_pose=[4, 1.5, 0], end_pose=[5.5, 1.5, 0],
+                              eta=[0.5, 0.5, 0, 0, 0, 0],
+                              kappa=[0, 0, 0, 0])]
+
+
+class Test(TestCase):
+
+    def test1(self):
+        m.show_animation = False
+        m.main()
+
+    def check_trajectory(self, traj):
+        # the arc length table matches the quad-integrated segment lengths
+        for seg_id, seg in enumerate(traj.segments):
+            for u in [0.1, 0.25, 0.5, 0.77, 1.0]:
+                s = np.interp(seg_id + u, traj.p_table, traj.s_table)
+                self.assertAlmostEqual(
+                    s, traj.cum_lengths[seg_id] + seg.f_length(u)[0],
+                    delta=1e-6)
+
+        # s(t) is monotone and ends at the path end at total_time
+        times = np.linspace(0, traj.total_time, 2001)
+        s, v, a = traj.calc_velocity_profile(times)
+        self.assertTrue(np.all(np.diff(s) >= 0.0))
+        self.assertAlmostEqual(s[0], 0.0)
+        self.assertAlmostEqual(v[0], traj.v0)
+        self.assertAlmostEqual(a[0], traj.a0)
+        self.assertAlmostEqual(s[-1], traj.total_length)
+        self.assertAlmostEqual(v[-1], 0.0)
+        self.assertLessEqual(v.max(), traj.max_vel + 1e-9)
+        end = traj.calc_traj_point(traj.total_time)
+        np.testing.assert_allclose(end[:3], traj.segments[-1].end_pose,
+                                   atol=1e-6)
+
+        # s, v and a are continuous across the sections of the profile,
+        # and v and a are the derivatives of s and v
+        t_start = np.cumsum(traj.times)[:-1]
+        t_start = t_start[t_start > 0.0]
+        before = traj.calc_velocity_profile(t_start - 1e-7)
+        after = traj.calc_velocity_profile(t_start + 1e-7)
+        for b, c in zip(before, after):
+            np.testing.assert_allclose(b, c, atol=1e-5)
+        dt = times[1] - times[0]
+        np.testing.assert_allclose(np.diff(s) / dt, (v[1:] + v[:-1]) / 2.0,
+                                   atol=1e-3)
+        np.testing.assert_allclose(np.diff(v) / dt, (a[1:] + a[:-1]) / 2.0,
+                                   atol=1e-2)
+
+        # calc_traj_point matches the columns of calc_traj_points
+        times = np.linspace(0, traj.total_time, 11)
+        states = traj.calc_traj_points(times)
+        for i, t in enumerate(times):
+            np.testing.assert_allclose(traj.calc_traj_point(t),
+                                       states[:, i])
+
+    def test_cruise(self):
+        traj = m.eta3_trajectory(make_segments(), max_vel=1.0,
+                                 max_accel=0.5, max_jerk=1.0)
+        self.assertGreater(traj.seg_lengths[3], 0.0)
+        self.check_trajectory(traj)
+
+    def test_initial_accel(self):
+        traj = m.eta3_trajectory(make_segments(), max_vel=1.0, v0=0.2,
+                                 a0=0.3, max_accel=0.5, max_jerk=1.0)
+        self.assertGreater(traj.seg_lengths[3], 0.0)
+        self.check_trajectory(traj)
+
+    def test_no_cruise(self):
+        # the max velocity is not reached on the path and is lowered
+        traj = m.eta3_trajectory(make_segments(), max_vel=10.0,
+                                 max_accel=0.5, max_jerk=1.0)
+        self.assertLess(traj.max_vel, 10.0)
+        self.assertAlmostEqual(traj.seg_lengths[3], 0.0)
+        self.check_trajectory(traj)
@@ -11,6 +11,35 @@ class Test(TestCase):
         flowfield.show_animation = False
         flowfield.main()
 
+    def test_shared_goal(self):
+        obs_dict = {}
+        for i in range(20):
+            for j in range(20):
+                obs_dict[(i, j)] = 'free'
+        flowfield.draw_vertical_line(0, 0, 20, [], [], obs_dict, 'obs')
+        flowfield.draw_vertical_line(18, 0, 20, [], [], obs_dict, 'obs')
+        flowfield.draw_horizontal_line(0, 0, 20, [], [], obs_dict, 'obs')
+        flowfield.draw_horizontal_line(0, 18, 20, [], [], obs_dict, 'obs')
+        flowfield.draw_vertical_line(8, 2, 12, [], [], obs_dict, 'obs')
+
+        flow_obj = flowfield.FlowField(obs_dict, 15, 5, 4, 5, 20, 20)
+        for start in [(4, 5), (3, 16), (15, 15)]:
+            path = flow_obj.get_path(*start)
+            self.assertEqual(path[0], start)
+            self.assertEqual(path[-1], (15, 5))
+            for (x, y) in path:
+                self.assertNotEqual(obs_dict[(x, y)], 'obs')
+
+    def test_unreachable_goal(self):
+        obs_dict = {}
+        for i in range(10):
+            for j in range(10):
+                obs_dict[(i, j)] = 'obs' if i == 5 else 'free'
+
+        flow_obj = flowfield.FlowField(obs_dict, 8, 5, 1, 1, 10, 10)
+        self.assertEqual(flow_obj.get_path(1, 1), [])
+        self.assertEqual(flow_obj.get_path(7, 2)[-1], (8, 5))
+
 
 if __name__ == '__main__':  # pragma: no cover
     test = Test()
@@ -1,5 +1,8 @@
 from unittest import TestCase
 
+import numpy as np
+from scipy.stats import norm
+
 from Mapping.gaussian_grid_map import gaussian_grid_map as m
 
 print(__file__)
@@ -10,3 +13,23 @@ class Test(TestCase):
     def test1(self):
         m.show_animation = False
         m.main()
+
+    def test_update_obstacles(self):
+        ox = [1.0, -2.0, 3.0, 0.5]
+        oy = [2.0, 1.0, -3.0, -0.5]
+        grid_map = m.GaussianGridMap(ox, oy, 0.5, 1.0)
+
+        ox[0], oy[0] = 2.5, 1.0
+        ox[3], oy[3] = 0.0, 0.5
+        self.assertTrue(grid_map.update_obstacles(ox, oy))
+
+        # likelihood of the nearest obstacle for every cell
+        d = np.hypot(grid_map.x[..., None] - np.array(ox),
+                     grid_map.y[..., None] - np.array(oy)).min(axis=-1)
+        np.testing.assert_allclose(grid_map.gmap,
+                                   1.0 - norm.cdf(d, 0.0, 1.0), atol=1e-12)
+
+        # an obstacle outside the map is refused
+        gmap = grid_map.gmap.copy()
+        self.assertFalse(grid_map.update_obstacles([20.0] + ox[1:], oy))
+        np.testing.assert_array_equal(grid_map.gmap, gmap)
@@ -2,6 +2,8 @@ import os
 import sys
 import unittest
 
+import numpy as np
+
 sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/../Mapping/grid_map_lib")
 try:
     from grid_map_lib import GridMap
@@ -31,7 +33,85 @@ class MyTestCase(unittest.TestCase):
 
         grid_map.set_value_from_polygon(ox, oy, 1.0, inside=False)
 
-        self.assertEqual(True, True)
+        # the grid centers of the first row are all outside of the polygon,
+        # the center of the map is inside
+        self.assertTrue(np.all(grid_map.data[0] == 1.0))
+        self.assertEqual(0.0, grid_map.get_value_from_xy_index(300, 145))
+        self.assertTrue(np.any(grid_map.data == 0.0))
+
+    def test_bulk_position_set(self):
+        grid_map = GridMap(100, 120, 0.5, 10.0, -0.5)
+
+        x_pos = [10.1, 11.1, 100.0]
+        y_pos = [-1.1, 0.1, 0.1]
+        flags = grid_map.set_values_from_xy_pos(x_pos, y_pos, 1.0)
+        values = grid_map.get_values_from_xy_pos(x_pos, y_pos)
+
+        self.assertEqual([True, True, False], list(flags))
+        self.assertEqual([1.0, 1.0], list(values[:2]))
+        self.assertEqual(
+            1.0, grid_map.get_value_from_xy_index(
+                *grid_map.get_xy_index_from_xy_pos(11.1, 0.1)))
+
+    def test_polygon_and_expand_against_loop(self):
+        # the grid centers are at 0.5, 1.5, ... 11.5 in x, 0.5 ... 8.5 in y
+        grid_map = GridMap(12, 9, 1.0, 6.0, 4.5)
+        # a vertical edge and an edge through grid centers, and the right
+        # hand column inside the polygon
+        pol_x = [2.5, 14.5, 14.5, 2.5]
+        pol_y = [0.5, 6.5, 8.2, 8.2]
+
+        x_pos, y_pos = np.meshgrid(np.arange(12) + 0.5, np.arange(9) + 0.5)
+        expected = [[check_inside_polygon_loop(x, y, pol_x + [pol_x[0]],
+                                               pol_y + [pol_y[0]])
+                     for x in np.arange(12) + 0.5]
+                    for y in np.arange(9) + 0.5]
+        np.testing.assert_array_equal(
+            GridMap.check_inside_polygon(x_pos, y_pos, pol_x + [pol_x[0]],
+                                         pol_y + [pol_y[0]]),
+            expected)
+        # the right hand column, and a center on the lower edge
+        self.assertTrue(expected[7][11])
+        self.assertTrue(expected[1][4])
+
+        grid_map.set_value_from_polygon(pol_x, pol_y, 1.0)
+        np.testing.assert_array_equal(grid_map.data, np.array(expected, float))
+
+        # occupied cells on the map borders, the right hand column included
+        for ix, iy in [(11, 0), (11, 4), (0, 2), (5, 0), (6, 8)]:
+            grid_map.set_value_from_xy_index(ix, iy, 1.0)
+        expected = expand_grid_loop(grid_map)
+        grid_map.expand_grid()
+        np.testing.assert_array_equal(grid_map.data, expected)
+
+
+def check_inside_polygon_loop(iox, ioy, x, y):
+    # ray crossing test of a single point
+    inside = False
+    for i1 in range(len(x) - 1):
+        i2 = i1 + 1
+        min_x, max_x = min(x[i1], x[i2]), max(x[i1], x[i2])
+        if not min_x < iox < max_x:
+            continue
+        tmp1 = (y[i2] - y[i1]) / (x[i2] - x[i1])
+        if (y[i1] + tmp1 * (iox - x[i1]) - ioy) > 0.0:
+            inside = not inside
+    return inside
+
+
+def expand_grid_loop(grid_map):
+    # dilation on the grid index, one occupied cell at a time
+    data = grid_map.data.copy()
+    for ix in range(grid_map.width):
+        for iy in range(grid_map.height):
+            if grid_map.data[iy, ix] < 1.0:
+                continue
+            for dx, dy in [(1, 0), (0, 1), (1, 1),
+                           (-1, 0), (0, -1), (-1, -1)]:
+                grid_ind = (iy + dy) * grid_map.width + ix + dx
+                if 0 <= grid_ind < grid_map.ndata:
+                    data.flat[grid_ind] = 1.0
+    return data
 
 
 if __name__ == '__main__':
@@ -1,6 +1,9 @@
 from unittest import TestCase
 import sys
 import os
+
+import numpy as np
+
 sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/../")
 sys.path.append(os.path.dirname(os.path.abspath(__file__))
                 + "/../PathPlanning/InformedRRTStar/")
@@ -18,6 +21,43 @@ class Test(TestCase):
         m.show_animation = False
         m.main()
 
+    def test_search_structures(self):
+        np.random.seed(1)
+        obstacle_list = [(5, 5, 0.5), (9, 6, 1), (7, 5, 1),
+                         (1, 5, 1), (3, 6, 1), (7, 9, 1)]
+        rrt = m.InformedRRTStar(start=[0, 0], goal=[5, 10],
+                                randArea=[-2, 15],
+                                obstacleList=obstacle_list, maxIter=2000)
+
+        # the best cost never increases while the tree grows
+        best_costs = []
+        update_best = rrt.update_best
+
+        def record_update_best(inds):
+            update_best(inds)
+            best_costs.append(rrt.get_best_cost())
+
+        rrt.update_best = record_update_best
+        path = rrt.informed_rrt_star_search(animation=False)
+        self.assertIsNotNone(path)
+        finite = [c for c in best_costs if c < float('inf')]
+        self.assertTrue(np.all(np.diff(finite) <= 1e-9))
+        self.assertAlmostEqual(rrt.get_path_len(path), finite[-1])
+
+        # the KD-tree with the brute force tail is the exact nearest node
+        self.assertLess(rrt.n_indexed, rrt.n_node)
+        xy = rrt.node_xy[:rrt.n_node]
+        for rnd in np.random.uniform(-2, 15, (200, 2)):
+            d2 = np.sum((xy - rnd) ** 2, axis=1)
+            self.assertEqual(d2[rrt.get_nearest_index(rnd)], d2.min())
+
+        # the costs along the tree match the edge lengths after rewiring
+        child = np.flatnonzero(rrt.node_parent[:rrt.n_node] >= 0)
+        parent = rrt.node_parent[child]
+        np.testing.assert_allclose(
+            rrt.node_cost[child],
+            rrt.node_cost[parent] + np.hypot(*(xy[child] - xy[parent]).T))
+
 
 if __name__ == '__main__':  # pragma: no cover
     test = Test()
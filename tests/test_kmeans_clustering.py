@@ -1,4 +1,7 @@
 from unittest import TestCase
+import random
+
+import numpy as np
 
 from Mapping.kmeans_clustering import kmeans_clustering as m
 
@@ -10,3 +13,31 @@ class Test(TestCase):
     def test1(self):
         m.show_animation = False
         m.main()
+
+    def test_warm_start_and_mini_batch(self):
+        rx, ry = m.calc_raw_data([0.0, 8.0], [0.0, 8.0], 100, 3.0)
+
+        clusters = m.kmeans_clustering(rx, ry, 2, init_center=([0.0, 8.0],
+                                                               [0.0, 8.0]))
+        self.assertEqual([100, 100], list(clusters.n_data_per_label()))
+
+        clusters = m.kmeans_clustering(rx, ry, 2, batch_size=50)
+        self.assertEqual(200, sum(clusters.n_data_per_label()))
+
+    def test_rng(self):
+        rx, ry = m.calc_raw_data([0.0, 8.0, 0.0], [0.0, 0.0, 8.0], 50, 3.0)
+
+        # the same generator state gives the same clusters, whatever the
+        # state of the random and np.random modules
+        for batch_size in [None, 20]:
+            results = []
+            for seed in [1, 2]:
+                random.seed(seed)
+                np.random.seed(seed)
+                clusters = m.kmeans_clustering(
+                    rx, ry, 3, batch_size=batch_size,
+                    rng=np.random.default_rng(0))
+                results.append((clusters.center_x, clusters.center_y,
+                                clusters.labels))
+            for a, b in zip(*results):
+                np.testing.assert_array_equal(a, b)
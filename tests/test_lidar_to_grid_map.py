@@ -0,0 +1,56 @@
+from unittest import TestCase
+
+import numpy as np
+
+from Mapping.lidar_to_grid_map import lidar_to_grid_map as m
+
+print(__file__)
+
+
+class Test(TestCase):
+
+    def test_bresenham_lines(self):
+        rng = np.random.default_rng(0)
+        starts = rng.integers(-20, 20, (300, 2))
+        ends = rng.integers(-20, 20, (300, 2))
+
+        x, y, line_ids = m.bresenham_lines(starts, ends)
+        for i, (start, end) in enumerate(zip(starts, ends)):
+            cells = m.bresenham(tuple(start), tuple(end))
+            np.testing.assert_array_equal(
+                np.stack((x[line_ids == i], y[line_ids == i]), axis=1),
+                cells)
+
+        # a single start shared by all the lines
+        x2, y2, _ = m.bresenham_lines(starts[0], ends)
+        x3, y3, _ = m.bresenham_lines(np.tile(starts[0], (300, 1)), ends)
+        np.testing.assert_array_equal(x2, x3)
+        np.testing.assert_array_equal(y2, y3)
+
+    def test_log_odds_grid_map(self):
+        grid_map = m.LogOddsGridMap(-5.0, -5.0, 100, 100, 0.1)
+        # one beam along +y hitting (0.0, 3.0)
+        grid_map.add_scan((0.0, 0.0, 0.0), np.array([0.0]),
+                          np.array([3.0]))
+
+        log_odds = grid_map.log_odds
+        self.assertAlmostEqual(log_odds[50, 80], m.LogOddsGridMap.L_OCCUPIED)
+        np.testing.assert_allclose(log_odds[50, 50:80],
+                                   m.LogOddsGridMap.L_FREE)
+        self.assertEqual(np.count_nonzero(log_odds), 31)
+
+        # the log-odds are clamped after many scans
+        for _ in range(20):
+            grid_map.add_scan((0.0, 0.0, 0.0), np.array([0.0]),
+                              np.array([3.0]))
+        self.assertAlmostEqual(log_odds[50, 80], m.LogOddsGridMap.L_MAX)
+        self.assertAlmostEqual(log_odds[50, 60], m.LogOddsGridMap.L_MIN)
+        probability = grid_map.calc_probability_map()
+        self.assertGreater(probability[50, 80], 0.99)
+        self.assertLess(probability[50, 60], 0.01)
+        self.assertAlmostEqual(probability[0, 0], 0.5)
+
+        # beams ending outside the map only update the cells inside it
+        grid_map.add_scan((0.0, 0.0, np.pi / 2.0), np.array([0.0]),
+                          np.array([20.0]))
+        self.assertAlmostEqual(log_odds[0, 50], m.LogOddsGridMap.L_FREE)
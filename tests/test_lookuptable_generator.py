@@ -0,0 +1,79 @@
+from unittest import TestCase
+
+import sys
+import os
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) +
+                "/../PathPlanning/ModelPredictiveTrajectoryGenerator/")
+
+try:
+    import lookuptable_generator as m
+    import motion_model
+except ImportError:
+    raise
+
+print(__file__)
+
+
+class Test(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.fname = os.path.join(self.tmp_dir.name, "lookuptable.npy")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_save_and_load(self):
+        table = np.random.rand(10, 6)
+        m.save_lookup_table(self.fname, table, "abc")
+
+        loaded = m.load_lookup_table(self.fname, "abc")
+        self.assertIsInstance(loaded, np.memmap)
+        np.testing.assert_array_equal(loaded, table)
+        np.testing.assert_array_equal(m.load_lookup_table(self.fname), table)
+
+        # stale tables are rejected
+        self.assertIsNone(m.load_lookup_table(self.fname, "def"))
+        version = m.TABLE_VERSION
+        m.TABLE_VERSION = version + 1
+        try:
+            self.assertIsNone(m.load_lookup_table(self.fname, "abc"))
+        finally:
+            m.TABLE_VERSION = version
+        self.assertIsNone(m.load_lookup_table(
+            os.path.join(self.tmp_dir.name, "missing.npy")))
+
+    def test_generate_lookup_table(self):
+        table = m.generate_lookup_table(self.fname, n_workers=2,
+                                        wave_size=16)
+
+        # every row ends at its own state, and every target is reached
+        x, y, yaw = motion_model.generate_last_states(
+            table[:, 3], table[:, 4], table[:, 5], 0.0)
+        np.testing.assert_allclose(np.column_stack((x, y, yaw)),
+                                   table[:, :3], atol=1e-9)
+        for state in m.calc_states_list():
+            d = np.hypot(np.hypot(*(table[:, :2] - state[:2]).T),
+                         table[:, 2] - state[2])
+            self.assertLess(d.min(), 0.1)
+
+        # the second call loads the saved table
+        loaded = m.generate_lookup_table(self.fname)
+        self.assertIsInstance(loaded, np.memmap)
+        np.testing.assert_array_equal(loaded, table)
+
+        # the warm starts depend on the wave size, so does the hash
+        states = m.calc_states_list()
+        self.assertIsNone(m.load_lookup_table(
+            self.fname, m.calc_table_hash(states, 0.0, wave_size=1)))
+        self.assertIsNotNone(m.load_lookup_table(
+            self.fname, m.calc_table_hash(states, 0.0, wave_size=16)))
+
+
+if __name__ == '__main__':  # pragma: no cover
+    test = Test()
+    test.test_generate_lookup_table()
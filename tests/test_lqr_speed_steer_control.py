@@ -1,6 +1,10 @@
 from unittest import TestCase
 
 import sys
+
+import numpy as np
+import scipy.linalg as la
+
 sys.path.append("./PathTracking/lqr_speed_steer_control/")
 
 from PathTracking.lqr_speed_steer_control import lqr_speed_steer_control as m
@@ -13,3 +17,14 @@ class Test(TestCase):
     def test1(self):
         m.show_animation = False
         m.main()
+
+    def test_gain_schedule(self):
+        # the shared schedule solves the DARE of this module's model
+        schedule = m.get_gain_schedule(m.lqr_Q, m.lqr_R,
+                                       system_model=m.get_system_model)
+        self.assertIs(schedule, m.get_gain_schedule(
+            m.lqr_Q, m.lqr_R, system_model=m.get_system_model))
+        A, B = m.get_system_model(2.0)
+        X = la.solve_discrete_are(A, B, m.lqr_Q, m.lqr_R)
+        K = la.inv(B.T @ X @ B + m.lqr_R) @ (B.T @ X @ A)
+        np.testing.assert_allclose(schedule.get_gain(2.0), K)
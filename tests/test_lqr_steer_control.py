@@ -1,6 +1,9 @@
 from unittest import TestCase
 
 import sys
+
+import numpy as np
+
 sys.path.append("./PathTracking/lqr_steer_control/")
 
 from PathTracking.lqr_steer_control import lqr_steer_control as m
@@ -13,3 +16,14 @@ class Test(TestCase):
     def test1(self):
         m.show_animation = False
         m.main()
+
+    def test_gain_schedule(self):
+        schedule = m.GainSchedule(m.Q, m.R, max_speed=5.0,
+                                  speed_resolution=0.5)
+        A, B = m.get_system_model(2.0)
+        K, _, _ = m.dlqr(A, B, m.Q, m.R, closed_form=True)
+        np.testing.assert_allclose(schedule.get_gain(2.0), K)
+
+        K_mid = schedule.get_gain(2.25)
+        K_low, K_high = schedule.get_gain(2.0), schedule.get_gain(2.5)
+        np.testing.assert_allclose(K_mid, 0.5 * (K_low + K_high))
@@ -0,0 +1,92 @@
+from unittest import TestCase
+
+import sys
+import os
+
+import numpy as np
+import scipy.interpolate
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) +
+                "/../PathPlanning/ModelPredictiveTrajectoryGenerator/")
+
+try:
+    import model_predictive_trajectory_generator as m
+    import motion_model
+except ImportError:
+    raise
+
+print(__file__)
+
+
+def generate_trajectory_with_loop(s, km, kf, k0):
+    # the integration step by step with the interpolated curvatures
+    n = s / motion_model.ds
+    time = s / motion_model.v
+    fkp = scipy.interpolate.interp1d([0.0, time / 2.0, time], [k0, km, kf],
+                                     kind="quadratic")
+    dt = time / n
+
+    state = motion_model.State()
+    x, y, yaw = [state.x], [state.y], [state.yaw]
+    for ti in np.arange(0.0, time, time / n):
+        state = motion_model.update(state, motion_model.v, float(fkp(ti)),
+                                    dt, motion_model.L)
+        x.append(state.x)
+        y.append(state.y)
+        yaw.append(state.yaw)
+
+    return x, y, yaw
+
+
+class Test(TestCase):
+
+    def test_batched_integrator(self):
+        rng = np.random.default_rng(0)
+        s = rng.uniform(1.0, 30.0, 20)
+        km = rng.uniform(-0.3, 0.3, 20)
+        kf = rng.uniform(-0.3, 0.3, 20)
+        k0 = 0.1
+
+        x, y, yaw, n_steps = motion_model.generate_trajectories(s, km, kf, k0)
+        for i in range(len(s)):
+            xc, yc, yawc = generate_trajectory_with_loop(s[i], km[i], kf[i],
+                                                         k0)
+            n = n_steps[i] + 1
+            np.testing.assert_allclose(x[i, :n], xc, atol=1e-9)
+            np.testing.assert_allclose(y[i, :n], yc, atol=1e-9)
+            np.testing.assert_allclose(yaw[i, :n], yawc, atol=1e-9)
+            # padded with the last state
+            self.assertTrue(np.all(x[i, n:] == x[i, n - 1]))
+
+            xs, ys, yaws = motion_model.generate_trajectory(s[i], km[i],
+                                                            kf[i], k0)
+            np.testing.assert_allclose(xs, xc, atol=1e-9)
+            self.assertAlmostEqual(motion_model.generate_last_state(
+                s[i], km[i], kf[i], k0)[1], yc[-1])
+
+    def test_optimize_trajectories(self):
+        m.show_animation = False
+        targets = np.array([[5.0, 2.0, np.deg2rad(90.0)],
+                            [10.0, 0.0, 0.0],
+                            [20.0, 5.0, np.deg2rad(20.0)]])
+        init_p = np.column_stack((np.hypot(targets[:, 0], targets[:, 1]),
+                                  np.zeros(3), np.zeros(3)))
+
+        ps, found = m.optimize_trajectories(targets, 0.0, init_p)
+        self.assertTrue(np.all(found))
+        x, y, yaw = motion_model.generate_last_states(
+            ps[:, 0], ps[:, 1], ps[:, 2], 0.0)
+        cost = np.linalg.norm(m.calc_diffs(targets, x, y, yaw), axis=1)
+        self.assertTrue(np.all(cost <= m.cost_th))
+
+        # the same result as one target at a time
+        for target, p0, p in zip(targets, init_p, ps):
+            state = motion_model.State(*target)
+            _, _, _, p1 = m.optimize_trajectory(state, 0.0,
+                                                p0.reshape(3, 1).copy())
+            np.testing.assert_allclose(p1.ravel(), p)
+
+
+if __name__ == '__main__':  # pragma: no cover
+    test = Test()
+    test.test_batched_integrator()
@@ -17,3 +17,17 @@ class Test(TestCase):
     def test1(self):
         m.show_animation = False
         m.animation()
+
+    def test_inverse_kinematics_batch(self):
+        goal_pos = [[3.0, 4.0], [-2.0, 1.0], [0.5, -6.0], [20.0, 0.0]]
+        joint_angles = [[0.0] * m.N_LINKS] * len(goal_pos)
+        link_lengths = [1.0] * m.N_LINKS
+
+        joint_angles, is_converged, _ = m.inverse_kinematics_batch(
+            link_lengths, joint_angles, goal_pos)
+
+        self.assertEqual([True, True, True, False], list(is_converged))
+        errors = m.forward_kinematics_batch(
+            link_lengths, joint_angles[:3]) - goal_pos[:3]
+        self.assertTrue(all(
+            abs(complex(*error)) < m.IK_TOLERANCE for error in errors))
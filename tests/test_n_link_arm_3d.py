@@ -0,0 +1,56 @@
+import os
+import sys
+import math
+from unittest import TestCase
+
+import numpy as np
+
+sys.path.append(os.path.dirname(__file__)
+                + "/../ArmNavigation/n_joint_arm_3d/")
+try:
+    import NLinkArm3d as m
+except ImportError:
+    raise
+
+print(__file__)
+
+# Denavit-Hartenberg parameters of PR2
+DH_PARAMS = [[0., -math.pi / 2, .1, 0.],
+             [math.pi / 2, math.pi / 2, 0., 0.],
+             [0., -math.pi / 2, 0., .4],
+             [0., math.pi / 2, 0., 0.],
+             [0., -math.pi / 2, 0., .321],
+             [0., math.pi / 2, 0., 0.],
+             [0., 0., 0., 0.]]
+
+
+class Test(TestCase):
+
+    def test_inverse_kinematics_batch(self):
+        rng = np.random.default_rng(0)
+        n_link = len(DH_PARAMS)
+
+        # poses reached by random joint angles, searched from nearby angles
+        target_angles = rng.uniform(-1.0, 1.0, (20, n_link))
+        ref_ee_poses = m.forward_kinematics_batch(DH_PARAMS, target_angles)
+        init_angles = target_angles + rng.uniform(-0.2, 0.2, (20, n_link))
+        # a pose out of reach
+        ref_ee_poses = np.vstack([ref_ee_poses, [2.0, 0, 0, 0, 0, 0]])
+        init_angles = np.vstack([init_angles, np.zeros(n_link)])
+
+        joint_angles, is_converged, n_iterations = \
+            m.inverse_kinematics_batch(DH_PARAMS, ref_ee_poses, init_angles)
+
+        self.assertEqual([True] * 20 + [False], list(is_converged))
+        self.assertEqual(m.IK_MAX_ITERATIONS, n_iterations[-1])
+        self.assertTrue(np.all(n_iterations[:-1] < m.IK_MAX_ITERATIONS))
+        errors = m.forward_kinematics_batch(
+            DH_PARAMS, joint_angles[:-1]) - ref_ee_poses[:-1]
+        self.assertTrue(np.all(
+            np.linalg.norm(errors, axis=1) < m.IK_TOLERANCE))
+
+        # the arm class gives the same solution one pose at a time
+        arm = m.NLinkArm([[a, *dh[1:]] for a, dh in
+                          zip(init_angles[0], DH_PARAMS)])
+        arm.inverse_kinematics(ref_ee_poses[0])
+        np.testing.assert_allclose(arm.dh_params()[:, 0], joint_angles[0])
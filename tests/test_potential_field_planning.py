@@ -1,5 +1,7 @@
 from unittest import TestCase
 
+import numpy as np
+
 from PathPlanning.PotentialFieldPlanning import potential_field_planning as m
 
 print(__file__)
@@ -10,3 +12,34 @@ class Test(TestCase):
     def test1(self):
         m.show_animation = False
         m.main()
+
+    def test_update_obstacles(self):
+        ox = [15.0, 5.0, 20.0, 25.0]
+        oy = [25.0, 15.0, 26.0, 25.0]
+        pf = m.PotentialField(30.0, 30.0, ox, oy, 0.5, 5.0, 0.0, 10.0)
+
+        ox[1], oy[1] = 7.0, 12.0
+        self.assertTrue(pf.update_obstacles(ox, oy))
+        expected = m.PotentialField(30.0, 30.0, ox, oy, 0.5, 5.0, 0.0, 10.0)
+        np.testing.assert_allclose(pf.pmap, expected.pmap)
+
+    def test_reused_field_bounds(self):
+        m.show_animation = False
+        ox = [15.0, 5.0, 20.0, 25.0]
+        oy = [25.0, 15.0, 26.0, 25.0]
+        pf = m.PotentialField(30.0, 30.0, ox, oy, 0.5, 5.0, 0.0, 10.0)
+
+        rx, ry = m.potential_field_planning(0.0, 10.0, 30.0, 30.0, ox, oy,
+                                            0.5, 5.0, potential_field=pf)
+        self.assertAlmostEqual(rx[0], 0.0)
+        with self.assertRaises(ValueError):
+            m.potential_field_planning(-100.0, 10.0, 30.0, 30.0, ox, oy,
+                                       0.5, 5.0, potential_field=pf)
+
+        # the field is only valid for its own goal, reso and rr
+        for gx, gy, reso, rr in [(20.0, 30.0, 0.5, 5.0),
+                                 (30.0, 30.0, 1.0, 5.0),
+                                 (30.0, 30.0, 0.5, 3.0)]:
+            with self.assertRaises(ValueError):
+                m.potential_field_planning(0.0, 10.0, gx, gy, ox, oy,
+                                           reso, rr, potential_field=pf)
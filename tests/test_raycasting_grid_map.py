@@ -1,12 +1,52 @@
 from unittest import TestCase
 
+import math
+
+import numpy as np
+
 from Mapping.raycasting_grid_map import raycasting_grid_map as m
 
 print(__file__)
 
 
+def generate_ray_casting_grid_map_with_loop(ox, oy, xyreso, yawreso):
+    # each point marks the cells behind it in its angle bin
+    minx, miny, maxx, maxy, xw, yw = m.calc_grid_map_config(ox, oy, xyreso)
+    pmap = np.zeros((xw, yw))
+
+    for (x, y) in zip(ox, oy):
+        d = math.hypot(x, y)
+        angle = math.atan2(y, x) % (math.pi * 2.0)
+        angleid = int(math.floor(angle / yawreso))
+        for ix in range(xw):
+            for iy in range(yw):
+                px = ix * xyreso + minx
+                py = iy * xyreso + miny
+                pangle = math.atan2(py, px) % (math.pi * 2.0)
+                if int(math.floor(pangle / yawreso)) == angleid and \
+                        math.hypot(px, py) > d:
+                    pmap[ix, iy] = 0.5
+        pmap[int(round((x - minx) / xyreso)),
+             int(round((y - miny) / xyreso))] = 1.0
+
+    return pmap
+
+
 class Test(TestCase):
 
     def test1(self):
         m.show_animation = False
         m.main()
+
+    def test_same_as_loop(self):
+        xyreso = 0.25
+        yawreso = np.deg2rad(10.0)
+        rng = np.random.default_rng(0)
+        for i in range(5):
+            ox = (rng.random(4) - 0.5) * 10.0
+            oy = (rng.random(4) - 0.5) * 10.0
+            pmap = m.generate_ray_casting_grid_map(ox, oy, xyreso,
+                                                   yawreso)[0]
+            np.testing.assert_array_equal(
+                pmap, generate_ray_casting_grid_map_with_loop(
+                    ox, oy, xyreso, yawreso))
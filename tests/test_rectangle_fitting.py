@@ -0,0 +1,68 @@
+import itertools
+import os
+import sys
+from unittest import TestCase
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__))
+                + "/../Mapping/rectangle_fitting/")
+
+try:
+    import rectangle_fitting as m
+except ImportError:
+    raise
+
+print(__file__)
+
+
+def adoptive_range_segmentation_with_loop(ox, oy, R0, Rd):
+    # clusters of the points in range, merged while any two overlap
+    S = []
+    for i, _ in enumerate(ox):
+        C = set()
+        R = R0 + Rd * np.linalg.norm([ox[i], oy[i]])
+        for j, _ in enumerate(ox):
+            d = np.hypot(ox[i] - ox[j], oy[i] - oy[j])
+            if d <= R:
+                C.add(j)
+        S.append(C)
+
+    while True:
+        no_change = True
+        for (c1, c2) in list(itertools.permutations(range(len(S)), 2)):
+            if S[c1] & S[c2]:
+                S[c1] = (S[c1] | S.pop(c2))
+                no_change = False
+                break
+        if no_change:
+            break
+
+    return S
+
+
+class Test(TestCase):
+
+    def test1(self):
+        m.show_animation = False
+        m.main()
+
+    def test_range_segmentation(self):
+        rng = np.random.default_rng(0)
+        l_shape_fitting = m.LShapeFitting()
+        for Rd in (0.001, 0.1):
+            l_shape_fitting.Rd = Rd
+            # blobs and scattered points of a synthetic scan
+            centers = rng.uniform(-30.0, 30.0, (6, 2))
+            points = np.concatenate(
+                [c + rng.normal(0.0, 1.5, (15, 2)) for c in centers] +
+                [rng.uniform(-40.0, 40.0, (40, 2))])
+            ox, oy = points[:, 0].tolist(), points[:, 1].tolist()
+
+            S = l_shape_fitting._adoptive_range_segmentation(ox, oy)
+            expected = adoptive_range_segmentation_with_loop(
+                ox, oy, l_shape_fitting.R0, Rd)
+            self.assertEqual(sorted(map(sorted, S)),
+                             sorted(map(sorted, expected)))
+            self.assertEqual([min(ids) for ids in S],
+                             sorted(min(ids) for ids in S))
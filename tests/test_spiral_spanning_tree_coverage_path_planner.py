@@ -1,5 +1,6 @@
 import os
 import sys
+import numpy as np
 import matplotlib.pyplot as plt
 from unittest import TestCase
 
@@ -56,3 +57,9 @@ class TestPlanning(TestCase):
         img = plt.imread(os.path.join(img_dir, 'map', 'test_3.png'))
         start = (0, 0)
         self.spiral_stc_cpp(img, start)
+
+    def test_spiral_stc_cpp_large_open_map(self):
+        # deeper than the default recursion limit
+        img = np.ones((400, 400))
+        start = (0, 0)
+        self.spiral_stc_cpp(img, start)
@@ -1,6 +1,9 @@
 from unittest import TestCase
 
 import sys
+import tempfile
+
+import numpy as np
 
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)) +
@@ -11,6 +14,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)) +
 try:
     import state_lattice_planner as m
     import model_predictive_trajectory_generator as m2
+    import lookuptable_generator
 except:
     raise
 
@@ -24,6 +28,54 @@ class Test(TestCase):
         m2.show_animation = False
         m.main()
 
+    def test_lookup_table_cache(self):
+        lookup_table, kd_tree = m.load_lookup_table()
+        self.assertIs(m.load_lookup_table()[1], kd_tree)
+        self.assertIn((m.binary_table_path, m.table_path),
+                      m._lookup_table_cache)
+
+        # the KD-tree search is the same as the linear search
+        states = np.random.default_rng(0).uniform(
+            [0.0, -10.0, -1.0], [30.0, 10.0, 1.0], (50, 3))
+        nearest = m.search_nearest_from_lookuptable(states)
+        for state, row in zip(states, nearest):
+            np.testing.assert_array_equal(
+                row, m.search_nearest_one_from_lookuptable(*state,
+                                                           lookup_table))
+
+    def test_binary_lookup_table(self):
+        binary_table_path = m.binary_table_path
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            m.binary_table_path = os.path.join(tmp_dir, "lookuptable.npy")
+            try:
+                # the shipped csv table without a binary one,
+                # nothing is generated
+                lookup_table = m.load_lookup_table()[0]
+                np.testing.assert_array_equal(
+                    lookup_table, m.pd.read_csv(m.table_path))
+                self.assertEqual([], os.listdir(tmp_dir))
+
+                # an up to date binary table is memory-mapped
+                table_hash = lookuptable_generator.calc_table_hash(
+                    lookuptable_generator.calc_states_list(), 0.0)
+                lookuptable_generator.save_lookup_table(
+                    m.binary_table_path, lookup_table[:-1], table_hash)
+                m._lookup_table_cache.clear()
+                binary_table = m.load_lookup_table()[0]
+                self.assertIsInstance(binary_table, np.memmap)
+                np.testing.assert_array_equal(binary_table,
+                                              lookup_table[:-1])
+
+                # a stale binary table is ignored
+                lookuptable_generator.save_lookup_table(
+                    m.binary_table_path, lookup_table[:-1], "stale")
+                m._lookup_table_cache.clear()
+                np.testing.assert_array_equal(m.load_lookup_table()[0],
+                                              lookup_table)
+            finally:
+                m.binary_table_path = binary_table_path
+                m._lookup_table_cache.clear()
+
 
 if __name__ == '__main__':  # pragma: no cover
     test = Test()
@@ -1,5 +1,8 @@
 import sys
 import os
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
 sys.path.append(os.path.dirname(os.path.abspath(__file__))
                 + "/../PathPlanning/VoronoiRoadMap/")
 
@@ -15,3 +18,44 @@ class Test(TestCase):
     def test1(self):
         m.show_animation = False
         m.main()
+
+    def test_road_map_search(self):
+        m.show_animation = False
+        ox = [float(i) for i in range(60)] + [60.0] * 60 + \
+            [float(i) for i in range(61)] + [0.0] * 61 + [20.0] * 40
+        oy = [0.0] * 60 + [float(i) for i in range(60)] + [60.0] * 61 + \
+            [float(i) for i in range(61)] + [float(i) for i in range(40)]
+        planner = m.VoronoiRoadMapPlanner()
+
+        # the vertex road map is built once and shared by the plannings
+        rx, ry = planner.planning(10.0, 10.0, 50.0, 50.0, ox, oy, 5.0)
+        rx2, ry2 = planner.planning(10.0, 10.0, 50.0, 50.0, ox, oy, 5.0)
+        self.assertEqual(len(planner.road_map_cache), 1)
+        self.assertEqual((rx, ry), (rx2, ry2))
+        self.assertEqual((rx, ry), m.VoronoiRoadMapPlanner().planning(
+            10.0, 10.0, 50.0, 50.0, ox, oy, 5.0))
+
+        vertex_road_map = planner.get_vertex_road_map(
+            10.0, 10.0, 50.0, 50.0, ox, oy, 5.0)
+        node_x = vertex_road_map["x"] + [10.0, 50.0]
+        node_y = vertex_road_map["y"] + [10.0, 50.0]
+        edge_ids_list = planner.connect_start_goal(node_x, node_y, 5.0,
+                                                   vertex_road_map)
+        search = m.DijkstraSearch(False)
+        road_map = search.RoadMap(node_x, node_y, edge_ids_list)
+        graph = csr_matrix((road_map.lengths, road_map.indices,
+                            road_map.indptr))
+        distances = dijkstra(graph, indices=len(node_x) - 2)
+
+        # shortest paths on the shared CSR road map, to every node
+        for goal_id in range(0, len(node_x), 7):
+            gx, gy = node_x[goal_id], node_y[goal_id]
+            rx, ry = search.search_road_map(10.0, 10.0, gx, gy, road_map)
+            self.assertEqual((rx, ry), search.search(
+                10.0, 10.0, gx, gy, node_x, node_y, edge_ids_list))
+            if np.isinf(distances[goal_id]):
+                self.assertEqual(rx, [])
+            else:
+                self.assertAlmostEqual(
+                    np.sum(np.hypot(np.diff(rx), np.diff(ry))),
+                    distances[goal_id])
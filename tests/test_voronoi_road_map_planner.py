@@ -1,5 +1,6 @@
 import os
 import sys
+import numpy as np
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__))
                 + "/../PathPlanning/VisibilityRoadMap/")
@@ -15,3 +16,31 @@ class Test(TestCase):
     def test1(self):
         m.show_animation = False
         m.main()
+
+    def test_seg_intersect_array(self):
+        # small integer coordinates give many collinear and touching cases
+        rng = np.random.default_rng(0)
+        p = rng.integers(0, 4, (2000, 8)).astype(float)
+        is_hit = m.Geometry.is_seg_intersect_array(*p.T)
+        for row, hit in zip(p, is_hit):
+            points = [m.Geometry.Point(row[i], row[i + 1])
+                      for i in range(0, 8, 2)]
+            self.assertEqual(hit, m.Geometry.is_seg_intersect(*points))
+
+    def test_edge_valid(self):
+        obstacle = m.ObstaclePolygon([0.0, 4.0, 4.0, 0.0],
+                                     [0.0, 0.0, 4.0, 4.0])
+        rng = np.random.default_rng(1)
+        nodes = rng.integers(-2, 7, (300, 4)).astype(float)
+        # coincident nodes, on and off the obstacle edges
+        nodes[:20, 2:] = nodes[:20, :2]
+        nodes[0] = [4.0, 2.0, 4.0, 2.0]
+        corners = [m.Geometry.Point(x, y)
+                   for x, y in zip(obstacle.x_list, obstacle.y_list)]
+        for x1, y1, x2, y2 in nodes:
+            p1, p2 = m.Geometry.Point(x1, y1), m.Geometry.Point(x2, y2)
+            expected = not any(
+                m.Geometry.is_seg_intersect(p1, p2, p3, p4)
+                for p3, p4 in zip(corners[:-1], corners[1:]))
+            self.assertEqual(m.VisibilityRoadMap.is_edge_valid(
+                p1, p2, obstacle), expected)
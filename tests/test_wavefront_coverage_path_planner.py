@@ -1,6 +1,10 @@
 import os
 import sys
 import matplotlib.pyplot as plt
+import numpy as np
+from scipy import ndimage
+from scipy.sparse import lil_matrix
+from scipy.sparse.csgraph import dijkstra
 from unittest import TestCase
 
 sys.path.append(os.path.dirname(
@@ -62,3 +66,45 @@ class TestPlanning(TestCase):
         goal = (30, 30)
 
         self.wavefront_cpp(img, start, goal)
+
+    def test_transform_small_map(self):
+        img = np.array([[0, 0, 0, 0],
+                        [0, 1, 1, 0],
+                        [0, 0, 0, 0]])
+        inf, r2 = float('inf'), np.sqrt(2)
+
+        # breadth first wavefront
+        DT = wavefront_coverage_path_planner.transform(
+            img, (0, 0), transform_type='distance')
+        np.testing.assert_array_equal(DT, [[0, 1, 2, 3],
+                                           [1, inf, inf, 3],
+                                           [2, 2, 3, 4]])
+
+        # heap wavefront with diagonal steps
+        DT = wavefront_coverage_path_planner.transform(
+            img, (0, 0), distance_type='eculidean',
+            transform_type='distance')
+        np.testing.assert_allclose(DT, [[0, 1, 2, 3],
+                                        [1, inf, inf, 2 + r2],
+                                        [2, 1 + r2, 2 + r2, 3 + r2]])
+
+        # path transform, leaving a cell costs the step plus its
+        # weighted obstacle transform value
+        alpha = 0.5
+        PT = wavefront_coverage_path_planner.transform(
+            img, (0, 0), transform_type='path', alpha=alpha)
+        eT = ndimage.distance_transform_cdt(1 - img, 'chessboard')
+        n_rows, n_cols = img.shape
+        graph = lil_matrix((img.size, img.size))
+        for i in range(n_rows):
+            for j in range(n_cols):
+                for di in (-1, 0, 1):
+                    for dj in (-1, 0, 1):
+                        ni, nj = i + di, j + dj
+                        if (di, dj) != (0, 0) and 0 <= ni < n_rows and \
+                                0 <= nj < n_cols and not img[i, j] and \
+                                not img[ni, nj]:
+                            graph[i * n_cols + j, ni * n_cols + nj] = \
+                                1 + alpha * eT[i, j]
+        expected = dijkstra(graph.tocsr(), indices=0).reshape(img.shape)
+        np.testing.assert_allclose(PT, expected)